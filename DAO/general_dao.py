@@ -7,6 +7,7 @@ from typing import List, Optional, Any, Type
 
 from database import models, schema
 from helpers import exception_helper
+from services.shard_services import ShardRouter
 from services.validation_services import ValidationService
 
 class GeneralDAO:
@@ -34,6 +35,7 @@ class GeneralDAO:
         """
         Retrieve all records of specified model from database.
         Works with ANY SQLAlchemy model (User, Item, etc.)
+        With sharding, every shard is read concurrently and records are merged by ID.
         
         :param db:  AsyncSession
                     Database session for executing queries
@@ -48,6 +50,13 @@ class GeneralDAO:
         **Update any record**
         - users = await GeneralDAO.get_all_records(db, models.User)
         """
+        if ShardRouter.enabled():
+            async def read_shard(shard_db: AsyncSession) -> List[Any]:
+                result = await shard_db.execute(select(model).order_by(model.id))
+                return result.scalars().all()
+
+            return ShardRouter.merge_by_cursor(await ShardRouter.fan_out(read_shard), key=lambda record: record.id)
+
         query = select(model)
         result = await db.execute(query)
 
@@ -87,7 +96,7 @@ class GeneralDAO:
                             update_data: Any,
                             db: AsyncSession) -> Any:
         """
-        Update ANY database record with provided data.
+        Update ANY database record with provided data and flush it (caller commits, see WriteQueue).
         Universal method for all models that supports partial updates.
         
         :param model: SQLAlchemy model class
@@ -115,16 +124,15 @@ class GeneralDAO:
             setattr(record, field, value)
 
         try:
-            await db.commit()
+            await db.flush()
         except IntegrityError as e:
             # Handle database integrity constraint violations as a safety net
-            await db.rollback()
+            # (caller's transaction or savepoint is rolled back by WriteQueue)
             raise HTTPException(
                 status_code=409,
                 detail="This value already exists or violates a database constraint"
             )
-        
-        await db.refresh(record)
 
+        # Updated attributes are already set on record: refresh would only reload the row and its relationships
         return record
         
@@ -1,13 +1,19 @@
+import logging
+
 from sqlalchemy import select, update, delete, and_, func, desc
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import lazyload
 from typing import List, Optional
 
 from DAO.general_dao import GeneralDAO
 from database import response_schemas, schema
 from database import models
 from helpers import exception_helper
+from services.cache_services import CacheService
 from services.item_services import ItemService
+from services.shard_services import ShardRouter
 
+logger = logging.getLogger(__name__)
 
 class ItemDao:
     """
@@ -20,25 +26,25 @@ class ItemDao:
                           request: schema.Item, 
                           user_id: int) -> models.Item:
         """
-        Create new item in database.
+        Add new item to session and flush it (caller commits, see WriteQueue).
         
         :param db: Database session
         :param request: Item data from schema
         :param user_id: ID of user creating the item
-        :return: Created item object
+        :return: Created item object with ID
         """
 
         item_desc = request.description or "No description"
         new_item = models.Item(
+            id=await ShardRouter.allocate_id("item"),   # None without sharding: assigned by database
             name=request.name,
             description=item_desc,
             user_id=user_id
         )
 
-        print(new_item)
-
         db.add(new_item)
-        await db.commit()
+        await db.flush()    # Get ID
+        logger.debug("Item created", extra={"item_id": new_item.id, "user_id": user_id})
 
         return new_item
     
@@ -48,7 +54,15 @@ class ItemDao:
                           user_id: int,
                           item_data: schema.ItemUpdate,
                           db: AsyncSession) -> models.Item:
-        
+        """
+        Update item with ownership verification and flush it (caller commits, see WriteQueue).
+
+        :param item_id: ID of item to update
+        :param user_id: User ID for ownership verification
+        :param item_data: Fields to update
+        :param db: Database session
+        :return: Updated item object
+        """
         item = await cls.get_item_by_user_id(db=db, 
                                             item_id=item_id, 
                                             user_id=user_id)
@@ -58,8 +72,7 @@ class ItemDao:
         for k, v in update_data.items():
             setattr(item, k, v)
 
-        await db.commit()
-        await db.refresh(item)
+        await db.flush()
 
         return item
     
@@ -67,15 +80,16 @@ class ItemDao:
     async def delete_item(cls,
                           item_id: int,
                           user_id: int,
-                          db: AsyncSession) -> None:
+                          db: AsyncSession) -> bool:
 
         """
-        Delete item with ownership verification.
+        Delete item with ownership verification (caller commits, see WriteQueue).
         Only item owner can delete their items.
         
         :param db: Database session
         :param item_id: ID of item to delete
         :param user_id: User ID for ownership verification
+        :return: True if item was deleted, False if it doesn't exist or belongs to another user
         """
         query = delete(models.Item).where(
             and_(
@@ -84,9 +98,9 @@ class ItemDao:
             )
         )
 
-        await db.execute(query)
+        result = await db.execute(query)
 
-        await db.commit()
+        return result.rowcount > 0
 
     @classmethod
     async def get_item_name(cls, 
@@ -122,13 +136,15 @@ class ItemDao:
     @classmethod
     async def get_item_by_user_id(cls, db: AsyncSession,
                                   item_id: int,
-                                  user_id: int) -> Optional[models.Item]:
+                                  user_id: int,
+                                  with_user: bool = True) -> Optional[models.Item]:
         """
         Get specific item with ownership verification.
         
         :param db: Database session
         :param item_id: Item ID to find
         :param user_id: User ID for ownership check
+        :param with_user: Load item's user too (one more query); writes not returning the user skip it
         :return: Item object or None
         """
         query = select(models.Item).where(
@@ -137,6 +153,8 @@ class ItemDao:
                 models.Item.id == item_id
             )
         )
+        if not with_user:
+            query = query.options(lazyload(models.Item.user))
         item = await db.execute(query)
         return item.scalars().first()
     
@@ -169,15 +187,20 @@ class ItemDao:
         """
         Get all items from database with associated user information.
         Delegates response formatting to ItemService.
+        Formatted list is cached until any item or user is written.
         
         :param db: Database session
         :return: List[response_schemas.ItemWithUserResponse] - Formatted items with user data
         """
 
-        # Get all Items from DB
-        items = await GeneralDAO.get_all_records(db=db, model=models.Item)
-        await exception_helper.CheckHTTP404NotFound(founding_item=items, text="Items not found")
+        async def load_items():
+            # Get all Items from DB
+            items = await GeneralDAO.get_all_records(db=db, model=models.Item)
+            await exception_helper.CheckHTTP404NotFound(founding_item=items, text="Items not found")
+
+            # Delegate formatting to ItemService to separate concerns
+            return await ItemService.get_formated_items(items=items)
 
-        # Delegate formatting to ItemService to separate concerns
-        items_list = await ItemService.get_formated_items(items=items)
+        items_list = await CacheService.get_or_load(key=CacheService.make_key("Item", "list"),
+                                                    loader=load_items)
         return items_list
\ No newline at end of file
@@ -7,6 +7,7 @@ from DAO.general_dao import GeneralDAO
 from database import response_schemas
 from database import models
 from helpers import exception_helper
+from services.cache_services import CacheService
 from services.user_services import UserService
 
 
@@ -89,16 +90,21 @@ class UserDAO:
         """
         Get all users from database and return formatted response.
         Delegates formatting to UserService.
+        Formatted list is cached until any user is written.
         
         :param db: Database session
         :return: List[response_schemas.UserResponse] - List of formatted user responses
         """
 
-        # Get all users from DB
-        users = await GeneralDAO.get_all_records(db=db, model=models.User)
-        await exception_helper.CheckHTTP404NotFound(founding_item=users, text="Users not found")
-        
-        # Delegate formatting to UserService to separate concerns
-        users_list = await UserService.get_formated_users(users=users)
+        async def load_users():
+            # Get all users from DB
+            users = await GeneralDAO.get_all_records(db=db, model=models.User)
+            await exception_helper.CheckHTTP404NotFound(founding_item=users, text="Users not found")
+
+            # Delegate formatting to UserService to separate concerns
+            return await UserService.get_formated_users(users=users)
+
+        users_list = await CacheService.get_or_load(key=CacheService.make_key("User", "list"),
+                                                    loader=load_users)
 
         return users_list
\ No newline at end of file
@@ -30,15 +30,322 @@ class Settings:
     DATABASE_URL_POSTGRE: str = os.getenv('DATABASE_URL_POSTGRE')   # Async URL for PostgreSQL
     DATABASE_URL_FOR_ALEMBIC_POSTGRE: str = os.getenv('DATABASE_URL_ALEMBIC_POSTGRE')   # Sync URL for migrations
 
+    # Database engine #
+    DB_PROFILE: str = os.getenv('DB_PROFILE', 'prod-pg')   # Engine profile from ENGINE_PROFILES: dev, prod-pg, prod-sqlite
+
+    ENGINE_PROFILES = {
+        "dev": {
+            "url": "DATABASE_URL",     # Setting holding database URL
+            "pool_size": 2,     # Connections kept open
+            "max_overflow": 3,  # Extra connections opened under load, closed when returned
+            "pool_timeout": 10,     # Seconds to wait for a connection before TimeoutError
+            "pool_recycle": -1,     # Reconnect connections older than this (-1 = never)
+            "pre_ping": "always",   # Check connection on checkout: always, idle or never
+            "pre_ping_idle_seconds": 0,     # With "idle": check only connections unused this long
+            "compiled_cache_size": 100,     # SQLAlchemy compiled statements per engine
+            "statement_cache_size": 100,    # asyncpg prepared statements per connection (0 for pgbouncer)
+            "connect_timeout": 10,  # Seconds to open a connection (asyncpg)
+            "command_timeout": 30,  # Seconds for one statement (asyncpg)
+            "single_writer": False,     # SQLite: primary (writer) engine has exactly one connection
+            "sqlite_pragmas": {},   # SQLite: PRAGMA name -> value run on every new connection
+        },
+        "prod-pg": {
+            "url": "DATABASE_URL_POSTGRE",
+            "pool_size": 10,
+            "max_overflow": 10,
+            "pool_timeout": 5,
+            "pool_recycle": 1800,
+            "pre_ping": "idle",
+            "pre_ping_idle_seconds": 30,
+            "compiled_cache_size": 500,
+            "statement_cache_size": 500,
+            "connect_timeout": 5,
+            "command_timeout": 15,
+            "single_writer": False,
+            "sqlite_pragmas": {},
+        },
+        "prod-sqlite": {
+            "url": "DATABASE_URL",
+            "pool_size": 8,
+            "max_overflow": 0,
+            "pool_timeout": 10,
+            "pool_recycle": -1,
+            "pre_ping": "never",
+            "pre_ping_idle_seconds": 0,
+            "compiled_cache_size": 500,
+            "statement_cache_size": 0,
+            "connect_timeout": 5,
+            "command_timeout": 15,
+            "single_writer": True,
+            "sqlite_pragmas": {
+                "busy_timeout": 5000,   # ms to wait for a lock instead of failing with "database is locked"
+                "journal_mode": "WAL",  # Readers don't block the writer and the writer doesn't block readers
+                "synchronous": "NORMAL",    # fsync on checkpoint, not on every commit (safe with WAL)
+                "cache_size": -65536,   # Page cache per connection, negative = KiB (64 MiB)
+                "mmap_size": 268435456,     # Read pages through memory map (256 MiB)
+                "temp_store": "MEMORY",     # Temporary tables and indexes of sorts in memory
+            },
+        },
+    }
+    """
+    Engine profiles: DB_PROFILE -> pool and driver settings of every engine (primary, read-only, replicas).
+
+    dev: SQLite (DB_LITE), small pool, every checkout is pinged.
+    prod-pg: PostgreSQL (DATABASE_URL_POSTGRE), connections idle for less than
+    pre_ping_idle_seconds are trusted (no extra round trip per request),
+    connections are recycled before server or proxy idle timeouts close them.
+    prod-sqlite: SQLite file (DB_LITE) in WAL mode: fixed pool of reader connections
+    (read-only sessions) and one writer connection (get_db) that writes queue for,
+    instead of competing for the database lock.
+
+    Every value can be overridden by DB_* variables (see ENGINE_PROFILE_OVERRIDES).
+    Settings that don't apply to the driver (asyncpg ones on SQLite) are ignored.
+    """
+
+    # Read replicas #
+    DATABASE_REPLICA_URLS: list = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',')
+                                   if url.strip()]   # Async URLs of read replicas, comma separated
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))   # Writer reads from primary; max replica lag
+    REPLICA_HEALTH_INTERVAL_SECONDS: float = float(os.getenv('REPLICA_HEALTH_INTERVAL_SECONDS', '5'))   # Replica checks period
+
+    # Sharding #
+    DATABASE_SHARD_URLS: list = [url.strip() for url in os.getenv('DATABASE_SHARD_URLS', '').split(',')
+                                 if url.strip()]   # Async URLs of shards (users with items), comma separated
+    SHARD_ROUTING: str = os.getenv('SHARD_ROUTING', 'hash')   # User ID -> shard: hash (jump hash) or range
+    SHARD_RANGES: list = [int(bound) for bound in os.getenv('SHARD_RANGES', '').split(',')
+                          if bound.strip()]     # "range": upper user ID bounds of all shards but the last one
+    SHARD_ID_BLOCK_SIZE: int = int(os.getenv('SHARD_ID_BLOCK_SIZE', '1000'))   # IDs a worker takes from primary at once
+
     # JWT authentication settings
 
     SECRET_KEY: str = os.getenv('SECRET_KEY')   # Secret key for JWT token signing
     ALGORITHM: str = os.getenv('ALGORITHM')   # Encryption algorithm (HS256)
 
+    # Logging
+    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')   # Root log level
+    LOG_FORMAT: str = os.getenv('LOG_FORMAT', 'json')   # "json" (one object per line) or "text"
+    LOG_LEVELS: str = os.getenv('LOG_LEVELS', '')   # Per-logger levels: "sqlalchemy.engine=INFO,helpers.token_helper=DEBUG"
+
+    # SQL logging
+    SQL_ECHO: bool = os.getenv('SQL_ECHO', '0') == '1'   # Log every SQL statement (development only)
+    SLOW_QUERY_MS: float = float(os.getenv('SLOW_QUERY_MS', '100'))   # Log statements slower than this (negative = off)
+
+    # Statement timeouts and cancellation
+    QUERY_CANCEL_ENABLED: bool = os.getenv('QUERY_CANCEL_ENABLED', '1') == '1'   # Route statement timeouts, cancel reads of disconnected clients
+    STATEMENT_TIMEOUT_MS: float = float(os.getenv('STATEMENT_TIMEOUT_MS', '0'))   # Statement timeout of routes not in ROUTE_STATEMENT_TIMEOUTS_MS (0 = none)
+
+    ROUTE_STATEMENT_TIMEOUTS_MS = {
+        "GET /api/v1/items/": 2000,
+        "GET /api/v1/users/": 2000,
+    }
+    """
+    Statement timeouts per route: route name (method and path template) -> ms per statement.
+
+    A statement running longer is aborted (PostgreSQL statement_timeout, SQLite progress handler)
+    and the request gets 503. Meant for routes whose cost grows with table size (lists),
+    so a slow statement can't hold a pool connection for long. 0 disables timeout of a route.
+    """
+
+    # Load shedding
+    LOAD_SHED_ENABLED: bool = os.getenv('LOAD_SHED_ENABLED', '1') == '1'   # Reject requests over adaptive concurrency limit with 503
+    LOAD_SHED_INITIAL_LIMIT: int = int(os.getenv('LOAD_SHED_INITIAL_LIMIT', '20'))   # Concurrent requests before latency is observed
+    LOAD_SHED_MIN_LIMIT: int = int(os.getenv('LOAD_SHED_MIN_LIMIT', '4'))   # Limit never goes lower
+    LOAD_SHED_MAX_LIMIT: int = int(os.getenv('LOAD_SHED_MAX_LIMIT', '200'))   # Limit never goes higher
+    LOAD_SHED_RETRY_AFTER_SECONDS: int = int(os.getenv('LOAD_SHED_RETRY_AFTER_SECONDS', '1'))   # Retry-After of rejected requests
+
+    ROUTE_PRIORITIES = {
+        "GET /health": "critical",
+        "GET /ready": "critical",
+        "GET /metrics": "critical",
+        "POST /api/v1/items/create_item": "high",
+        "PATCH /api/v1/items/update_item/{item_id}": "high",
+        "DELETE /api/v1/items/delete_item/{item_id}": "high",
+        "PATCH /api/v1/users/me/update": "high",
+        "GET /api/v1/items/": "low",
+        "GET /api/v1/users/": "low",
+        "POST /api/v1/users/sign_up": "low",
+    }
+    """
+    Priority classes of routes for load shedding: route name (method and path template) -> class.
+
+    Other routes are "normal". Under overload "low" routes are rejected first, "high" ones last
+    and "critical" ones never (see ConcurrencyLimiter.PRIORITY_SHARES).
+    """
+
+    # Rate limits
+    RATE_LIMIT_ENABLED: bool = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'   # 429 over per-user / per-IP limits of routes
+    RATE_LIMIT_SHARED_PATH: str = os.getenv('RATE_LIMIT_SHARED_PATH', '')   # File shared by workers of a host (empty = per worker)
+    RATE_LIMIT_SHARED_SLOTS: int = int(os.getenv('RATE_LIMIT_SHARED_SLOTS', '65536'))   # Keys the shared table holds
+
+    RATE_LIMIT_POLICIES = {
+        "create_item": {
+            "algorithm": "token_bucket",
+            "limit": int(os.getenv('RATE_LIMIT_CREATE_ITEM', '30')),  # Burst size, refilled over the period
+            "period_seconds": 60,
+            "key": "user",
+        },
+        "list": {
+            "algorithm": "sliding_window",
+            "limit": int(os.getenv('RATE_LIMIT_LIST', '600')),    # Requests per period
+            "period_seconds": 60,
+            "key": "ip",
+        },
+        "availability": {
+            "algorithm": "sliding_window",
+            "limit": int(os.getenv('RATE_LIMIT_AVAILABILITY', '30')),    # Requests per period
+            "period_seconds": 60,
+            "key": "ip",
+        },
+        "sign_up": {
+            "algorithm": "sliding_window",
+            "limit": int(os.getenv('RATE_LIMIT_SIGN_UP', '10')),    # Requests per period
+            "period_seconds": 60,
+            "key": "ip",
+        },
+    }
+    """
+    Rate limit policies, routes pick their policy in routers.
+
+    algorithm: "token_bucket" allows bursts of `limit` and refills limit/period per second,
+    "sliding_window" allows `limit` requests in any `period_seconds` (approximated from two windows).
+    key: "user" counts per signed in user (client IP for anonymous requests), "ip" per client IP.
+
+    create_item: item creation of every user. list: unauthenticated item and user lists.
+    availability: username/email checks, anonymous callers can't enumerate registered emails.
+    sign_up: registrations per client IP, so one client can't fill the auth lane with bcrypt hashing.
+
+    Routes declare the policy before their lane: clients over the limit get 429 at once,
+    without taking a lane slot or waiting in the lane queue.
+    """
+
+    # Cache settings
+    CACHE_TTL_SECONDS: int = int(os.getenv('CACHE_TTL_SECONDS', '30'))   # Upper bound for stale cache entries
+    CACHE_BUS_CHANNEL: str = os.getenv('CACHE_BUS_CHANNEL', 'cache_invalidation')   # PostgreSQL NOTIFY channel
+    CACHE_BUS_SOCKET_DIR: str = os.getenv('CACHE_BUS_SOCKET_DIR',
+                                          os.path.join(os.getenv('XDG_RUNTIME_DIR')
+                                                       or os.getenv('XDG_CACHE_HOME', str(Path.home() / '.cache')),
+                                                       'fastapi_preset', 'cache_bus'))  # Private directory of SQLite workers sockets
+    CACHE_SNAPSHOT_PATH: str = os.getenv('CACHE_SNAPSHOT_PATH',
+                                         os.path.join(os.getenv('XDG_CACHE_HOME', str(Path.home() / '.cache')),
+                                                      'fastapi_preset', 'cache.snapshot'))  # Private directory, empty to disable
+    CACHE_SNAPSHOT_MAX_AGE_SECONDS: int = int(os.getenv('CACHE_SNAPSHOT_MAX_AGE_SECONDS', '3600'))   # Older snapshots are ignored
+
+    # Startup warm-up settings
+    WARMUP_ENABLED: bool = os.getenv('WARMUP_ENABLED', '1') == '1'   # Prime pool and compile SQL before readiness
+    WARMUP_PREFILL_TOP_N: int = int(os.getenv('WARMUP_PREFILL_TOP_N', '0'))   # Hot cache keys to prefill (0 = off)
+
+    # Username/email availability filters
+    AVAILABILITY_FILTER_CAPACITY: int = int(os.getenv('AVAILABILITY_FILTER_CAPACITY', '100000'))   # Expected number of users
+    AVAILABILITY_FILTER_ERROR_RATE: float = float(os.getenv('AVAILABILITY_FILTER_ERROR_RATE', '0.01'))   # False "maybe taken" rate
+
+    # Group commit (WriteQueue)
+    WRITE_QUEUE_ENABLED: bool = os.getenv('WRITE_QUEUE_ENABLED', '0') == '1'   # Batch concurrent writes into one transaction
+    WRITE_QUEUE_MAX_BATCH: int = int(os.getenv('WRITE_QUEUE_MAX_BATCH', '64'))   # Max write operations per transaction
+    WRITE_QUEUE_MAX_LATENCY_MS: float = float(os.getenv('WRITE_QUEUE_MAX_LATENCY_MS', '2'))   # Max wait for batch to fill
+
+    # Password hashing
+    BCRYPT_WORKERS: int = int(os.getenv('BCRYPT_WORKERS', str(os.cpu_count() or 1)))   # Threads for bcrypt
+
+    # Priority lanes
+    LANES_ENABLED: bool = os.getenv('LANES_ENABLED', '1') == '1'   # Separate slots and executors for auth, writes and reads
+    LANE_QUEUE_TIMEOUT_MS: float = float(os.getenv('LANE_QUEUE_TIMEOUT_MS', '1000'))   # Max wait for a lane slot before 503
+
+    LANES = {
+        "auth": {
+            "slots": 2 * BCRYPT_WORKERS,    # Requests of lane running at once
+            "queue": 2 * BCRYPT_WORKERS,    # Requests waiting for a slot, more get 503
+            "workers": BCRYPT_WORKERS,  # Threads of lane executor
+        },
+        "writes": {
+            "slots": 4,
+            "queue": 64,
+            "workers": 1,
+        },
+        "reads": {
+            "slots": 16,
+            "queue": 128,
+            "workers": 1,
+        },
+    }
+    """
+    Lanes (traffic classes) and their budgets, routes pick their lane in routers.
+
+    auth: sign in and sign up, bcrypt runs in the lane's own threads. Two slots per
+    thread (one request hashes while the next loads its user) and a short queue:
+    a login storm waits in the lane queue, where it times out cleanly, not for bcrypt.
+    writes: writes of signed in users (items, profile updates).
+    reads: GET routes, their sessions use the read-only pool.
+
+    Slots of auth and writes share the writer pool: keep their sum within its size
+    (pool_size + max_overflow of the engine profile) to guarantee both.
+    """
+
+    # Diagnostics
+    DEBUG_TOKEN: str = os.getenv('DEBUG_TOKEN')     # Token for /debug endpoints (disabled if not set)
+    QUERY_PROFILER_ENABLED: bool = os.getenv('QUERY_PROFILER_ENABLED', '1') == '1'   # Server-Timing and /debug/queries
+    LOOP_WATCHDOG_THRESHOLD_MS: float = float(os.getenv('LOOP_WATCHDOG_THRESHOLD_MS', '100'))   # Reported event loop stall (0 = off)
+    MEMORY_PROFILER_ENABLED: bool = os.getenv('MEMORY_PROFILER_ENABLED', '0') == '1'   # tracemalloc per route, /debug/memory
+    MEMORY_PROFILER_FRAMES: int = int(os.getenv('MEMORY_PROFILER_FRAMES', '1'))   # Stack frames per allocation
+    PROFILER_INTERVAL_MS: float = float(os.getenv('PROFILER_INTERVAL_MS', '10'))   # Sampling interval of /debug/profile
+    PROFILER_CONTINUOUS_ENABLED: bool = os.getenv('PROFILER_CONTINUOUS_ENABLED', '0') == '1'   # Always-on thread sampling
+    PROFILER_CONTINUOUS_INTERVAL_MS: float = float(os.getenv('PROFILER_CONTINUOUS_INTERVAL_MS', '100'))   # Its sampling interval
+    PROFILER_CONTINUOUS_WINDOW_SECONDS: float = float(os.getenv('PROFILER_CONTINUOUS_WINDOW_SECONDS', '60'))   # 10 last windows are kept
+    METRICS_ENABLED: bool = os.getenv('METRICS_ENABLED', '1') == '1'   # Prometheus metrics at /metrics
+    METRICS_TOKEN: str = os.getenv('METRICS_TOKEN', '')     # Bearer token required by /metrics (open if empty)
+    TRACE_SAMPLE_RATE: float = float(os.getenv('TRACE_SAMPLE_RATE', '0'))   # Share of traced requests (0 = tracing off)
+    TRACE_EXPORT_PATH: str = os.getenv('TRACE_EXPORT_PATH', '')     # JSONL file for traces (empty = tracing off)
+    TRACE_EXPORT_MAX_MB: float = float(os.getenv('TRACE_EXPORT_MAX_MB', '100'))   # Trace file is rotated at this size
+    TRACE_EXPORT_BACKUPS: int = int(os.getenv('TRACE_EXPORT_BACKUPS', '3'))   # Rotated trace files kept (<path>.1 ... .N)
+
 # Create settings instance for import in other modules
 settings = Settings()  
 
 
+ENGINE_PROFILE_OVERRIDES = {
+    "pool_size": ("DB_POOL_SIZE", int),
+    "max_overflow": ("DB_MAX_OVERFLOW", int),
+    "pool_timeout": ("DB_POOL_TIMEOUT", float),
+    "pool_recycle": ("DB_POOL_RECYCLE", int),
+    "pre_ping": ("DB_PRE_PING", str),
+    "pre_ping_idle_seconds": ("DB_PRE_PING_IDLE_SECONDS", float),
+    "compiled_cache_size": ("DB_COMPILED_CACHE_SIZE", int),
+    "statement_cache_size": ("DB_STATEMENT_CACHE_SIZE", int),
+    "connect_timeout": ("DB_CONNECT_TIMEOUT", float),
+    "command_timeout": ("DB_COMMAND_TIMEOUT", float),
+    "single_writer": ("DB_SINGLE_WRITER", lambda value: value == "1"),
+}
+"""
+Environment variables overriding values of selected profile: profile key -> (variable, type).
+"""
+
+
+def get_engine_profile():
+    """
+    Returns engine profile selected by DB_PROFILE with overrides applied.
+    Used in database.py to create engines.
+
+    :return: Dictionary with profile "name", database "url" and pool/driver settings
+    :raises ValueError: If DB_PROFILE or pre_ping value is unknown
+    """
+    if settings.DB_PROFILE not in Settings.ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{settings.DB_PROFILE}', "
+                         f"expected one of: {', '.join(Settings.ENGINE_PROFILES)}")
+
+    profile = dict(Settings.ENGINE_PROFILES[settings.DB_PROFILE])
+    for key, (variable, cast) in ENGINE_PROFILE_OVERRIDES.items():
+        value = os.getenv(variable)
+        if value:
+            profile[key] = cast(value)
+
+    if profile["pre_ping"] not in ("always", "idle", "never"):
+        raise ValueError(f"Unknown pre_ping '{profile['pre_ping']}', expected always, idle or never")
+
+    profile["name"] = settings.DB_PROFILE
+    profile["url"] = getattr(settings, profile["url"])
+
+    return profile
+
+
 def get_auth_data():
     """
     Returns data for JWT authentication.
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import shutil
+import tempfile
+
+import pytest
+
+"""
+Shared setup of root-level checks, loaded by pytest before any check module.
+
+Settings are read once per process (when config is imported), so the environment
+of all checks is set here, before a check imports the app:
+- one SQLite database and invalidation bus sockets in a private temporary directory,
+  removed when the run ends
+- no cache snapshots and no warm-up: results must not depend on the environment
+
+Checks needing other settings (sharding, engine profiles) run the app in a subprocess
+with their own environment.
+
+Fixtures:
+- database: empty tables and caches for one check, the check seeds what it needs
+
+Options:
+- --benchmark: also run wall-clock benchmarks (checks marked "benchmark")
+
+Run all checks:  pytest -s
+"""
+
+TEST_DIRECTORY = tempfile.mkdtemp(prefix="fastapi_preset_checks_")    # Mode 0700
+DB_PATH = os.path.join(TEST_DIRECTORY, "checks.db")
+
+os.environ["DATABASE_URL_POSTGRE"] = f"sqlite+aiosqlite:///{DB_PATH}"
+os.environ["CACHE_SNAPSHOT_PATH"] = ""
+os.environ["CACHE_BUS_SOCKET_DIR"] = os.path.join(TEST_DIRECTORY, "cache_bus")
+os.environ["WARMUP_ENABLED"] = "0"
+os.environ.setdefault("SECRET_KEY", "checks-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from database import models  # Registers tables on Base before the first check imports them
+from database.database import Base, engine, get_engines
+from services.cache_services import CacheService
+
+
+async def dispose_engines() -> None:
+    """Close pooled connections: they belong to the event loop of the check that opened them"""
+    for db_engine in get_engines().values():
+        await db_engine.dispose()
+
+
+async def reset_database() -> None:
+    """Drop and create all tables of the test database"""
+    await dispose_engines()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await dispose_engines()
+
+
+@pytest.fixture
+def database() -> str:
+    """
+    Empty test database and caches for one check.
+
+    :return: Path of the SQLite database file
+    """
+    asyncio.run(reset_database())
+    CacheService.clear()
+    yield DB_PATH
+    CacheService.clear()
+    asyncio.run(dispose_engines())
+
+
+def pytest_addoption(parser) -> None:
+    parser.addoption("--benchmark", action="store_true", help="Also run wall-clock benchmarks")
+
+
+def pytest_configure(config) -> None:
+    config.addinivalue_line("markers", "benchmark: wall-clock benchmark, runs only with --benchmark")
+
+
+def pytest_collection_modifyitems(config, items) -> None:
+    if config.getoption("--benchmark"):
+        return
+
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session, exitstatus) -> None:
+    shutil.rmtree(TEST_DIRECTORY, ignore_errors=True)
@@ -1,9 +1,12 @@
 from fastapi import Depends
 from dataclasses import dataclass
+from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from database import models, schema, response_schemas
-from database.database import get_db
+from database.database import get_db, get_read_db
+from helpers.query_profiler_helper import QueryProfile, get_current_profile
+from helpers.tracing_helper import get_current_trace_id
 from repository.user_repository import get_current_user
 
 # TODO: Think about how to improve that
@@ -33,6 +36,8 @@ class RequestContext:
     Attributes:
         db (AsyncSession): Async database session
         current_user (schema.User): Current authenticated user
+        query_profile (QueryProfile): SQL statistics of this request (None if profiler is disabled)
+        trace_id (str): Trace of this request (None if request is not sampled)
     
     Future extensibility - easily add:
         - logger: logging.Logger
@@ -42,6 +47,8 @@ class RequestContext:
     """
     db: AsyncSession
     current_user: any
+    query_profile: Optional[QueryProfile] = None
+    trace_id: Optional[str] = None
 
 async def get_request_context(db: AsyncSession = Depends(get_db),
                               current_user: any = Depends(get_current_user)) -> RequestContext:
@@ -58,4 +65,26 @@ async def get_request_context(db: AsyncSession = Depends(get_db),
     Returns:
         RequestContext: Context with initialized dependencies
     """
-    return RequestContext(db=db, current_user=current_user)
\ No newline at end of file
+    return RequestContext(db=db, 
+                          current_user=current_user, 
+                          query_profile=get_current_profile(),
+                          trace_id=get_current_trace_id())
+
+
+async def get_read_request_context(db: AsyncSession = Depends(get_read_db),
+                                   current_user: any = Depends(get_current_user)) -> RequestContext:
+    """
+    Same as get_request_context, but with read-only database session (see get_read_db).
+    Use in GET routes, any write through its session fails.
+    
+    Args:
+        db: Read-only database session (automatically injected)
+        current_user: Current user (automatically injected)
+    
+    Returns:
+        RequestContext: Context with initialized dependencies
+    """
+    return RequestContext(db=db,
+                          current_user=current_user,
+                          query_profile=get_current_profile(),
+                          trace_id=get_current_trace_id())
@@ -1,35 +1,366 @@
+import functools
+import inspect
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 
-from config import settings
+from config import settings, get_engine_profile
+from helpers import metrics_helper
+from services.replica_services import ReplicaRouter
+from services.shard_services import ShardRouter
 
 load_dotenv()
 
 """
 Database management module.
 Supports both SQLite (for development) and PostgreSQL (for production).
+
+Database and pool settings come from engine profile selected by DB_PROFILE
+(see Settings.ENGINE_PROFILES): dev, prod-pg, prod-sqlite. Every engine
+(primary, read-only, replicas) is created by create_profiled_engine().
+Live pool statistics: /debug/pool and db_pool_* metrics.
+
+SQLite in production (prod-sqlite): WAL journal, synchronous=NORMAL, page cache
+and memory map set on every connection; reads use a pool of query_only
+connections, writes queue for one writer connection.
+
+Connections are held as short as possible:
+- session checks out a pool connection only on first statement
+  (routes that never query don't touch the pool)
+- functions decorated with @release_connection return it to pool when they finish,
+  before the response is validated and encoded
+Time a connection is checked out is measured in db_connection_hold_seconds.
+
+GET routes use read-only sessions (get_read_db): READ ONLY transactions on
+PostgreSQL, separate query_only connection pool on SQLite. With read replicas
+configured, read-only sessions are routed between them (see ReplicaRouter).
+
+Sharding (DATABASE_SHARD_URLS): users and their items live on N shard databases,
+sessions route every statement by user ID (see ShardRouter). Primary database
+keeps only shard_id_blocks and the cache invalidation bus.
 """
 
-# SQLITE (uncomment to use SQLite)
-# SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+# Engine profile (DB_PROFILE): database URL, pool size, pre-ping, caches and timeouts
+ENGINE_PROFILE = get_engine_profile()
+SQLALCHEMY_DATABASE_URL = ENGINE_PROFILE["url"]
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool with live statistics (/debug/pool, /metrics):
+    time waiting for a connection (db_pool_wait_seconds), time a connection
+    is checked out (db_connection_hold_seconds), checkouts and timeouts.
+    """
+
+    # Logs under the stock pool's logger: quiet by default (sqlalchemy is at WARNING), follows echo_pool
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = {
+            "checkouts": 0,
+            "timeouts": 0,  # Checkouts that waited longer than pool_timeout
+            "pings": 0,
+            "ping_failures": 0,     # Dead connections replaced on checkout
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "hold_seconds_total": 0.0,
+            "hold_seconds_max": 0.0,
+        }
+
+    def _observe(self, name: str, seconds: float, histogram) -> None:
+        histogram.observe(seconds)
+        self.stats[f"{name}_seconds_total"] += seconds
+        self.stats[f"{name}_seconds_max"] = max(self.stats[f"{name}_seconds_max"], seconds)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        finally:
+            self._observe("wait", time.perf_counter() - started, metrics_helper.POOL_WAIT)
+
+        self.stats["checkouts"] += 1
+        record.info["checked_out_at"] = time.perf_counter()
+        return record
+
+    def _do_return_conn(self, record):
+        now = time.perf_counter()
+        checked_out_at = record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            self._observe("hold", now - checked_out_at, metrics_helper.POOL_HOLD)
+
+        record.info["checked_in_at"] = now     # For "idle" pre-ping
+        super()._do_return_conn(record)
+
+
+def get_engine_kwargs(url: str, writer: bool = False) -> Dict[str, Any]:
+    """
+    Translate ENGINE_PROFILE to create_async_engine() arguments for driver of url.
+
+    :param url: Async database URL
+    :param writer: Engine of get_db sessions (single connection on SQLite with single_writer)
+    :return: Keyword arguments for create_async_engine()
+    """
+    kwargs = {
+        "poolclass": InstrumentedQueuePool,    # Same as default pool, plus live statistics
+        "echo": settings.SQL_ECHO,  # Log every statement (development only, see SLOW_QUERY_MS for production)
+        "future": True,     # Use new SQLAlchemy 2.0 features
+        "pool_size": ENGINE_PROFILE["pool_size"],
+        "max_overflow": ENGINE_PROFILE["max_overflow"],
+        "pool_timeout": ENGINE_PROFILE["pool_timeout"],
+        "pool_recycle": ENGINE_PROFILE["pool_recycle"],
+        "pool_pre_ping": ENGINE_PROFILE["pre_ping"] == "always",   # "idle" is handled by _install_idle_ping
+        "query_cache_size": ENGINE_PROFILE["compiled_cache_size"],
+    }
+
+    backend = make_url(url).get_backend_name()
+    if writer and backend == "sqlite" and ENGINE_PROFILE["single_writer"]:
+        # SQLite allows one writer at a time: writes wait in pool queue, not on database lock
+        kwargs["pool_size"] = 1
+        kwargs["max_overflow"] = 0
+
+    if backend == "postgresql":
+        kwargs["connect_args"] = {
+            "timeout": ENGINE_PROFILE["connect_timeout"],
+            "command_timeout": ENGINE_PROFILE["command_timeout"],
+            "prepared_statement_cache_size": ENGINE_PROFILE["statement_cache_size"],
+        }
+
+    return kwargs
+
+
+def _install_idle_ping(async_engine) -> None:
+    """
+    "idle" pre-ping: ping only connections that were unused for pre_ping_idle_seconds.
+    Recently used connections are trusted, a dead one is replaced and the checkout retried.
+    """
+    idle_seconds = ENGINE_PROFILE["pre_ping_idle_seconds"]
+    dialect = async_engine.dialect
+
+    def ping_idle_connection(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.perf_counter() - checked_in_at < idle_seconds:
+            return
+
+        stats = async_engine.pool.stats
+        stats["pings"] += 1
+        try:
+            dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            stats["ping_failures"] += 1
+            raise exc.DisconnectionError(f"Idle connection is dead: {type(e).__name__}") from e
+
+    event.listen(async_engine.sync_engine, "checkout", ping_idle_connection)
+
+
+def _make_pragmas_setter(pragmas: Dict[str, Any]):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return set_pragmas
+
+
+def create_profiled_engine(url: str, writer: bool = False):
+    """
+    Create engine configured by ENGINE_PROFILE.
+
+    :param url: Async database URL
+    :param writer: Engine of get_db sessions (see get_engine_kwargs)
+    :return: Async engine
+    """
+    profiled_engine = create_async_engine(url, **get_engine_kwargs(url, writer=writer))
+    if ENGINE_PROFILE["pre_ping"] == "idle":
+        _install_idle_ping(profiled_engine)
+
+    if profiled_engine.dialect.name == "sqlite" and ENGINE_PROFILE["sqlite_pragmas"]:
+        # Registered first: runs before PRAGMA query_only of read-only engines
+        event.listen(profiled_engine.sync_engine, "connect", _make_pragmas_setter(ENGINE_PROFILE["sqlite_pragmas"]))
+
+    return profiled_engine
+
+
+# Create async database engine (writes; single connection with prod-sqlite)
+engine = create_profiled_engine(SQLALCHEMY_DATABASE_URL, writer=True)
+
+def _set_query_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only = ON")    # Any write fails with "attempt to write a readonly database"
+    cursor.close()
+
+
+def create_read_engine(url: str):
+    """
+    Create engine with its own pool for read-only work (primary reads or replica).
+
+    - SQLite: every connection runs PRAGMA query_only
+    - PostgreSQL: transactions are started as "BEGIN ISOLATION LEVEL READ COMMITTED READ ONLY"
+
+    :param url: Async database URL
+    :return: Async engine
+    """
+    read_only_engine = create_profiled_engine(url)
+
+    if read_only_engine.dialect.name == "sqlite":
+        event.listen(read_only_engine.sync_engine, "connect", _set_query_only)
+        return read_only_engine
 
-# PostgreSQL (recommended for production)
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL_POSTGRE
+    return read_only_engine.execution_options(isolation_level="READ COMMITTED", postgresql_readonly=True)
+
+
+def get_read_engine(write_engine, url: str):
+    """
+    Get read-only engine of a database for GET routes (see get_read_db).
+
+    :param write_engine: Engine of database used for writes
+    :param url: Async database URL
+    :return: Own pool on SQLite (readers never occupy writer's connections),
+             same pool with READ ONLY transactions on PostgreSQL
+    """
+    if write_engine.dialect.name == "sqlite":
+        return create_read_engine(url)
+
+    return write_engine.execution_options(isolation_level="READ COMMITTED",
+                                          postgresql_readonly=True)
+
+
+# Read-only engine of primary for GET routes (see get_read_db)
+read_engine = get_read_engine(engine, SQLALCHEMY_DATABASE_URL)
+
+# Read replicas (DATABASE_REPLICA_URLS), read-only sessions are routed between them
+replica_engines = {f"replica_{number}": create_read_engine(url)
+                   for number, url in enumerate(settings.DATABASE_REPLICA_URLS)}
+ReplicaRouter.configure(primary=read_engine, replicas=replica_engines, window=settings.READ_YOUR_WRITES_SECONDS)
+
+# Shards (DATABASE_SHARD_URLS): users with their items, statements are routed by user ID
+shard_engines = {f"shard_{number}": create_profiled_engine(url, writer=True)
+                 for number, url in enumerate(settings.DATABASE_SHARD_URLS)}
+shard_read_engines = {name: get_read_engine(shard_engine, url)
+                      for (name, shard_engine), url in zip(shard_engines.items(), settings.DATABASE_SHARD_URLS)}
+if shard_engines:
+    ShardRouter.configure(shards=shard_engines,
+                          read_shards=shard_read_engines,
+                          routing=settings.SHARD_ROUTING,
+                          ranges=settings.SHARD_RANGES,
+                          directory=engine,
+                          block_size=settings.SHARD_ID_BLOCK_SIZE)
+
+
+def get_engines():
+    """
+    Get engines with their own connection pools, for instrumentation (metrics, tracing, profilers).
+
+    :return: Dictionary pool name -> async engine
+    """
+    engines = {"primary": engine}
+    if read_engine.sync_engine.pool is not engine.sync_engine.pool:
+        engines["read"] = read_engine
+    engines.update(replica_engines)
+    for name, shard_engine in shard_engines.items():
+        engines[name] = shard_engine
+        if shard_read_engines[name].sync_engine.pool is not shard_engine.sync_engine.pool:
+            engines[f"{name}_read"] = shard_read_engines[name]
+
+    return engines
+
+
+def get_sharded_session_options(engines: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Session factory arguments routing statements between shards (see ShardRouter).
+
+    :param engines: Dictionary shard name -> async engine
+    :return: Keyword arguments for async_sessionmaker()
+    """
+    return {
+        "sync_session_class": ShardedSession,
+        "shards": {name: shard_engine.sync_engine for name, shard_engine in engines.items()},
+        "shard_chooser": ShardRouter.shard_chooser,
+        "identity_chooser": ShardRouter.identity_chooser,
+        "execute_chooser": ShardRouter.execute_chooser,
+    }
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Get engine profile and live statistics of every pool (/debug/pool).
+
+    :return: Profile settings (without URL) and per pool: connections by state,
+             checkouts, timeouts, pings, average and maximal wait / hold time
+    """
+    pools = {}
+    for name, pool_engine in get_engines().items():
+        pool = pool_engine.pool
+        stats = getattr(pool, "stats", None)
+        if stats is None:
+            continue
+
+        checkouts = stats["checkouts"] or 1
+        pools[name] = {
+            "size": pool.size(),
+            "limit": pool.size() + pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),    # Negative while pool isn't full
+            "checkouts": stats["checkouts"],
+            "timeouts": stats["timeouts"],
+            "pings": stats["pings"],
+            "ping_failures": stats["ping_failures"],
+            "wait_ms_avg": round(stats["wait_seconds_total"] / checkouts * 1000, 3),
+            "wait_ms_max": round(stats["wait_seconds_max"] * 1000, 3),
+            "hold_ms_avg": round(stats["hold_seconds_total"] / checkouts * 1000, 3),
+            "hold_ms_max": round(stats["hold_seconds_max"] * 1000, 3),
+        }
+
+    return {
+        "profile": {key: value for key, value in ENGINE_PROFILE.items() if key != "url"},
+        "pools": pools,
+    }
+
+
+class RoutingSession(Session):
+    """
+    Session of ReadSessionLocal: reads from engine chosen by ReplicaRouter
+    (replica or primary), the same one for the whole session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        bind = self.info.get("read_engine")
+        if bind is None:
+            bind = self.info["read_engine"] = ReplicaRouter.choose()
+
+        return bind.sync_engine
 
-# Create async database engine
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    echo=True,  # SQL query logging (disable in production)
-    future=True,     # Use new SQLAlchemy 2.0 features
-    pool_pre_ping=True,  # Check connection before use  
-    pool_recycle=300,    # Reconnect every 300 seconds
-)
 
 # Create async session factory
 SessionLocal = async_sessionmaker(autocommit=False,  # Autocommit disabled for explicit transaction management
                                   autoflush=False,  # Autoflush disabled
-                                  bind=engine)  # Bind to created engine
+                                  expire_on_commit=False,   # Written objects stay readable after (batch) commit
+                                  # Bind to created engine, or route between shards
+                                  **(get_sharded_session_options(shard_engines) if shard_engines else {"bind": engine}))
+
+# Session factory for read-only work: never commits, so objects are never expired
+ReadSessionLocal = async_sessionmaker(autoflush=False,  # Nothing to flush
+                                      expire_on_commit=False,
+                                      # Replica or primary, or read-only engines of shards
+                                      **(get_sharded_session_options(shard_read_engines) if shard_engines
+                                         else {"sync_session_class": RoutingSession}))
+
+# Writes of request send its author's next reads to primary (read-your-writes)
+event.listen(Session, "after_commit", ReplicaRouter.on_commit)
 
 # Base class for all SQLAlchemy models
 Base = declarative_base()
@@ -39,6 +370,8 @@ async def get_db():
     Dependency for getting database session.
     Used in Depends() to inject session into routes.
     
+    Session is lazy: pool connection is checked out on first statement,
+    not here. Don't declare this dependency in routes that never query.
     Ensures proper session closure after request completion.
     """
     async with SessionLocal() as db:
@@ -46,3 +379,48 @@ async def get_db():
             yield db    # Provide session for use
         finally:
             await db.close()    # Always close session
+
+
+async def get_read_db():
+    """
+    Dependency for getting read-only database session (GET routes).
+
+    - PostgreSQL: READ ONLY transaction with READ COMMITTED isolation
+    - SQLite: separate pool of connections with PRAGMA query_only
+    - With replicas: healthy replica, or primary for recent writers (see ReplicaRouter)
+
+    Session is never committed, its transaction is rolled back on close.
+    Any write through it fails, use get_db for routes that write.
+    """
+    async with ReadSessionLocal() as db:
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+def release_connection(func):
+    """
+    Decorator for repository functions: return session's connection to pool
+    as soon as function finishes (or raises).
+
+    Session is closed, not discarded: its transaction is ended (call commit()
+    before returning to keep changes), loaded objects are detached and
+    the next statement in the same request checks out a connection again.
+    Build response models inside decorated function, not from ORM objects after it.
+
+    :param func: Async function with "db" parameter
+    :return: Wrapped function
+    """
+    position = list(inspect.signature(func).parameters).index("db")
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        db = kwargs["db"] if "db" in kwargs else args[position] if position < len(args) else None
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            if isinstance(db, AsyncSession):
+                await db.close()
+
+    return wrapper
@@ -1,5 +1,5 @@
 from typing import List
-from sqlalchemy import String, ForeignKey, Column, Integer
+from sqlalchemy import String, ForeignKey, Column, Integer, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database.database import Base
@@ -35,6 +35,12 @@ class Item(Base):
     But user cannot create an item with the same name as another of THEIR items.
     """
     __tablename__ = 'item'
+    __table_args__ = (
+        # Serves items of user (user_id), items loaded with users (user_id IN ...)
+        # and per-user name lookups / uniqueness checks (user_id, name)
+        Index('ix_item_user_id_name', 'user_id', 'name'),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String, nullable=False)    # Item name (not unique)
     description: Mapped[str] = mapped_column(String, 
@@ -47,4 +53,15 @@ class Item(Base):
         "User",
         back_populates="item",  # Back reference
         lazy="selectin" # Load user with item
-    )
\ No newline at end of file
+    )
+
+class ShardIdBlock(Base):
+    """
+    Block of IDs taken by a worker for new rows on shards (see ShardRouter.allocate_id).
+    Block number N holds IDs N * SHARD_ID_BLOCK_SIZE ... (N + 1) * SHARD_ID_BLOCK_SIZE - 1.
+    Used only in primary database with sharding.
+    """
+    __tablename__ = 'shard_id_blocks'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)   # Block number
+    entity: Mapped[str] = mapped_column(String, nullable=False)     # Table the block was taken for
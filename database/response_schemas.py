@@ -102,6 +102,7 @@ class UserResponse(BaseModel):
     - email: User's email address
     
     Use when you need user data without nested item information.
+    Frozen: cached instances are shared by all requests (see CacheService).
     """
     id: int
     name: str
@@ -110,6 +111,7 @@ class UserResponse(BaseModel):
 
     class Config:
         from_attributes = True
+        frozen = True
 
 class CurrentUserResponse(UserResponse):
     """
@@ -136,6 +138,7 @@ class ItemResponse(BaseModel):
     - user_id: ID of the user who owns this item
     
     Use when you need item data without nested user information.
+    Frozen: cached instances are shared by all requests (see CacheService).
     """
     id: int
     name: str
@@ -144,6 +147,7 @@ class ItemResponse(BaseModel):
     
     class Config:
         from_attributes = True
+        frozen = True
 
 
 # Composite schemas (with relationships)
@@ -181,6 +185,18 @@ class ItemWithUserResponse(ItemResponse):
     """
     user_name: str
     user_email: str
+
+
+class AvailabilityResponse(BaseModel):
+    """
+    Schema for username/email availability check.
+    
+    Fields:
+    - name: True if username is free, None if it wasn't checked
+    - email: True if email is free, None if it wasn't checked
+    """
+    name: Optional[bool] = None
+    email: Optional[bool] = None
     
 
 # Response type aliases for better readability in route annotations
@@ -200,6 +216,9 @@ UserLoginResponse = DataResponse[CurrentUserResponse]
 UserWithItemsDataResponse = DataResponse[UserWithItemsResponse]
 """Response type for user retrieval with items"""
 
+UserAvailabilityResponse = DataResponse[AvailabilityResponse]
+"""Response type for username/email availability check"""
+
 # Items
 ItemCreateResponse = DataResponse[ItemResponse]
 """Response type for item creation endpoints"""
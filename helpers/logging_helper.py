@@ -0,0 +1,160 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+
+from helpers.tracing_helper import get_current_trace_id
+
+"""
+Structured logging pipeline.
+
+Request path only puts log records into a queue; formatting (JSON or text)
+and writing happen in a background thread (QueueListener):
+
+    logger.info(...) -> level check -> sampling -> queue.put()  |  writer thread: format + write
+
+Level gating: disabled levels are rejected by logger.isEnabledFor() before
+any record is created (cached by logging), so logger.debug() in hot paths is
+nearly free in production.
+
+Sampling: high-frequency events pass sample_rate in extra:
+
+    logger.info("Token has expired", extra={"sample_rate": 0.1})
+
+Only every 10th such record (per logger and message) is written,
+written records carry "sampled": 10 so counts can be restored.
+
+Extra fields become JSON keys. Pass immutable values in args/extra:
+records are formatted later, in the writer thread.
+"""
+
+# Attributes of every LogRecord, everything else on a record is user "extra"
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {
+    "message", "asctime", "sample_rate", "sampled", "trace_id", "taskName"
+}
+
+_listener: Optional[QueueListener] = None
+_previous_root: Optional[Tuple[List[logging.Handler], int]] = None    # Root handlers and level before setup_logging
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 of every round(1 / sample_rate) records with the same logger and message.
+    Records without sample_rate always pass.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._counters: Dict[Tuple[str, str], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        if rate is None or rate >= 1:
+            return True
+
+        every = max(1, round(1 / rate)) if rate > 0 else 0
+        if every == 0:
+            return False
+
+        key = (record.name, record.msg)
+        count = self._counters.get(key, 0)
+        self._counters[key] = count + 1
+        if count % every:
+            return False
+
+        record.sampled = every
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Queue handler that only enqueues.
+    Standard QueueHandler formats the message in the calling thread,
+    this one leaves formatting to the writer thread and only attaches
+    request context (trace id) that is unavailable there.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.trace_id = get_current_trace_id()
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        if getattr(record, "sampled", None):
+            entry["sampled"] = record.sampled
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(level: str = "INFO", log_format: str = "json", levels: str = "") -> None:
+    """
+    Route all logging through queue to background writer thread.
+    Called on application startup, not on import: importing the application
+    (tests, scripts, other ASGI servers) leaves logging of the process alone.
+    Safe to call more than once (only the first call configures logging).
+
+    :param level: Root log level ("DEBUG", "INFO", "WARNING"...)
+    :param log_format: "json" (one object per line) or "text"
+    :param levels: Per-logger levels, e.g. "sqlalchemy.engine=INFO,helpers.token_helper=DEBUG"
+    """
+    global _listener, _previous_root
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    if log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = ContextQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    _previous_root = (root.handlers, root.level)
+    root.handlers = [handler]
+    root.setLevel(level.upper())
+
+    for rule in filter(None, (part.strip() for part in levels.split(","))):
+        name, _, logger_level = rule.partition("=")
+        logging.getLogger(name.strip()).setLevel(logger_level.strip().upper())
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Write queued records, stop background writer and give root logger its handlers back"""
+    global _listener, _previous_root
+    if _previous_root is not None:
+        root = logging.getLogger()
+        root.handlers, level = _previous_root
+        root.setLevel(level)
+        _previous_root = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
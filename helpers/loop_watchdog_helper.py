@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from helpers import metrics_helper
+
+logger = logging.getLogger(__name__)
+
+"""
+Event loop blocking detector.
+
+Any synchronous work inside a coroutine (CPU heavy code, blocking I/O,
+time.sleep, sync bcrypt...) stops the whole worker: no other request
+makes progress until it returns.
+
+Detection:
+- heartbeat task on the event loop updates a timestamp every interval
+- watchdog thread checks the timestamp; if it is older than threshold,
+  loop is stalled and the watchdog captures stack of the loop thread,
+  which shows the exact blocking line
+- when heartbeat runs again, stall duration is recorded
+
+Every offender (innermost project frame of the stack) is counted and logged.
+Stalls are listed at /debug/loop_stalls and counted in /metrics.
+"""
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+STALLS = metrics_helper.Counter("event_loop_stalls_total", "Event loop stalls longer than watchdog threshold")
+
+
+class LoopBlockedError(AssertionError):
+    """Raised by LoopWatchdog.strict() when event loop was blocked longer than allowed"""
+
+
+class LoopWatchdog:
+    """
+    Watchdog of one event loop (one per worker process).
+
+    Class-level state, like other services of this app:
+    started once on startup with start(), stopped on shutdown with stop().
+    """
+
+    threshold: float = 0.1
+    offenders: Counter = Counter()
+    recent: Deque[Dict[str, Any]] = deque(maxlen=100)
+    max_stall: float = 0.0
+
+    _interval: float = 0.05
+    _last_beat: float = 0.0
+    _loop_thread_id: Optional[int] = None
+    _heartbeat_task: Optional[asyncio.Task] = None
+    _thread: Optional[threading.Thread] = None
+    _stop: threading.Event = threading.Event()
+    _captured: Optional[Dict[str, Any]] = None    # Stack of current stall (captured by watchdog thread)
+    _strict_sessions: List[List[Dict[str, Any]]] = []
+
+    @classmethod
+    def start(cls, threshold: float) -> None:
+        """
+        Start heartbeat on current event loop and watchdog thread.
+
+        :param threshold: Stall duration (seconds) that is reported
+        """
+        if cls._thread is not None:
+            return
+
+        cls.threshold = threshold
+        cls._interval = min(threshold / 2, 0.05)
+        cls._loop_thread_id = threading.get_ident()
+        cls._last_beat = time.monotonic()
+        cls._stop.clear()
+
+        cls._heartbeat_task = asyncio.create_task(cls._heartbeat())
+        cls._thread = threading.Thread(target=cls._watch, name="loop-watchdog", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls) -> None:
+        """Stop heartbeat and watchdog thread"""
+        cls._stop.set()
+        if cls._heartbeat_task is not None:
+            cls._heartbeat_task.cancel()
+            cls._heartbeat_task = None
+        if cls._thread is not None:
+            cls._thread.join(timeout=1)
+            cls._thread = None
+
+    @classmethod
+    async def _heartbeat(cls) -> None:
+        while True:
+            before = time.monotonic()
+            cls._last_beat = before
+            await asyncio.sleep(cls._interval)
+
+            stall = time.monotonic() - before - cls._interval
+            if stall > cls.threshold:
+                cls._record(stall)
+
+    @classmethod
+    def _watch(cls) -> None:
+        """Watchdog thread: capture loop thread stack while it is stalled"""
+        reported_beat = None
+        while not cls._stop.wait(cls.threshold / 2):
+            beat = cls._last_beat
+            if beat == reported_beat or time.monotonic() - beat - cls._interval <= cls.threshold:
+                continue
+
+            frame = sys._current_frames().get(cls._loop_thread_id)
+            if frame is None:
+                continue
+
+            stack = traceback.extract_stack(frame)
+            cls._captured = {"offender": cls._find_offender(stack),
+                             "stack": "".join(traceback.format_list(stack))}
+            reported_beat = beat
+            del frame
+
+    @staticmethod
+    def _find_offender(stack: traceback.StackSummary) -> str:
+        """Innermost frame of project code (outside this module), or innermost frame"""
+        for summary in reversed(stack):
+            if summary.filename.startswith(_PROJECT_ROOT) and summary.filename != __file__:
+                path = summary.filename[len(_PROJECT_ROOT):]
+                return f"{path}:{summary.lineno} in {summary.name}"
+
+        summary = stack[-1]
+        return f"{summary.filename}:{summary.lineno} in {summary.name}"
+
+    @classmethod
+    def _record(cls, stall: float) -> None:
+        """Called on event loop after stall ended"""
+        captured, cls._captured = cls._captured, None
+        offender = captured["offender"] if captured else "<stack not captured>"
+
+        record = {
+            "duration_ms": round(stall * 1000, 1),
+            "offender": offender,
+            "stack": captured["stack"] if captured else None,
+            "at": time.time(),
+        }
+        cls.offenders[offender] += 1
+        cls.recent.append(record)
+        cls.max_stall = max(cls.max_stall, stall)
+        STALLS.inc()
+
+        for session in cls._strict_sessions:
+            session.append(record)
+
+        logger.warning("Event loop blocked for %.1f ms by %s\n%s",
+                       stall * 1000, offender, record["stack"] or "")
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get stall statistics.
+
+        :return: Threshold, number of stalls, longest stall, offenders and recent stalls
+        """
+        return {
+            "threshold_ms": cls.threshold * 1000,
+            "stalls": sum(cls.offenders.values()),
+            "max_stall_ms": round(cls.max_stall * 1000, 1),
+            "offenders": dict(cls.offenders.most_common()),
+            "recent": list(cls.recent),
+        }
+
+    @classmethod
+    def reset(cls) -> None:
+        """Clear stall statistics"""
+        cls.offenders.clear()
+        cls.recent.clear()
+        cls.max_stall = 0.0
+
+    @classmethod
+    @contextmanager
+    def strict(cls, max_ms: Optional[float] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Test mode: fail if event loop is blocked longer than max_ms inside the block.
+        Use from test thread (e.g. around TestClient requests), not from the event loop.
+        Only stalls longer than watchdog threshold are recorded, so max_ms below it has no effect.
+
+            with LoopWatchdog.strict(max_ms=200):
+                client.post("/api/v1/users/sign_up", json=...)
+
+        :param max_ms: Allowed stall in milliseconds (default: watchdog threshold)
+        :return: List of stalls recorded inside the block
+        :raises LoopBlockedError: If any stall was longer than max_ms
+        """
+        limit = (max_ms / 1000) if max_ms is not None else cls.threshold
+        session: List[Dict[str, Any]] = []
+        cls._strict_sessions.append(session)
+        try:
+            yield session
+            # Stall is recorded by heartbeat when it ends, give it time to run
+            if threading.get_ident() != cls._loop_thread_id and cls._heartbeat_task is not None:
+                time.sleep(cls._interval * 2)
+        finally:
+            cls._strict_sessions.remove(session)
+
+        blocked = [record for record in session if record["duration_ms"] > limit * 1000]
+        if blocked:
+            details = "\n".join(f"{record['duration_ms']} ms by {record['offender']}\n{record['stack'] or ''}"
+                                for record in blocked)
+            raise LoopBlockedError(f"Event loop was blocked longer than {limit * 1000:.0f} ms:\n{details}")
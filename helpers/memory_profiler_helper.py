@@ -0,0 +1,159 @@
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+"""
+Opt-in memory profiler based on tracemalloc.
+
+Records for every route:
+- net allocations: memory still allocated after request (caches, leaks)
+- peak allocations: highest memory use above start of request
+  (ORM objects + pydantic models + JSON alive at the same time)
+
+tracemalloc counts memory of the whole process, so values are exact
+only while one request runs at a time (benchmarks, debugging).
+Under concurrent load they are upper bounds: peak is reset only when
+no other request is in flight.
+
+Snapshot diffs (/debug/memory/diff) show which source lines allocated
+memory since the baseline snapshot.
+"""
+
+# route -> aggregated statistics
+_route_stats: Dict[str, Dict[str, Any]] = {}
+
+_baseline: Optional[tracemalloc.Snapshot] = None
+_in_flight = 0
+
+# Frames of profiler itself and import machinery are noise in diffs
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def start(frames: int = 1) -> None:
+    """
+    Start tracing allocations.
+    Slows allocations down noticeably, keep it off in normal production runs.
+
+    :param frames: Stack frames stored per allocation (more frames - better diffs, more overhead)
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop() -> None:
+    """Stop tracing allocations and drop baseline snapshot"""
+    global _baseline
+    _baseline = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def begin_request() -> int:
+    """
+    Start measuring request.
+
+    :return: Traced memory at start of request (pass to end_request)
+    """
+    global _in_flight
+    if _in_flight == 0:
+        tracemalloc.reset_peak()
+    _in_flight += 1
+
+    return tracemalloc.get_traced_memory()[0]
+
+
+def end_request(route: str, started_memory: int) -> None:
+    """
+    Finish measuring request and add it to route statistics.
+
+    :param route: Route name (see route_helper.get_route_name)
+    :param started_memory: Value returned by begin_request
+    """
+    global _in_flight
+    _in_flight -= 1
+
+    current, peak = tracemalloc.get_traced_memory()
+    net = current - started_memory
+    peak = max(0, peak - started_memory)
+
+    stats = _route_stats.get(route)
+    if stats is None:
+        stats = _route_stats[route] = {"requests": 0, "net_bytes": 0, "peak_bytes": 0, "max_peak_bytes": 0}
+
+    stats["requests"] += 1
+    stats["net_bytes"] += net
+    stats["peak_bytes"] += peak
+    stats["max_peak_bytes"] = max(stats["max_peak_bytes"], peak)
+
+
+def get_route_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get memory statistics aggregated per route with per-request averages.
+
+    :return: Dictionary route -> statistics
+    """
+    result = {}
+    for route, stats in _route_stats.items():
+        requests = stats["requests"]
+        result[route] = {
+            **stats,
+            "avg_net_bytes": round(stats["net_bytes"] / requests),
+            "avg_peak_bytes": round(stats["peak_bytes"] / requests),
+        }
+
+    return result
+
+
+def reset_route_stats() -> None:
+    """Clear statistics of all routes"""
+    _route_stats.clear()
+
+
+def get_traced_memory() -> Dict[str, int]:
+    """
+    Get memory allocated by Python since tracing started.
+
+    :return: Current and peak traced memory in bytes
+    """
+    current, peak = tracemalloc.get_traced_memory()
+
+    return {"current_bytes": current, "peak_bytes": peak}
+
+
+def take_baseline() -> int:
+    """
+    Remember current allocations, later diffs are computed against them.
+
+    :return: Number of traced memory blocks in snapshot
+    """
+    global _baseline
+    _baseline = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    return len(_baseline.traces)
+
+
+def diff_baseline(limit: int = 20, group_by: str = "lineno") -> List[Dict[str, Any]]:
+    """
+    Compare current allocations with baseline snapshot.
+
+    :param limit: Number of biggest differences to return
+    :param group_by: "lineno" (source line), "filename" or "traceback"
+    :return: Differences sorted by size, biggest first
+    :raises RuntimeError: If baseline wasn't taken
+    """
+    if _baseline is None:
+        raise RuntimeError("Baseline snapshot wasn't taken")
+
+    current = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    return [{
+        "location": str(stat.traceback) if group_by != "traceback" else stat.traceback.format(),
+        "size_diff_bytes": stat.size_diff,
+        "size_bytes": stat.size,
+        "count_diff": stat.count_diff,
+        "count": stat.count,
+    } for stat in current.compare_to(_baseline, group_by)[:limit]]
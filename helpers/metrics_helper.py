@@ -0,0 +1,270 @@
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+"""
+Built-in metrics in Prometheus text format (served at /metrics).
+
+Hot path is lock-free: metrics are updated only from the event loop thread,
+so plain dict and list operations are safe. Work done in executor threads
+is counted when its future completes, which also happens on the loop thread.
+
+Metric types:
+- Counter: value that only grows (requests count)
+- Gauge: value that goes up and down, or is collected on scrape (pool stats)
+- Histogram: distribution in fixed buckets (latency)
+"""
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+_installed: Dict[str, object] = {}    # Pool name -> engine of collectors registered by install
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonic counter, incremented from code or collected on scrape if collector is provided.
+    Collector returns dictionary label_values -> value.
+    """
+    type_name = "counter"
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 labels: Tuple[str, ...] = (),
+                 collector: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._collector = collector
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def _samples(self) -> List[str]:
+        values = self._collector() if self._collector is not None else self._values
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}"
+                for key, value in values.items()]
+
+
+class Gauge(Counter):
+    """
+    Gauge set from code, or collected on scrape if collector is provided.
+    Collector returns dictionary label_values -> value.
+    """
+    type_name = "gauge"
+
+    def set(self, value: float, *label_values: str) -> None:
+        self._values[label_values] = value
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) - amount
+
+
+class Histogram(_Metric):
+    """Histogram with fixed buckets"""
+    type_name = "histogram"
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = buckets
+        # label_values -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._values.get(label_values)
+        if series is None:
+            series = self._values[label_values] = [0] * (len(self.buckets) + 2)
+
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """
+    Render all registered metrics in Prometheus text format.
+
+    :return: Metrics text (content type "text/plain; version=0.0.4")
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+
+    return "\n".join(lines) + "\n"
+
+
+# Application metrics #
+REQUESTS = Counter("http_requests_total", "Number of HTTP requests", ("method", "route", "status"))
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Number of HTTP requests being handled")
+REQUESTS_IN_FLIGHT.set(0)
+
+POOL_WAIT = Histogram("db_pool_wait_seconds", "Time waiting for a connection from pool",
+                      buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+POOL_HOLD = Histogram("db_connection_hold_seconds", "Time a connection is checked out of pool",
+                      buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+
+WRITE_BATCH_SIZE = Histogram("db_write_batch_size", "Write operations committed in one transaction (WriteQueue)",
+                             buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+WRITE_BATCH_DURATION = Histogram("db_write_batch_seconds", "Time to run and commit one write batch (WriteQueue)",
+                                 buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+REQUESTS_SHED = Counter("http_requests_shed_total", "Requests rejected with 503 by load shedding (ConcurrencyLimiter)",
+                        ("priority",))
+
+LANE_QUEUE_WAIT = Histogram("lane_queue_wait_seconds", "Time requests waited for a slot of their lane (LaneScheduler)",
+                            ("lane",), buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+LANE_REJECTED = Counter("lane_requests_rejected_total", "Requests rejected with 503 by their lane (queue full or timeout)",
+                        ("lane", "reason"))
+
+QUERIES_CANCELLED = Counter("db_queries_cancelled_total",
+                            "Statements aborted by route statement timeout or client disconnect", ("reason",))
+
+SHARD_STATEMENTS = Counter("db_shard_statements_total",
+                           "ORM statements per shard (ShardRouter); all: run on every shard, fan_out: concurrent lists",
+                           ("shard",))
+
+EVENT_LOOP_LAG = Histogram("event_loop_lag_seconds", "Delay of event loop timer callbacks",
+                           buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+
+def install(engines) -> None:
+    """
+    Register gauges collected on scrape: pool, bcrypt executor, cache, write queue,
+    load shedding, lane, rate limit and replica stats.
+    Collectors are registered once; later calls only add engines to the pool gauges.
+
+    :param engines: Dictionary pool name -> SQLAlchemy async engine (see database.get_engines)
+    """
+    registered = bool(_installed)
+    _installed.update(engines)
+    if registered:
+        return
+
+    # Imported here: these modules are not needed until metrics are installed
+    from helpers import password_helper
+    from services.cache_services import CacheService
+    from services.lane_services import LaneScheduler
+    from services.load_shedding_services import ConcurrencyLimiter
+    from services.rate_limit_services import RateLimiter
+    from services.replica_services import ReplicaRouter
+    from services.write_queue_services import WriteQueue
+
+    def collect_pool() -> Dict[Tuple[str, ...], float]:
+        values = {}
+        for name, engine in _installed.items():
+            pool = engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue
+            values[(name, "size")] = pool.size()
+            values[(name, "checked_out")] = pool.checkedout()
+            values[(name, "checked_in")] = pool.checkedin()
+            values[(name, "overflow")] = max(0, pool.overflow())    # Negative while pool isn't full
+            values[(name, "limit")] = pool.size() + pool._max_overflow
+        return values
+
+    def collect_pool_events() -> Dict[Tuple[str, ...], float]:
+        values = {}
+        for name, engine in _installed.items():
+            stats = getattr(engine.pool, "stats", None)
+            if stats is not None:
+                values[(name, "checkout")] = stats["checkouts"]
+                values[(name, "timeout")] = stats["timeouts"]
+                values[(name, "ping_failure")] = stats["ping_failures"]
+        return values
+
+    def collect_bcrypt() -> Dict[Tuple[str, ...], float]:
+        stats = password_helper.get_executor_stats()
+        return {(name,): value for name, value in stats.items()}
+
+    def collect_cache() -> Dict[Tuple[str, ...], float]:
+        total = CacheService.hits + CacheService.misses
+        return {(): CacheService.hits / total if total else 0.0}
+
+    Gauge("db_pool_connections", "Connections of SQLAlchemy pools by state", ("pool", "state"), collector=collect_pool)
+    Counter("db_pool_events_total", "Pool checkouts, checkout timeouts and dead connections replaced on checkout",
+            ("pool", "event"), collector=collect_pool_events)
+    Gauge("bcrypt_executor_tasks", "Password hashing executor: workers, in flight and queued tasks", ("state",),
+          collector=collect_bcrypt)
+    Gauge("cache_hit_ratio", "Share of cache reads served from cache", collector=collect_cache)
+    Counter("cache_reads_total", "Cache reads by result", ("result",),
+            collector=lambda: {("hit",): CacheService.hits, ("miss",): CacheService.misses})
+    Counter("db_read_sessions_total", "Read-only sessions by target (primary or replica)", ("target",),
+            collector=lambda: {(target,): count for target, count in ReplicaRouter.routed.items()})
+    Gauge("db_write_queue_depth", "Write operations waiting for their batch (WriteQueue)",
+          collector=lambda: {(): WriteQueue.get_stats()["queued"]})
+    Gauge("http_concurrency_limit", "Adaptive limit of concurrent requests (load shedding)",
+          collector=lambda: {(): round(ConcurrencyLimiter.limit, 1)} if ConcurrencyLimiter.enabled else {})
+    Gauge("lane_requests", "Requests of every lane by state: running (active), waiting (queued), lane budget (slots)",
+          ("lane", "state"),
+          collector=lambda: {(name, state): lane[state] for name, lane in LaneScheduler.get_stats()["lanes"].items()
+                             for state in ("active", "queued", "slots")})
+    Gauge("lane_executor_tasks", "Executor of every lane: workers and tasks in flight", ("lane", "state"),
+          collector=lambda: {(name, state): lane[key] for name, lane in LaneScheduler.get_stats()["lanes"].items()
+                             for state, key in (("workers", "workers"), ("in_flight", "executor_in_flight"))})
+    Counter("rate_limit_decisions_total", "Requests of rate limited routes by policy and result (allowed, limited)",
+            ("policy", "result"),
+            collector=lambda: {(policy, result): counts[policy] for result, counts in
+                               (("allowed", RateLimiter.allowed), ("limited", RateLimiter.limited))
+                               for policy in RateLimiter.policies})
+    Gauge("db_replica_healthy", "Replica is in rotation (1) or out of it (0)", ("replica",),
+          collector=lambda: {(name,): 0 if name in ReplicaRouter.down else 1 for name in ReplicaRouter.replicas})
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """
+    Background task measuring event loop lag:
+    how much later than planned a sleeping task wakes up.
+
+    :param interval: Measurement interval in seconds
+    """
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started - interval))
@@ -1,10 +1,26 @@
+import asyncio
+import logging
 import bcrypt
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from config import settings
+from services.lane_services import LaneScheduler
+
+logger = logging.getLogger(__name__)
 
 """
 Password hashing and verification utilities.
 Uses bcrypt for secure password handling.
+
+bcrypt is slow on purpose (~250ms per call), so in request handlers use
+async versions: they run bcrypt in a dedicated thread pool and don't block event loop.
 """
 
+# Dedicated executor, so password hashing can't starve other executor users
+_executor = ThreadPoolExecutor(max_workers=settings.BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_in_flight = 0  # Submitted and not finished tasks (changed only on event loop thread)
+
 def hash_password(plain_password: str) -> str:
     """
     Hash plain text password using bcrypt.
@@ -38,5 +54,49 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return result
     
     except Exception as e:
-        print(f"VERIFICATION ERROR: {e}")
-        return False
\ No newline at end of file
+        logger.warning("Password verification error: %s", type(e).__name__)
+        return False
+
+
+async def _run_in_executor(func, *args):
+    """Run function in executor of request's lane (bcrypt executor without lanes) and track tasks in flight"""
+    global _in_flight
+    _in_flight += 1
+    try:
+        return await LaneScheduler.run_in_executor(_executor, func, *args)
+    finally:
+        _in_flight -= 1
+
+
+async def hash_password_async(plain_password: str) -> str:
+    """
+    Hash password in bcrypt executor without blocking event loop.
+    
+    :param plain_password: Original password text
+    :return: Hashed password string
+    """
+    return await _run_in_executor(hash_password, plain_password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify password in bcrypt executor without blocking event loop.
+    
+    :param plain_password: Password to verify
+    :param hashed_password: Stored hashed password
+    :return: Boolean indicating password match
+    """
+    return await _run_in_executor(verify_password, plain_password, hashed_password)
+
+
+def get_executor_stats() -> Dict[str, int]:
+    """
+    Get bcrypt executor load.
+    
+    :return: Number of workers, tasks in flight and tasks waiting in queue
+    """
+    return {
+        "workers": settings.BCRYPT_WORKERS,
+        "in_flight": _in_flight,
+        "queued": max(0, _in_flight - settings.BCRYPT_WORKERS)
+    }
@@ -0,0 +1,39 @@
+import os
+import stat
+from typing import Callable
+
+"""
+Path helper functions.
+Used for files and sockets other local users must not be able to plant or replace
+(cache snapshots, invalidation bus sockets).
+"""
+
+
+def is_private(path: str, is_kind: Callable[[int], bool]) -> bool:
+    """
+    Check that path is owned by this user and not writable by group or others.
+    Symlinks are not followed, a symlink is never private.
+
+    :param path: File or directory path
+    :param is_kind: File type check from stat module (e.g. stat.S_ISDIR)
+    :return: True if path is private or doesn't exist
+    """
+    try:
+        path_stat = os.lstat(path)
+    except FileNotFoundError:
+        return True
+
+    return (is_kind(path_stat.st_mode) and path_stat.st_uid == os.getuid()
+            and not path_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+
+def make_private_directory(directory: str) -> bool:
+    """
+    Create directory with mode 0700 if it doesn't exist and check that it is private.
+
+    :param directory: Directory path
+    :return: True if directory is private (see is_private)
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    return is_private(directory, stat.S_ISDIR)
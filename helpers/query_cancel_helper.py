@@ -0,0 +1,224 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from starlette import status
+
+from helpers import metrics_helper
+from helpers.route_helper import get_route_name
+
+logger = logging.getLogger(__name__)
+
+"""
+Statement timeouts per route and cancellation of database work of abandoned requests.
+
+Timeouts: every statement of a request may run ROUTE_STATEMENT_TIMEOUTS_MS[route]
+(or STATEMENT_TIMEOUT_MS for other routes):
+- PostgreSQL: "SET LOCAL statement_timeout" before the first statement of a transaction
+  that needs a different timeout (routes without timeout send nothing)
+- SQLite: progress handler of the connection aborts the statement after its deadline
+A timed out statement fails with StatementTimeoutError (503).
+
+Cancellation: QueryCancelMiddleware calls cancel_request() when the client disconnects.
+SQLite statements of the request are aborted by the progress handler, the request task
+is cancelled (asyncpg cancels the running query on server, waits for pool connections end).
+
+Cancelled statements are counted in db_queries_cancelled_total{reason="timeout"|"disconnect"}.
+"""
+
+PROGRESS_OPS = 1000     # SQLite virtual machine instructions between deadline checks
+
+_GUARD_KEY = "statement_guard"    # Key of _ConnectionGuard in connection info
+_PG_QUERY_CANCELED = "57014"    # SQLSTATE of statement_timeout and cancel requests
+
+
+class StatementTimeoutError(HTTPException):
+    """Statement of request ran longer than timeout of its route"""
+
+    def __init__(self, timeout: float):
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         detail=f"Database statement timed out after {timeout * 1000:.0f} ms")
+
+
+@dataclass(eq=False)
+class RequestGuard:
+    """Statement guard of one request"""
+    scope: dict
+    timeout: Optional[float] = None     # Seconds per statement, resolved on first statement (route is known)
+    resolved: bool = False
+    cancelled: bool = False
+    active: Set["_ConnectionGuard"] = field(default_factory=set)    # Connections running statements of request
+
+
+class _ConnectionGuard:
+    """Statement currently running on one connection"""
+
+    __slots__ = ("request", "deadline", "cancelled", "applied_ms")
+
+    def __init__(self):
+        self.request: Optional[RequestGuard] = None
+        self.deadline: Optional[float] = None
+        self.cancelled = False  # Kept until next statement: cancelled request may be released first
+        self.applied_ms = 0     # statement_timeout set in current PostgreSQL transaction
+
+    def check(self) -> int:
+        """SQLite progress handler (runs in driver thread): non-zero aborts statement"""
+        if self.cancelled:
+            return 1
+
+        deadline = self.deadline
+        return 1 if deadline is not None and time.monotonic() > deadline else 0
+
+
+_current_request: ContextVar[Optional[RequestGuard]] = ContextVar("query_cancel_request", default=None)
+
+_route_timeouts: Dict[str, float] = {}
+_default_timeout: Optional[float] = None
+_installed: Set[int] = set()
+
+
+def begin_request(scope: dict) -> RequestGuard:
+    """
+    Start statement guard of request (called by QueryCancelMiddleware).
+
+    :param scope: ASGI scope of request (route is looked up on first statement)
+    :return: Guard of request
+    """
+    request = RequestGuard(scope=scope)
+    _current_request.set(request)
+    return request
+
+
+def cancel_request(request: RequestGuard) -> int:
+    """
+    Abort running statements of request (client disconnected).
+
+    :param request: Guard of request
+    :return: Number of statements that were running
+    """
+    request.cancelled = True
+    for guard in request.active:
+        guard.cancelled = True
+
+    running = len(request.active)
+    if running:
+        metrics_helper.QUERIES_CANCELLED.inc("disconnect", amount=running)
+
+    return running
+
+
+def get_timeout(request: RequestGuard) -> Optional[float]:
+    """
+    Get statement timeout of request's route.
+
+    :param request: Guard of request
+    :return: Seconds per statement or None
+    """
+    if not request.resolved:
+        request.timeout = _route_timeouts.get(get_route_name(request.scope), _default_timeout)
+        request.resolved = True
+
+    return request.timeout
+
+
+def install(engines, route_timeouts_ms: Dict[str, float], default_timeout_ms: float) -> None:
+    """
+    Enforce statement timeouts and cancellation on engines.
+
+    :param engines: SQLAlchemy async engines (see database.get_engines)
+    :param route_timeouts_ms: Route name ("GET /api/v1/items/") -> statement timeout in ms
+    :param default_timeout_ms: Statement timeout of other routes in ms (0 = none)
+    """
+    global _route_timeouts, _default_timeout
+    _route_timeouts = {route: timeout_ms / 1000 for route, timeout_ms in route_timeouts_ms.items() if timeout_ms > 0}
+    _default_timeout = default_timeout_ms / 1000 if default_timeout_ms > 0 else None
+
+    for engine in engines:
+        if id(engine.sync_engine) not in _installed:
+            _installed.add(id(engine.sync_engine))
+            _install_engine(engine)
+
+
+def _get_guard(conn, sqlite: bool) -> _ConnectionGuard:
+    guard = conn.info.get(_GUARD_KEY)
+    if guard is None:
+        guard = conn.info[_GUARD_KEY] = _ConnectionGuard()
+        if sqlite:
+            # Called between VM instructions of every statement on this connection
+            conn.connection.dbapi_connection.run_async(
+                lambda driver_connection: driver_connection.set_progress_handler(guard.check, PROGRESS_OPS))
+
+    return guard
+
+
+def _release(guard: _ConnectionGuard) -> Optional[RequestGuard]:
+    request = guard.request
+    if request is not None:
+        request.active.discard(guard)
+    guard.request = None
+    guard.deadline = None
+    return request
+
+
+def _install_engine(engine) -> None:
+    sync_engine = engine.sync_engine
+    sqlite = engine.dialect.name == "sqlite"
+    postgresql = engine.dialect.name == "postgresql"
+
+    @event.listens_for(sync_engine, "begin")
+    def reset_timeout(conn):
+        guard = conn.info.get(_GUARD_KEY)
+        if guard is not None:
+            guard.applied_ms = 0    # SET LOCAL ends with transaction
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        request = _current_request.get()
+        guard = _get_guard(conn, sqlite)
+        guard.cancelled = False
+        if request is None:
+            return
+
+        timeout = get_timeout(request)
+        guard.request = request
+        guard.deadline = time.monotonic() + timeout if timeout is not None else None
+        request.active.add(guard)
+
+        if postgresql:
+            timeout_ms = int(timeout * 1000) if timeout is not None else 0
+            if timeout_ms != guard.applied_ms:
+                cursor.execute(f"SET LOCAL statement_timeout = {timeout_ms}")
+                guard.applied_ms = timeout_ms
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        guard = conn.info.get(_GUARD_KEY)
+        if guard is not None:
+            _release(guard)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        guard = conn.info.get(_GUARD_KEY) if conn is not None and not conn.invalidated else None
+        if guard is None:
+            return
+
+        deadline = guard.deadline
+        request = _release(guard)
+        if request is None or request.cancelled:
+            return  # Counted by cancel_request()
+
+        original = exception_context.original_exception
+        if sqlite:
+            timed_out = "interrupted" in str(original) and deadline is not None and time.monotonic() > deadline
+        else:
+            timed_out = getattr(original, "sqlstate", None) == _PG_QUERY_CANCELED
+
+        if timed_out:
+            metrics_helper.QUERIES_CANCELLED.inc("timeout")
+            logger.warning("Statement timed out on %s", get_route_name(request.scope))
+            raise StatementTimeoutError(request.timeout or 0.0) from original
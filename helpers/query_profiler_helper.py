@@ -0,0 +1,162 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+
+"""
+Per-request SQL profiler.
+Hooks SQLAlchemy engine events and records, for every request:
+query count, total DB time, ORM rows loaded and the slowest statement.
+"""
+
+
+@dataclass
+class QueryProfile:
+    """
+    SQL statistics of one request.
+    
+    Attributes:
+        queries (int): Number of executed statements
+        db_time (float): Total statements execution time in seconds
+        rows (int): Number of ORM objects loaded from rows
+        slowest_statement (str): SQL of the slowest statement
+        slowest_time (float): Execution time of the slowest statement in seconds
+    """
+    queries: int = 0
+    db_time: float = 0.0
+    rows: int = 0
+    slowest_statement: Optional[str] = None
+    slowest_time: float = 0.0
+
+
+# Profile of the request being handled in current task
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+# route -> aggregated statistics
+_route_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def start_profile() -> QueryProfile:
+    """
+    Start profiling of current request.
+    
+    :return: New profile collecting statistics of current request
+    """
+    profile = QueryProfile()
+    _current_profile.set(profile)
+
+    return profile
+
+
+def get_current_profile() -> Optional[QueryProfile]:
+    """
+    Get profile of current request.
+    
+    :return: Profile or None outside of request
+    """
+    return _current_profile.get()
+
+
+def record_route(route: str, profile: QueryProfile) -> None:
+    """
+    Add request profile to route statistics.
+    
+    :param route: Route name (see route_helper.get_route_name)
+    :param profile: Finished request profile
+    """
+    stats = _route_stats.get(route)
+    if stats is None:
+        stats = _route_stats[route] = {
+            "requests": 0,
+            "queries": 0,
+            "max_queries": 0,
+            "db_time": 0.0,
+            "rows": 0,
+            "slowest_statement": None,
+            "slowest_time": 0.0,
+        }
+
+    stats["requests"] += 1
+    stats["queries"] += profile.queries
+    stats["max_queries"] = max(stats["max_queries"], profile.queries)
+    stats["db_time"] += profile.db_time
+    stats["rows"] += profile.rows
+    if profile.slowest_time > stats["slowest_time"]:
+        stats["slowest_time"] = profile.slowest_time
+        stats["slowest_statement"] = profile.slowest_statement
+
+
+def get_route_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get statistics aggregated per route with per-request averages.
+    
+    :return: Dictionary route -> statistics
+    """
+    result = {}
+    for route, stats in _route_stats.items():
+        requests = stats["requests"]
+        result[route] = {
+            **stats,
+            "avg_queries": round(stats["queries"] / requests, 2),
+            "avg_db_time_ms": round(stats["db_time"] / requests * 1000, 3),
+            "avg_rows": round(stats["rows"] / requests, 2),
+        }
+
+    return result
+
+
+def reset_route_stats() -> None:
+    """Clear statistics of all routes"""
+    _route_stats.clear()
+
+
+def format_server_timing(profile: QueryProfile) -> str:
+    """
+    Format profile as Server-Timing header value.
+    
+    :param profile: Request profile
+    :return: Header value like 'db;dur=1.25;desc="3 queries, 7 rows"'
+    """
+    return f'db;dur={profile.db_time * 1000:.2f};desc="{profile.queries} queries, {profile.rows} rows"'
+
+
+def install(engines, base) -> None:
+    """
+    Register SQLAlchemy event listeners.
+    
+    :param engines: SQLAlchemy async engines (see database.get_engines)
+    :param base: Declarative base of models, used to count loaded rows
+    """
+    for engine in engines:
+        _install_engine(engine)
+
+    @event.listens_for(base, "load", propagate=True)
+    def on_load(target, context):
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.rows += 1
+
+
+def _install_engine(engine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            context._profiler_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        started = getattr(context, "_profiler_started", None)
+        if profile is None or started is None:
+            return
+
+        elapsed = time.perf_counter() - started
+        profile.queries += 1
+        profile.db_time += elapsed
+        if elapsed > profile.slowest_time:
+            profile.slowest_time = elapsed
+            profile.slowest_statement = statement
@@ -0,0 +1,37 @@
+from starlette.routing import Match
+
+"""
+Route helper functions.
+Used by middlewares to group statistics by route instead of raw URL.
+"""
+
+
+def get_route_name(scope: dict) -> str:
+    """
+    Get route name of ASGI request after routing.
+    Uses path template, so "/items/item/1" and "/items/item/2" are one route.
+    
+    :param scope: ASGI scope of request
+    :return: Route name like "GET /api/v1/items/item/{item_id}"
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "<unmatched>"
+
+    return f"{scope.get('method', '')} {path}"
+
+
+def match_route_name(scope: dict) -> str:
+    """
+    Get route name of ASGI request before routing (for middlewares that decide before the app runs).
+    Matches request against routes of the application in scope, like the router does.
+
+    :param scope: ASGI scope of request
+    :return: Route name like "GET /api/v1/items/item/{item_id}"
+    """
+    router = getattr(scope.get("app"), "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return f"{scope.get('method', '')} {route.path}"
+
+    return f"{scope.get('method', '')} <unmatched>"
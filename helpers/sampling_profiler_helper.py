@@ -0,0 +1,266 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+"""
+Statistical (sampling) profiler, safe to run in production.
+
+Instead of tracing every call, a background thread wakes up every
+interval and records the stack of every thread (sys._current_frames()).
+Functions that appear in many samples are where time goes:
+bcrypt threads, pydantic model construction, SQLAlchemy row processing...
+
+Task mode samples suspended coroutines instead: where every asyncio task
+is waiting (await chain), useful when requests are slow but CPU is idle.
+
+Continuous mode (ContinuousProfiler) samples threads all the time at a low
+rate and keeps the last windows, so a profile of a past slowdown is
+available without reproducing it.
+
+Output is in collapsed-stack format ("root;caller;callee count" lines),
+accepted by flamegraph.pl, speedscope and similar tools.
+"""
+
+# Sampling cost above this share of wall time makes sampler slow down
+MAX_OVERHEAD = 0.02
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+# code object -> frame label, labels are built once per function
+_labels: Dict[object, str] = {}
+
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(_PROJECT_ROOT):
+            path = path[len(_PROJECT_ROOT):]
+        elif "site-packages" in path:
+            path = path.split("site-packages" + os.sep, 1)[1]
+        else:
+            path = os.path.basename(path)
+
+        label = _labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+
+    return label
+
+
+def _collapse_frame(frame) -> List[str]:
+    """Labels of frame and its callers, outermost first"""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+
+    return stack
+
+
+def _collapse_coroutine(coro) -> List[str]:
+    """Labels of coroutine await chain, outermost first"""
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_label(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+
+    return stack
+
+
+class SamplingProfiler:
+    """
+    One profiling session.
+    Only one session may run at a time (see SamplingProfiler.running).
+    """
+
+    running: Optional["SamplingProfiler"] = None
+
+    def __init__(self, interval: float, stop: Optional[threading.Event] = None):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.sampling_time = 0.0
+        self.wall_time = 0.0
+        self._stop = stop or threading.Event()     # Ends thread sampling early when set
+
+    @property
+    def overhead(self) -> float:
+        """Share of wall time spent taking samples"""
+        return self.sampling_time / self.wall_time if self.wall_time else 0.0
+
+    def _sample_threads(self, sampler_id: int, names: Dict[int, str]) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler_id:
+                continue
+            name = names.get(thread_id, f"thread-{thread_id}")
+            self.samples[";".join([name] + _collapse_frame(frame))] += 1
+
+    def _sample_tasks(self, loop: asyncio.AbstractEventLoop) -> None:
+        for task in asyncio.all_tasks(loop):
+            if task is asyncio.current_task(loop):
+                continue
+            stack = _collapse_coroutine(task.get_coro())
+            if stack:
+                self.samples[";".join([f"task {task.get_name()}"] + stack)] += 1
+
+    def _run_threads(self, seconds: float) -> None:
+        """Sampler thread body: sample all threads until time is up"""
+        sampler_id = threading.get_ident()
+        interval = self.interval
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self._sample_threads(sampler_id, names)
+            cost = time.perf_counter() - now
+            self.sampling_time += cost
+            self.sample_count += 1
+
+            # Keep overhead under MAX_OVERHEAD: sample less often if stacks are expensive to walk
+            if cost > interval * MAX_OVERHEAD:
+                interval = cost / MAX_OVERHEAD
+
+            if self._stop.wait(interval):
+                break
+
+        self.wall_time = time.perf_counter() - started
+
+    async def _run_tasks(self, seconds: float) -> None:
+        """Sample suspended coroutines from event loop thread until time is up"""
+        loop = asyncio.get_running_loop()
+        interval = self.interval
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+
+            self._sample_tasks(loop)
+            cost = time.perf_counter() - now
+            self.sampling_time += cost
+            self.sample_count += 1
+
+            if cost > interval * MAX_OVERHEAD:
+                interval = cost / MAX_OVERHEAD
+
+            await asyncio.sleep(interval)
+
+        self.wall_time = time.perf_counter() - started
+
+    async def run(self, seconds: float, mode: str = "threads") -> None:
+        """
+        Collect samples for given time without blocking event loop.
+
+        :param seconds: Profiling duration
+        :param mode: "threads" - stacks of all threads, "tasks" - await chains of asyncio tasks
+        :raises RuntimeError: If another session is running
+        """
+        if SamplingProfiler.running is not None:
+            raise RuntimeError("Profiler is already running")
+
+        SamplingProfiler.running = self
+        try:
+            if mode == "tasks":
+                await self._run_tasks(seconds)
+            else:
+                await asyncio.to_thread(self._run_threads, seconds)
+        finally:
+            SamplingProfiler.running = None
+
+    def stop(self) -> None:
+        """Stop thread sampling before its time is up"""
+        self._stop.set()
+
+    def collapsed(self) -> str:
+        """
+        Samples in collapsed-stack format, most frequent stacks first.
+
+        :return: Lines "frame;frame;frame count"
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ContinuousProfiler:
+    """
+    Always-on thread sampling (PROFILER_CONTINUOUS_ENABLED).
+    A daemon thread samples every interval (100 ms by default, under 0.1% of one CPU)
+    in windows of fixed length; the last completed windows are kept.
+    """
+
+    profiles: Deque[SamplingProfiler] = deque(maxlen=10)
+    window: float = 60.0
+
+    _thread: Optional[threading.Thread] = None
+    _stop: threading.Event = threading.Event()
+
+    @classmethod
+    def start(cls, interval: float, window: float, windows: int = 10) -> None:
+        """
+        Start sampler thread.
+
+        :param interval: Sampling interval in seconds
+        :param window: Length of one window in seconds
+        :param windows: Number of completed windows kept
+        """
+        if cls._thread is not None:
+            return
+
+        cls.window = window
+        cls.profiles = deque(maxlen=windows)
+        cls._stop.clear()
+        cls._thread = threading.Thread(target=cls._run, args=(interval,), name="continuous-profiler", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls) -> None:
+        """Stop sampler thread, the window in progress is dropped"""
+        cls._stop.set()
+        if cls._thread is not None:
+            cls._thread.join(timeout=1)
+            cls._thread = None
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._thread is not None
+
+    @classmethod
+    def _run(cls, interval: float) -> None:
+        while not cls._stop.is_set():
+            profiler = SamplingProfiler(interval=interval, stop=cls._stop)
+            profiler._run_threads(cls.window)
+            if not cls._stop.is_set():
+                cls.profiles.append(profiler)
+
+    @classmethod
+    def get_profile(cls) -> Dict[str, Any]:
+        """
+        Merge kept windows.
+
+        :return: Dictionary with collapsed stacks, samples, covered seconds and sampling overhead
+        """
+        profiles = list(cls.profiles)
+        samples: Counter = Counter()
+        for profiler in profiles:
+            samples.update(profiler.samples)
+
+        wall_time = sum(profiler.wall_time for profiler in profiles)
+        sampling_time = sum(profiler.sampling_time for profiler in profiles)
+
+        return {"collapsed": "".join(f"{stack} {count}\n" for stack, count in samples.most_common()),
+                "samples": sum(profiler.sample_count for profiler in profiles),
+                "seconds": wall_time,
+                "overhead": sampling_time / wall_time if wall_time else 0.0}
@@ -0,0 +1,55 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import models
+from helpers import password_helper
+from services.shard_services import ShardRouter
+
+"""
+Database seeding utilities.
+Fill database with predictable users and items for benchmarks and query checks.
+
+Seeded data:
+- users: "user{N}" with email "user{N}@example.com" and the same password
+- items: "item{N}" for every user (item names are unique per user)
+"""
+
+SEED_PASSWORD = "password"
+
+
+async def seed_database(session_factory: async_sessionmaker,
+                        users: int = 10,
+                        items_per_user: int = 5,
+                        password: str = SEED_PASSWORD) -> None:
+    """
+    Insert users with items into database (tables must already exist).
+    
+    :param session_factory: Session factory bound to database to seed
+    :param users: Number of users to create
+    :param items_per_user: Number of items for every user
+    :param password: Plain password of all seeded users
+    """
+    # Hash once: bcrypt is slow on purpose
+    hash_password = password_helper.hash_password(password)
+
+    async with session_factory() as db:
+        new_users = [
+            models.User(id=await ShardRouter.allocate_id("users"),    # None without sharding
+                        name=f"user{user_number}",
+                        email=f"user{user_number}@example.com",
+                        password=hash_password,
+                        bio=f"Bio of seeded user {user_number}")
+            for user_number in range(1, users + 1)
+        ]
+        db.add_all(new_users)
+        await db.flush()    # Get users' IDs
+
+        db.add_all([
+            models.Item(id=await ShardRouter.allocate_id("item"),
+                        name=f"item{item_number}",
+                        description=f"Item {item_number} of {user.name}",
+                        user_id=user.id)
+            for user in new_users
+            for item_number in range(1, items_per_user + 1)
+        ])
+
+        await db.commit()
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+"""
+Slow query log with automatic query plans.
+
+Replaces echo=True (every statement logged): only statements slower than
+threshold are logged, bound parameters are redacted (only their types are kept).
+
+Statements are grouped by shape: same SQL with different parameters
+(and different length of IN lists) is one shape. For every new slow shape
+its plan is captured once in background:
+- PostgreSQL: EXPLAIN
+- SQLite: EXPLAIN QUERY PLAN
+Full scans in plans (Seq Scan / SCAN table) are flagged, they usually mean a missing index.
+
+Shapes are listed at /debug/slow_queries.
+"""
+
+MAX_SHAPES = 1000
+
+# Statements that have plans
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+# "(?, ?, ?)", "($1, $2)", "(%(p_1)s, %(p_2)s)" -> "(...)": IN lists of any length are one shape
+_PARAMETER_LIST = re.compile(r"\((?:\s*(?:\?|\$\d+|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|\$\d+|%\(\w+\)s|:\w+)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# shape -> statistics and plan
+_shapes: Dict[str, Dict[str, Any]] = {}
+
+# Set while plan is captured, so EXPLAIN statements themselves are not logged
+_explaining: ContextVar[bool] = ContextVar("slow_query_explaining", default=False)
+
+_threshold: float = 0.1
+
+
+def get_shape(statement: str) -> str:
+    """
+    Get statement shape: normalized whitespace and IN lists.
+
+    :param statement: SQL statement with placeholders
+    :return: Shape of statement
+    """
+    return _PARAMETER_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """
+    Replace bound parameter values with their type names.
+
+    :param parameters: Parameters as passed to DBAPI cursor (tuple, list or dict)
+    :return: Same structure with "<type>" instead of values
+    """
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany: redact first row only
+            return [redact_parameters(parameters[0]), f"... {len(parameters)} rows"]
+        return [f"<{type(value).__name__}>" for value in parameters]
+
+    return parameters
+
+
+def has_full_scan(plan: List[str]) -> bool:
+    """
+    Check if plan reads whole table.
+
+    :param plan: Plan lines from EXPLAIN / EXPLAIN QUERY PLAN
+    :return: True if plan contains sequential scan
+    """
+    for line in plan:
+        stripped = line.strip()
+        if "Seq Scan" in stripped:
+            return True
+        if stripped.startswith("SCAN ") and " USING " not in stripped and stripped != "SCAN CONSTANT ROW":
+            return True
+
+    return False
+
+
+def _record(statement: str, parameters: Any, elapsed: float, engine, executemany: bool) -> None:
+    shape = get_shape(statement)
+    stats = _shapes.get(shape)
+
+    redacted = redact_parameters(parameters)
+    logger.warning("Slow query (%.1f ms): %s | parameters: %s", elapsed * 1000, shape, redacted)
+
+    if stats is None:
+        if len(_shapes) >= MAX_SHAPES:
+            return
+
+        stats = _shapes[shape] = {
+            "shape": shape,
+            "count": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "parameters": redacted,
+            "plan": None,
+            "full_scan": None,
+        }
+
+        if not executemany and shape.lstrip("( ").upper().startswith(_EXPLAINABLE):
+            try:
+                asyncio.get_running_loop().create_task(_capture_plan(engine, statement, parameters, stats))
+            except RuntimeError:
+                pass    # No running loop (sync usage), plan is skipped
+
+    stats["count"] += 1
+    stats["total_ms"] += elapsed * 1000
+    stats["max_ms"] = max(stats["max_ms"], elapsed * 1000)
+    stats["last_seen"] = time.time()
+
+
+async def _capture_plan(engine, statement: str, parameters: Any, stats: Dict[str, Any]) -> None:
+    """Run EXPLAIN of slow statement once, with its original parameters (never stored)"""
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    _explaining.set(True)
+    try:
+        async with engine.connect() as conn:
+            result = await conn.exec_driver_sql(prefix + statement, parameters)
+            rows = result.fetchall()
+    except Exception as e:
+        stats["plan"] = [f"<plan failed: {type(e).__name__}>"]
+        return
+
+    if engine.dialect.name == "sqlite":
+        # (id, parent, notused, detail)
+        plan = [row[-1] for row in rows]
+    else:
+        plan = [str(row[0]) for row in rows]
+
+    stats["plan"] = plan
+    stats["full_scan"] = has_full_scan(plan)
+
+
+def install(engines, threshold: float) -> None:
+    """
+    Register SQLAlchemy event listeners logging slow statements.
+
+    :param engines: SQLAlchemy async engines (see database.get_engines)
+    :param threshold: Statements slower than this (seconds) are logged
+    """
+    global _threshold
+    _threshold = threshold
+
+    for engine in engines:
+        _install_engine(engine)
+
+
+def _install_engine(engine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._slow_query_started
+        if elapsed >= _threshold and not _explaining.get():
+            _record(statement, parameters, elapsed, engine, executemany)
+
+
+def get_slow_queries() -> Dict[str, Any]:
+    """
+    Get slow statement shapes, slowest in total first.
+
+    :return: Threshold and list of shapes with statistics and plans
+    """
+    shapes = sorted(_shapes.values(), key=lambda stats: stats["total_ms"], reverse=True)
+
+    return {
+        "threshold_ms": _threshold * 1000,
+        "shapes": [{**stats,
+                    "total_ms": round(stats["total_ms"], 3),
+                    "max_ms": round(stats["max_ms"], 3),
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 3)}
+                   for stats in shapes],
+    }
+
+
+def reset_slow_queries() -> None:
+    """Clear recorded shapes and plans"""
+    _shapes.clear()
@@ -1,3 +1,5 @@
+import logging
+
 from fastapi import Request, HTTPException, status
 from fastapi import Response
 
@@ -5,6 +7,7 @@ from jose import jwt, JWTError
 from datetime import datetime, timezone
 from config import get_auth_data
 
+logger = logging.getLogger(__name__)
 
 """
 JWT token validation and extraction utilities.
@@ -45,18 +48,18 @@ def verify_token(token: str) -> str:
         payload = jwt.decode(token, auth_data['secret_key'], auth_data['algorithm'])
 
     except JWTError:
-        print("Token is not valid")
+        logger.info("Token is not valid", extra={"sample_rate": 0.1})
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Token is not valid')
 
     expire = payload.get('exp')
     expire_time = datetime.fromtimestamp(int(expire), tz=timezone.utc)
     if (not expire) or (expire_time < datetime.now(timezone.utc)):
-        print("Token has expired")
+        logger.info("Token has expired", extra={"sample_rate": 0.1})
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Token has expired')
 
     user_id = payload.get('sub')
     if not user_id:
-        print("User's id not found")
+        logger.warning("User's id not found in token")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User's id not found")
 
     return user_id
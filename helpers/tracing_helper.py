@@ -0,0 +1,409 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+"""
+In-process tracing across router -> repository -> DAO/services -> SQL layers.
+
+Every sampled request gets a trace (root span created by TracingMiddleware),
+nested spans are created for:
+- repository functions and DAO classmethods (auto-instrumented on install)
+- SQL statements (SQLAlchemy engine events)
+- any code wrapped in span() / @traced
+
+Current span is kept in a ContextVar, so it follows the request through
+awaits and into SQLAlchemy greenlets. Finished traces are written by a
+background thread as JSON lines, one span per line, with OTLP span field
+names (traceId, spanId, parentSpanId, startTimeUnixNano, ...).
+
+Not sampled requests pay only for one ContextVar lookup per span.
+"""
+
+
+@dataclass
+class Span:
+    """
+    One timed operation of a trace.
+
+    Attributes:
+        trace_id (str): 32 hex chars, same for all spans of a request
+        span_id (str): 16 hex chars
+        parent_id (str): span_id of parent span (None for root span)
+        name (str): Operation name like "DAO.UserDAO.get_user_by_id"
+        kind (str): "server", "internal" or "client" (SQL)
+        start_ns (int): Wall clock start in nanoseconds
+        end_ns (int): Wall clock end in nanoseconds
+        attributes (dict): Extra details (route, status code, statement...)
+        error (str): Exception type if operation failed
+    """
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: str = "internal"
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    # Spans of the whole trace, shared by all spans of one request
+    trace_spans: List["Span"] = field(default_factory=list, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Span as OTLP-like JSON object"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round((self.end_ns - self.start_ns) / 1_000_000, 3),
+            "attributes": self.attributes,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+
+
+# Span being executed in current task (None if request isn't sampled)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def get_current_span() -> Optional[Span]:
+    """
+    Get span being executed in current task.
+
+    :return: Span or None if request is not traced
+    """
+    return _current_span.get()
+
+
+def get_current_trace_id() -> Optional[str]:
+    """
+    Get trace id of current request.
+
+    :return: Trace id or None if request is not traced
+    """
+    current = _current_span.get()
+    return current.trace_id if current is not None else None
+
+
+def should_sample(traceparent: Optional[str] = None) -> bool:
+    """
+    Decide if new request is traced.
+    Incoming W3C "traceparent" header with sampled flag forces tracing, but only
+    while local sampling is on (TRACE_SAMPLE_RATE > 0): otherwise any client
+    could make the service write traces.
+
+    :param traceparent: Value of "traceparent" request header
+    :return: True if request should be traced
+    """
+    if settings.TRACE_SAMPLE_RATE <= 0:
+        return False
+
+    if traceparent and traceparent.endswith("-01"):
+        return True
+
+    return random.random() < settings.TRACE_SAMPLE_RATE
+
+
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes) -> Span:
+    """
+    Start root span of a request and make it current.
+
+    :param name: Root span name (replaced by route name when it is known)
+    :param traceparent: W3C "traceparent" header to continue its trace id
+    :param attributes: Span attributes
+    :return: Root span, finish it with finish_trace()
+    """
+    parts = traceparent.split("-") if traceparent else []
+    trace_id = parts[1] if len(parts) == 4 and len(parts[1]) == 32 else _new_id(128)
+    parent_id = parts[2] if len(parts) == 4 and len(parts[2]) == 16 else None
+
+    root = Span(trace_id=trace_id, span_id=_new_id(64), parent_id=parent_id,
+                name=name, kind="server", attributes=attributes)
+    root.trace_spans.append(root)
+    _current_span.set(root)
+
+    return root
+
+
+def finish_trace(root: Span) -> None:
+    """
+    Finish root span and send all spans of the trace to exporter.
+
+    :param root: Span returned by start_trace()
+    """
+    root.end_ns = time.time_ns()
+    _current_span.set(None)
+    _exporter.export(root.trace_spans)
+
+
+def _start_span(name: str, kind: str, attributes: Dict[str, Any]) -> Optional[Span]:
+    parent = _current_span.get()
+    if parent is None:
+        return None
+
+    child = Span(trace_id=parent.trace_id, span_id=_new_id(64), parent_id=parent.span_id,
+                 name=name, kind=kind, attributes=attributes, trace_spans=parent.trace_spans)
+    parent.trace_spans.append(child)
+
+    return child
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a block of code as child of current span.
+    Does nothing if current request is not traced.
+
+    :param name: Span name
+    :param kind: Span kind
+    :param attributes: Span attributes
+    :return: Span or None if request is not traced
+    """
+    child = _start_span(name, kind, attributes)
+    if child is None:
+        yield None
+        return
+
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        child.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+def traced(name: str):
+    """
+    Decorator tracing every call of sync or async function.
+
+    :param name: Span name
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            async_wrapper.__traced__ = True
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+
+        wrapper.__traced__ = True
+        return wrapper
+
+    return decorator
+
+
+def instrument_module(module) -> int:
+    """
+    Trace all async functions defined in module.
+    Callers must look them up through module (user_repository.sign_up(...)),
+    functions already captured elsewhere (e.g. in Depends) stay untraced.
+
+    :param module: Module like repository.user_repository
+    :return: Number of instrumented functions
+    """
+    count = 0
+    for name, func in list(vars(module).items()):
+        if (inspect.iscoroutinefunction(func) and func.__module__ == module.__name__
+                and not getattr(func, "__traced__", False)):
+            setattr(module, name, traced(f"{module.__name__}.{name}")(func))
+            count += 1
+
+    return count
+
+
+def instrument_class(cls) -> int:
+    """
+    Trace all classmethods and staticmethods of class (DAO and services).
+
+    :param cls: Class like UserDAO
+    :return: Number of instrumented methods
+    """
+    count = 0
+    for name, attr in list(vars(cls).items()):
+        if not isinstance(attr, (classmethod, staticmethod)) or getattr(attr.__func__, "__traced__", False):
+            continue
+
+        wrapped = traced(f"{cls.__module__}.{cls.__name__}.{name}")(attr.__func__)
+        setattr(cls, name, type(attr)(wrapped))
+        count += 1
+
+    return count
+
+
+class JsonlExporter:
+    """
+    Writes finished traces to JSONL file from background thread,
+    so request handling never waits for disk.
+    Traces are dropped (and counted) if writer can't keep up.
+    File is rotated when it reaches max_bytes: <path>.1 ... <path>.<backups>
+    are kept, older traces are deleted.
+    """
+
+    def __init__(self, max_queue: int = 10000):
+        self.path: Optional[str] = None
+        self.max_bytes = 100 * 1024 * 1024
+        self.backups = 3
+        self.dropped = 0
+        self.rotations = 0
+        self._queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, path: str, max_bytes: int = 100 * 1024 * 1024, backups: int = 3) -> None:
+        """
+        Start background writer.
+
+        :param path: JSONL file, spans are appended
+        :param max_bytes: Size at which file is rotated
+        :param backups: Number of rotated files kept
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Write queued traces and stop background writer"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def export(self, spans: List[Span]) -> None:
+        if self._thread is None:
+            return
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        file = open(self.path, "a", encoding="utf-8")
+        try:
+            while True:
+                spans = self._queue.get()
+                if spans is None:
+                    return
+                try:
+                    for item in spans:
+                        file.write(json.dumps(item.to_dict(), default=str) + "\n")
+                    # Flush when nothing else is waiting, so traces appear in file quickly
+                    if self._queue.empty():
+                        file.flush()
+
+                    if file.tell() >= self.max_bytes:
+                        file.close()
+                        self._rotate()
+                        file = open(self.path, "a", encoding="utf-8")
+                except Exception:
+                    logger.exception("Failed to export trace")
+        finally:
+            file.close()
+
+    def _rotate(self) -> None:
+        """Shift <path>.N-1 -> <path>.N ... <path> -> <path>.1, the oldest file is dropped"""
+        for number in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{number}"):
+                os.replace(f"{self.path}.{number}", f"{self.path}.{number + 1}")
+
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+
+_exporter = JsonlExporter()
+
+
+def install(engines, path: str, max_bytes: int = 100 * 1024 * 1024, backups: int = 3, modules=(), classes=()) -> None:
+    """
+    Start exporter and instrument application layers.
+
+    :param engines: SQLAlchemy async engines (see database.get_engines), their statements become "client" spans
+    :param path: JSONL file for finished traces
+    :param max_bytes: Size at which trace file is rotated
+    :param backups: Number of rotated trace files kept
+    :param modules: Modules whose async functions are traced (repositories)
+    :param classes: Classes whose classmethods/staticmethods are traced (DAO, services)
+    """
+    for module in modules:
+        instrument_module(module)
+    for cls in classes:
+        instrument_class(cls)
+    for engine in engines:
+        _install_engine(engine)
+
+    _exporter.start(path, max_bytes=max_bytes, backups=backups)
+
+
+def _install_engine(engine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        sql_span = _start_span("sql", "client", {"db.system": conn.dialect.name,
+                                                 "db.statement": statement})
+        if sql_span is not None:
+            context._trace_span = sql_span
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        sql_span = getattr(context, "_trace_span", None)
+        if sql_span is not None:
+            sql_span.end_ns = time.time_ns()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                sql_span.attributes["db.rowcount"] = cursor.rowcount
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        sql_span = getattr(exception_context.execution_context, "_trace_span", None)
+        if sql_span is not None:
+            sql_span.end_ns = time.time_ns()
+            sql_span.error = type(exception_context.original_exception).__name__
+
+
+def shutdown() -> None:
+    """Write remaining traces and stop exporter"""
+    _exporter.stop()
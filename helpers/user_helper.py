@@ -1,3 +1,5 @@
+import logging
+
 from starlette.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
@@ -9,6 +11,7 @@ from helpers.exception_helper import CheckHTTP403FORBIDDEN_BOOL, CheckHTTP404Not
 from helpers.jwt_helper import create_access_token
 from services.user_services import UserService
 
+logger = logging.getLogger(__name__)
 
 """
 User authentication helper functions.
@@ -34,10 +37,14 @@ async def take_access_token_for_user(db: AsyncSession,
     # Check if user exists
     await CheckHTTP404NotFound(user, "User not found")
 
-    is_password_valid = password_helper.verify_password(request.password, user.password)
+    # Return connection to pool while bcrypt runs (loaded user stays usable)
+    await db.close()
+
+    is_password_valid = await password_helper.verify_password_async(request.password, user.password)
 
     # Verify password
-    print(f"   Verifying password...")
+    if not is_password_valid:
+        logger.info("Sign in with invalid password", extra={"user_id": user.id})
     await CheckHTTP403FORBIDDEN_BOOL(
         not is_password_valid,
         "Invalid email and/or password"
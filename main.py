@@ -1,13 +1,43 @@
-from fastapi import FastAPI, Depends
+import asyncio
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database import engine, Base, get_db
+from database.database import engine, shard_engines, Base, get_engines
+from helpers import logging_helper, memory_profiler_helper, metrics_helper, query_cancel_helper, query_profiler_helper, slow_query_helper, tracing_helper
+from helpers import password_helper, user_helper
+from helpers.loop_watchdog_helper import LoopWatchdog
+from helpers.sampling_profiler_helper import ContinuousProfiler
+from middleware.memory_profiler_middleware import MemoryProfilerMiddleware
+from middleware.load_shedding_middleware import LoadSheddingMiddleware
+from middleware.metrics_middleware import MetricsMiddleware
+from middleware.query_cancel_middleware import QueryCancelMiddleware
+from middleware.query_profiler_middleware import QueryProfilerMiddleware
+from middleware.read_your_writes_middleware import ReadYourWritesMiddleware
+from middleware.tracing_middleware import TracingMiddleware
+from repository import item_repository, user_repository
+from DAO.general_dao import GeneralDAO
+from DAO.item_dao import ItemDao
+from DAO.user_dao import UserDAO
 
 from routes.user_router import user_router
 from routes.item_router import item_router
+from routes.service_router import service_router
+from routes.debug_router import debug_router
+from services.availability_services import AvailabilityService
+from services.cache_services import CacheService
+from services.invalidation_services import InvalidationBus
+from services.item_services import ItemService
+from services.lane_services import LaneScheduler
+from services.load_shedding_services import ConcurrencyLimiter
+from services.rate_limit_services import RateLimiter
+from services.replica_services import ReplicaRouter
+from services.user_services import UserService
+from services.validation_services import ValidationService
+from services.warmup_services import WarmupService
+from services.write_queue_services import WriteQueue
 from config import settings
 
 app = FastAPI(
@@ -21,7 +51,67 @@ origins = [
     "http://127.0.0.1:5173",
 ]
 
+# Middlewate for wprking with sessions
+app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
+
+# Middleware sending reads of recent writers to primary instead of replicas (no-op without replicas)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Statement timeouts per route, reads of disconnected clients are cancelled (db_queries_cancelled_total)
+if settings.QUERY_CANCEL_ENABLED:
+    query_cancel_helper.install(get_engines().values(),
+                                route_timeouts_ms=settings.ROUTE_STATEMENT_TIMEOUTS_MS,
+                                default_timeout_ms=settings.STATEMENT_TIMEOUT_MS)
+    app.add_middleware(QueryCancelMiddleware)
+
+# Log of slow SQL statements with query plans (/debug/slow_queries)
+if settings.SLOW_QUERY_MS >= 0:
+    slow_query_helper.install(get_engines().values(), threshold=settings.SLOW_QUERY_MS / 1000)
+
+# Middleware for SQL profile of every request (Server-Timing header, /debug/queries)
+if settings.QUERY_PROFILER_ENABLED:
+    query_profiler_helper.install(get_engines().values(), Base)
+    app.add_middleware(QueryProfilerMiddleware)
+
+# Per-user and per-IP limits of routes declaring a policy (429 with Retry-After)
+if settings.RATE_LIMIT_ENABLED:
+    RateLimiter.configure(policies=settings.RATE_LIMIT_POLICIES,
+                          shared_path=settings.RATE_LIMIT_SHARED_PATH,
+                          shared_slots=settings.RATE_LIMIT_SHARED_SLOTS)
+
+# Requests over adaptive concurrency limit get 503 with Retry-After, low priority routes first
+if settings.LOAD_SHED_ENABLED:
+    ConcurrencyLimiter.configure(initial_limit=settings.LOAD_SHED_INITIAL_LIMIT,
+                                 min_limit=settings.LOAD_SHED_MIN_LIMIT,
+                                 max_limit=settings.LOAD_SHED_MAX_LIMIT,
+                                 route_priorities=settings.ROUTE_PRIORITIES,
+                                 retry_after=settings.LOAD_SHED_RETRY_AFTER_SECONDS)
+    app.add_middleware(LoadSheddingMiddleware)
+
+# Middleware for request count and latency per route (/metrics)
+if settings.METRICS_ENABLED:
+    metrics_helper.install(get_engines())
+    app.add_middleware(MetricsMiddleware)
+
+# Tracing of sampled requests through repository, DAO, services and SQL (written to TRACE_EXPORT_PATH)
+if settings.TRACE_EXPORT_PATH and settings.TRACE_SAMPLE_RATE > 0:
+    tracing_helper.install(get_engines().values(),
+                           path=settings.TRACE_EXPORT_PATH,
+                           max_bytes=int(settings.TRACE_EXPORT_MAX_MB * 1024 * 1024),
+                           backups=settings.TRACE_EXPORT_BACKUPS,
+                           modules=[user_repository, item_repository, user_helper, password_helper],
+                           classes=[GeneralDAO, UserDAO, ItemDao,
+                                    ValidationService, AvailabilityService, UserService, ItemService])
+    app.add_middleware(TracingMiddleware)
+
+# Allocations per route with tracemalloc (opt-in, slows allocations down)
+if settings.MEMORY_PROFILER_ENABLED:
+    memory_profiler_helper.start(frames=settings.MEMORY_PROFILER_FRAMES)
+    app.add_middleware(MemoryProfilerMiddleware)
+
 # Adding middleware, alowing origins and alowing all methods and headers
+# Added last, so it runs first: preflights are answered before load shedding and
+# shed requests (503) carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins, # Allowed domains 
@@ -30,37 +120,107 @@ app.add_middleware(
     allow_headers=["*"], # Allow all headers
 )
 
-# Middlewate for wprking with sessions
-app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
-
 
 # Creating tables 
 async def create_tables():
     """
-    Function creating all tables in DB using SQLAlchemy models
+    Function creating all tables in DB (and in every shard) using SQLAlchemy models
     Running when app startup
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    for db_engine in (engine, *shard_engines.values()):
+        async with db_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
 
 
 # App launch event
 @app.on_event("startup")
 async def startup_event():
     """
+    Routing logs through queue to background writer thread
     Creating tables in DB if they NOT already exist
+    Connecting to cache invalidation bus shared by all workers
+    Checking read replicas (and every REPLICA_HEALTH_INTERVAL_SECONDS after)
+    Restoring cache saved by previous workers (entries still matching the database)
+    Starting group commit of writes (WRITE_QUEUE_ENABLED)
+    Creating priority lanes with their executors (LANES_ENABLED)
+    Starting warm-up, /ready returns 200 only after it is finished
+    Starting event loop lag monitor for /metrics
+    Starting event loop blocking detector (watchdog)
+    Starting always-on sampling profiler (PROFILER_CONTINUOUS_ENABLED)
     """
+    # Logs are written by background thread, request path only enqueues records
+    logging_helper.setup_logging(level=settings.LOG_LEVEL, log_format=settings.LOG_FORMAT, levels=settings.LOG_LEVELS)
+
     await create_tables()
+    await InvalidationBus.start(engine)
+    await ReplicaRouter.start(interval=settings.REPLICA_HEALTH_INTERVAL_SECONDS)
+    if settings.CACHE_SNAPSHOT_PATH:
+        await WarmupService.restore_cache(settings.CACHE_SNAPSHOT_PATH)
+    if settings.WRITE_QUEUE_ENABLED:
+        await WriteQueue.start(max_batch=settings.WRITE_QUEUE_MAX_BATCH,
+                               max_latency=settings.WRITE_QUEUE_MAX_LATENCY_MS / 1000)
+    if settings.LANES_ENABLED:
+        LaneScheduler.configure(lanes=settings.LANES,
+                                queue_timeout=settings.LANE_QUEUE_TIMEOUT_MS / 1000,
+                                retry_after=settings.LOAD_SHED_RETRY_AFTER_SECONDS)
+
+    if settings.WARMUP_ENABLED:
+        app.state.warmup_task = asyncio.create_task(WarmupService.run(app=app))
+    else:
+        WarmupService.ready = True
+
+    if settings.METRICS_ENABLED:
+        app.state.loop_lag_task = asyncio.create_task(metrics_helper.monitor_event_loop_lag())
+
+    if settings.LOOP_WATCHDOG_THRESHOLD_MS > 0:
+        LoopWatchdog.start(threshold=settings.LOOP_WATCHDOG_THRESHOLD_MS / 1000)
+
+    if settings.PROFILER_CONTINUOUS_ENABLED:
+        ContinuousProfiler.start(interval=settings.PROFILER_CONTINUOUS_INTERVAL_MS / 1000,
+                                 window=settings.PROFILER_CONTINUOUS_WINDOW_SECONDS)
+
+
+# App shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Stopping event loop monitors and always-on profiler
+    Committing queued writes
+    Stopping executors of priority lanes
+    Disconnecting from cache invalidation bus
+    Stopping read replica health checks
+    Saving cache for the next workers (warm restart)
+    Writing remaining traces
+    Closing database connections
+    Writing remaining logs
+    """
+    if getattr(app.state, "loop_lag_task", None) is not None:
+        app.state.loop_lag_task.cancel()
+    LoopWatchdog.stop()
+    ContinuousProfiler.stop()
+
+    await WriteQueue.stop()
+    LaneScheduler.shutdown()
+    await InvalidationBus.stop()
+    ReplicaRouter.stop()
+    if settings.CACHE_SNAPSHOT_PATH:
+        CacheService.save_snapshot(settings.CACHE_SNAPSHOT_PATH)
+    tracing_helper.shutdown()
+    for db_engine in get_engines().values():
+        await db_engine.dispose()
+    logging_helper.stop_logging()
 
 
 # Here you include your routes from /routes
 app.include_router(user_router, prefix="/api/v1") # Route for working with "users"
 app.include_router(item_router, prefix="/api/v1") # Route for working with "items"
+app.include_router(service_router) # Health and readiness probes
+app.include_router(debug_router) # Runtime diagnostics (requires DEBUG_TOKEN)
 
 
 @app.get("/")
 @app.get("/home")
-async def home_page(db: AsyncSession = Depends(get_db)):
+async def home_page():
     """
     API's home page
     Return base info about service
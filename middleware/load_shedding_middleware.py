@@ -0,0 +1,49 @@
+import json
+import time
+
+from helpers.route_helper import match_route_name
+from services.lane_services import LaneScheduler
+from services.load_shedding_services import ConcurrencyLimiter
+
+"""
+Middleware rejecting requests over the adaptive concurrency limit (load shedding).
+"""
+
+
+class LoadSheddingMiddleware:
+    """
+    Pure ASGI middleware.
+
+    Route of request is matched before the app runs and mapped to its priority class
+    (ROUTE_PRIORITIES). Requests without room under ConcurrencyLimiter limit get
+    503 with Retry-After right away: they don't touch pool, bcrypt executor or the database.
+    Latency of admitted requests adjusts the limit (without time spent in the queue
+    of their lane, see LaneScheduler).
+    """
+
+    OVERLOADED_BODY = json.dumps({"detail": "Service is overloaded, retry later"}).encode()
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ConcurrencyLimiter.enabled:
+            return await self.app(scope, receive, send)
+
+        route = match_route_name(scope)
+        if not ConcurrencyLimiter.try_acquire(ConcurrencyLimiter.get_priority(route)):
+            await send({"type": "http.response.start",
+                        "status": 503,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(self.OVERLOADED_BODY)).encode()),
+                                    (b"retry-after", str(ConcurrencyLimiter.retry_after).encode())]})
+            await send({"type": "http.response.body", "body": self.OVERLOADED_BODY})
+            return
+
+        started = time.perf_counter()
+        latency = None
+        try:
+            await self.app(scope, receive, send)
+            latency = time.perf_counter() - started - scope.get("state", {}).get(LaneScheduler.WAIT_STATE, 0.0)
+        finally:
+            ConcurrencyLimiter.release(route, latency)
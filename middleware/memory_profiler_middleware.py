@@ -0,0 +1,26 @@
+from helpers import memory_profiler_helper
+from helpers.route_helper import get_route_name
+
+"""
+Middleware recording memory allocated by every request (see /debug/memory).
+"""
+
+
+class MemoryProfilerMiddleware:
+    """
+    Pure ASGI middleware. Measures from request start until response
+    body is sent, so JSON serialization of the response is included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started_memory = memory_profiler_helper.begin_request()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            memory_profiler_helper.end_request(get_route_name(scope), started_memory)
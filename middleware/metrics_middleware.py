@@ -0,0 +1,42 @@
+import time
+
+from helpers import metrics_helper
+from helpers.route_helper import get_route_name
+
+"""
+Middleware recording request count, latency and in-flight requests per route.
+"""
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware, metrics are updated on event loop thread without locks.
+    Routes are labeled by path template, so label count stays small.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status_code = 500   # If app fails before response starts
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics_helper.REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics_helper.REQUESTS_IN_FLIGHT.dec()
+
+            method = scope["method"]
+            route = get_route_name(scope).split(" ", 1)[1]
+            metrics_helper.REQUESTS.inc(method, route, str(status_code))
+            metrics_helper.REQUEST_LATENCY.observe(time.perf_counter() - started, method, route)
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+
+from helpers import query_cancel_helper
+
+logger = logging.getLogger(__name__)
+
+"""
+Middleware enforcing statement timeouts per route and cancelling
+database work of requests whose client has disconnected.
+"""
+
+
+class QueryCancelMiddleware:
+    """
+    Pure ASGI middleware.
+
+    Starts statement guard of every request (route statement timeouts, see query_cancel_helper).
+    Reads of CANCELLABLE_METHODS are watched for client disconnect: request body messages are
+    read by a watcher task and passed to the app through a queue. When "http.disconnect" arrives
+    before the response is finished, running statements are aborted and the request is cancelled,
+    so its pool connections go back to the pool right away.
+
+    Writes are never cancelled (nobody would learn whether they were committed), only timed out.
+    """
+
+    CANCELLABLE_METHODS = ("GET", "HEAD")
+    CLIENT_CLOSED_STATUS = 499  # Status of cancelled requests in metrics (not sent, the client is gone)
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request = query_cancel_helper.begin_request(scope)
+        if scope["method"] not in self.CANCELLABLE_METHODS:
+            return await self.app(scope, receive, send)
+
+        task = asyncio.current_task()
+        messages = asyncio.Queue()
+        response_started = False
+        response_finished = False
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if not response_finished:
+                        running = query_cancel_helper.cancel_request(request)
+                        logger.info("Client disconnected, request cancelled",
+                                    extra={"route": scope.get("path"), "running_statements": running})
+                        task.cancel()
+                    return
+
+        async def send_tracking(message):
+            nonlocal response_started, response_finished
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_finished = True
+            await send(message)
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await self.app(scope, messages.get, send_tracking)
+        except asyncio.CancelledError:
+            if not request.cancelled or task.uncancel() > 0:
+                raise   # Cancelled by server (shutdown), not by disconnect
+
+            if not response_started:
+                await send({"type": "http.response.start", "status": self.CLIENT_CLOSED_STATUS, "headers": []})
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            watcher.cancel()
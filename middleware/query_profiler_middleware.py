@@ -0,0 +1,37 @@
+from helpers import query_profiler_helper
+from helpers.route_helper import get_route_name
+
+"""
+Middleware adding SQL profile of every request to response headers
+and to per-route statistics (see /debug/queries).
+"""
+
+
+class QueryProfilerMiddleware:
+    """
+    Pure ASGI middleware (no extra task per request, unlike BaseHTTPMiddleware).
+    
+    Starts query profile before request and, when response starts,
+    adds "Server-Timing" header and records route statistics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = query_profiler_helper.start_profile()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", query_profiler_helper.format_server_timing(profile).encode("latin-1")))
+                message["headers"] = headers
+
+                query_profiler_helper.record_route(get_route_name(scope), profile)
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
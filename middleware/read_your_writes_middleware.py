@@ -0,0 +1,43 @@
+from starlette.requests import cookie_parser
+
+from services.replica_services import ReplicaRouter
+
+"""
+Middleware for read-your-writes consistency with read replicas.
+"""
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware.
+
+    Starts read routing of every request: client that wrote recently
+    ("read_primary_until" cookie) reads from primary. When request commits
+    a write, the cookie is set for READ_YOUR_WRITES_SECONDS.
+    Does nothing if no replica is configured.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ReplicaRouter.replicas:
+            return await self.app(scope, receive, send)
+
+        cookie_value = None
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                cookie_value = cookie_parser(value.decode("latin-1")).get(ReplicaRouter.COOKIE_NAME)
+                break
+
+        state = ReplicaRouter.begin_request(cookie_value)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and state.wrote:
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", ReplicaRouter.make_cookie().encode("latin-1")))
+                message["headers"] = headers
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,53 @@
+from helpers import tracing_helper
+from helpers.route_helper import get_route_name
+
+"""
+Middleware starting a trace for sampled requests.
+"""
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware. Sampling is decided once per request (root span),
+    so every request is traced completely or not at all.
+    Traced responses get "x-trace-id" header to find the trace in export file.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        traceparent = None
+        for name, value in scope.get("headers", []):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        if not tracing_helper.should_sample(traceparent):
+            return await self.app(scope, receive, send)
+
+        root = tracing_helper.start_trace(f"{scope['method']} {scope['path']}",
+                                          traceparent=traceparent,
+                                          **{"http.method": scope["method"], "http.target": scope["path"]})
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", root.trace_id.encode("latin-1")))
+                message["headers"] = headers
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        except BaseException as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            if scope.get("route") is not None:
+                root.name = get_route_name(scope)
+            tracing_helper.finish_trace(root)
@@ -10,7 +10,9 @@ from database import schema, models, response_schemas
 from helpers import exception_helper
 from DAO.general_dao import GeneralDAO
 from DAO.item_dao import ItemDao
-from database.database import get_db
+from database.database import get_db, get_read_db, release_connection
+from services.invalidation_services import InvalidationBus
+from services.write_queue_services import WriteQueue
 
 """
 ITEM BUSINESS LOGIC LAYER
@@ -29,6 +31,7 @@ Each function here:
 4. Returns standardized responses
 """
 
+@release_connection
 async def create_item(request: schema.Item,
                       current_user: schema.User,
                       db: AsyncSession = Depends(get_db)) -> response_schemas.ItemCreateResponse:
@@ -52,18 +55,22 @@ async def create_item(request: schema.Item,
     :raises:    HTTPException 409
                 If user already has item with same name
     """
-    # Check if user already has an item with the same name
-    user_item = await ItemDao.get_item_by_user_id_and_item_name(db=db, 
-                                                                user_id=current_user.id, 
-                                                                item_name=request.name)
-    # Raise conflict error if duplicate name found
-    await exception_helper.CheckHTTP409Conflict(founding_item=user_item, 
-                                              text="You already have an item with this name")
-    # Create new item
-    new_item = await ItemDao.create_item(db=db,
+    async def insert_item(write_db: AsyncSession) -> models.Item:
+        # Check if user already has an item with the same name
+        user_item = await ItemDao.get_item_by_user_id_and_item_name(db=write_db, 
+                                                                    user_id=current_user.id, 
+                                                                    item_name=request.name)
+        # Raise conflict error if duplicate name found
+        await exception_helper.CheckHTTP409Conflict(founding_item=user_item, 
+                                                  text="You already have an item with this name")
+        # Create new item
+        return await ItemDao.create_item(db=write_db,
                                          request=request,
                                          user_id=current_user.id)
-    await db.refresh(new_item)
+
+    # Check and insert commit together (batched with other writes if WriteQueue is on)
+    new_item = await WriteQueue.run(insert_item, db=db)
+    await InvalidationBus.publish("Item", new_item.id)
 
     return response_schemas.ItemCreateResponse(
         message="Item has been created successfully",
@@ -76,6 +83,7 @@ async def create_item(request: schema.Item,
         )
     )
 
+@release_connection
 async def update_item(item_id: int,
                       user_id: int,
                       item_data: schema.ItemUpdate,
@@ -113,17 +121,23 @@ async def update_item(item_id: int,
     if not item_data.dict(exclude_unset=True):
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    item = await ItemDao.get_item_by_user_id(db=db, 
-                                            item_id=item_id, 
-                                            user_id=user_id)
-    
-    await exception_helper.CheckHTTP404NotFound(founding_item=item, 
-                                              text="Item not found or you don't have permission to update it")
-    
-    updated_item = await GeneralDAO.update_record(model=models.Item,
-                                                  record=item,
-                                                  update_data=item_data,
-                                                  db=db)
+    async def write_update(write_db: AsyncSession) -> models.Item:
+        item = await ItemDao.get_item_by_user_id(db=write_db, 
+                                                item_id=item_id, 
+                                                user_id=user_id,
+                                                with_user=False)
+        
+        await exception_helper.CheckHTTP404NotFound(founding_item=item, 
+                                                  text="Item not found or you don't have permission to update it")
+        
+        return await GeneralDAO.update_record(model=models.Item,
+                                              record=item,
+                                              update_data=item_data,
+                                              db=write_db)
+
+    updated_item = await WriteQueue.run(write_update, db=db)
+    # Drop stale copies of this item from caches of all workers
+    await InvalidationBus.publish("Item", updated_item.id)
     
     return response_schemas.ItemUpdateResponse(
         message="Item has been updated",
@@ -137,6 +151,7 @@ async def update_item(item_id: int,
     )
 
 
+@release_connection
 async def delete_item(item_id: int,
                       user_id: int,
                       db: AsyncSession) -> response_schemas.ItemDeleteResponse:
@@ -159,15 +174,14 @@ async def delete_item(item_id: int,
     :raises:    HTTPException 404
                 If item not found or user doesn't own it
     """
-    # Verify item exists and user owns it
-    item = await ItemDao.get_item_by_user_id(db=db, 
-                                             item_id=item_id, 
-                                             user_id=user_id)
-    await exception_helper.CheckHTTP404NotFound(founding_item=item, 
-                                              text="Item not found or you don't have permission to delete it")
+    async def write_delete(write_db: AsyncSession) -> None:
+        # Deletes only an item of this user, nothing deleted means it doesn't exist or isn't theirs
+        deleted = await ItemDao.delete_item(db=write_db, item_id=item_id, user_id=user_id)
+        await exception_helper.CheckHTTP404NotFound(founding_item=deleted, 
+                                                  text="Item not found or you don't have permission to delete it")
 
-    # Delete the item
-    await ItemDao.delete_item(db=db, item_id=item_id, user_id=user_id)
+    await WriteQueue.run(write_delete, db=db)
+    await InvalidationBus.publish("Item", item_id)
 
     return response_schemas.ItemDeleteResponse(
         message="Item has been deleted",
@@ -175,8 +189,9 @@ async def delete_item(item_id: int,
     )
 
 
+@release_connection
 async def show_item(item_id: int,
-                    db: AsyncSession = Depends(get_db)) -> response_schemas.ItemDetailResponse:
+                    db: AsyncSession = Depends(get_read_db)) -> response_schemas.ItemDetailResponse:
     """
     Retrieve a specific item by ID with user information.
     No ownership check - any user can view any item.
@@ -211,6 +226,7 @@ async def show_item(item_id: int,
         )
     )
 
+@release_connection
 async def get_all_items(db: AsyncSession) -> response_schemas.ItemListResponse:
     """
     Retrieve all items from the system with user information.
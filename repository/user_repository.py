@@ -1,26 +1,35 @@
+import logging
+
 from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from starlette import status
 from starlette.responses import Response
 
 from DAO.item_dao import ItemDao
-from database.database import get_db
+from database.database import get_db, get_read_db, release_connection
 from database import models, schema, response_schemas
 
 from helpers import password_helper, user_helper
 from helpers import exception_helper
-from helpers.exception_helper import CheckHTTP401Unauthorized, CheckHTTP404NotFound, CheckHTTP409Conflict, CheckHTTP403FORBIDDEN_BOOL
+from helpers.exception_helper import CheckHTTP401Unauthorized, CheckHTTP404NotFound, CheckHTTP409Conflict, CheckHTTP403FORBIDDEN_BOOL, CheckHTTP400BadRequest
 from helpers.token_helper import get_token, verify_token
 
 from DAO.general_dao import GeneralDAO
 from DAO.user_dao import UserDAO
 
 from helpers import password_helper
+from services.availability_services import AvailabilityService
+from services.cache_services import CacheService
+from services.invalidation_services import InvalidationBus
 from services.item_services import ItemService
+from services.replica_services import ReplicaRouter
+from services.shard_services import ShardRouter
 from services.user_services import UserService
+from services.write_queue_services import WriteQueue
 
+logger = logging.getLogger(__name__)
 
 """
 User business logic layer.
@@ -28,6 +37,7 @@ Handles user authentication, registration, and user-related operations.
 """
 
 
+@release_connection
 async def sign_up(request: schema.User,
                   db: AsyncSession) -> response_schemas.UserCreateResponse:
     
@@ -41,35 +51,38 @@ async def sign_up(request: schema.User,
     :return: Success response with user data or error
     :raises HTTPException: 409 if email or username already exists
     """
-    # Check for existing email
-    email = await UserDAO.get_user_email(db=db, user_email=str(request.email))
-    # Check for existing username
-    name = await UserDAO.get_user_name(db=db, user_name=str(request.name))
-
-    # Return conflict error if email exists
-    await CheckHTTP409Conflict(email, "Email already exists")
-
-    # Return conflict error if username exists
-    await CheckHTTP409Conflict(name, "This username already exists")
-
-    print(f"   Original password from request: '{request.password}'")
-    print(f"   Password length: {len(request.password)}")
-    print(f"   Password type: {type(request.password)}")
-
-    # Hash password and create new user
-    hash_password = password_helper.hash_password(request.password)
-    print(f"   Hashed password: {hash_password}")
-    print(f"   Hashed password length: {len(hash_password)}")
-
-    new_user = models.User(name=request.name, 
-                           email=request.email, 
-                           password=hash_password,
-                           bio=request.bio)
-    db.add(new_user)
-
-    await db.commit()
-    await db.refresh(new_user)
-    print(f"   User created with ID: {new_user.id}")
+    # Hash password before the write: no pool connection is held while bcrypt runs
+    hash_password = await password_helper.hash_password_async(request.password)
+
+    async def insert_user(write_db: AsyncSession) -> models.User:
+        # Check for existing email
+        email = await UserDAO.get_user_email(db=write_db, user_email=str(request.email))
+        # Check for existing username
+        name = await UserDAO.get_user_name(db=write_db, user_name=str(request.name))
+
+        # Return conflict error if email exists
+        await CheckHTTP409Conflict(email, "Email already exists")
+
+        # Return conflict error if username exists
+        await CheckHTTP409Conflict(name, "This username already exists")
+
+        new_user = models.User(id=await ShardRouter.allocate_id("users"),   # Selects shard with sharding
+                               name=request.name, 
+                               email=request.email, 
+                               password=hash_password,
+                               bio=request.bio)
+        write_db.add(new_user)
+        await write_db.flush()
+        await write_db.refresh(new_user)   # Load server default bio
+        return new_user
+
+    # Checks and insert commit together (batched with other writes if WriteQueue is on)
+    new_user = await WriteQueue.run(insert_user, db=db)
+    logger.info("User created", extra={"user_id": new_user.id})
+
+    # Drop cached users list in all workers
+    await InvalidationBus.publish("User", new_user.id)
+    AvailabilityService.add(name=new_user.name, email=new_user.email)
 
     # Create response data using UserResponse schema to avoid recursion
     user_data = await UserService.create_user_response(user=new_user)
@@ -80,6 +93,7 @@ async def sign_up(request: schema.User,
         data=user_data
     )
 
+@release_connection
 async def login(request: schema.UserSignIn,
                 response: Response,
                 db: AsyncSession) -> response_schemas.UserLoginResponse:
@@ -109,35 +123,59 @@ async def login(request: schema.UserSignIn,
         data=user
     )
 
-async def get_current_user(db: AsyncSession = Depends(get_db),
+@release_connection
+async def get_current_user(db: AsyncSession = Depends(get_read_db),
                            token: str = Depends(get_token)) -> models.User:
     """
     Get current authenticated user from JWT token.
     Used as dependency in protected routes.
+    User data is cached per user until the user is updated.
+    Looked up with read-only session, also in routes that write.
     
-    :param db: Database session
+    :param db: Read-only database session
     :param token: JWT token from request
 
     :return: User object or error response
     :raises HTTPException: 401 if token invalid or user not found
     """
     user_id = verify_token(token=token)
-    print("user_id in get current user: ", user_id)
+    logger.debug("Current user from token", extra={"user_id": user_id, "sample_rate": 0.01})
     if not user_id:
         return HTTPException(status_code=401, detail="User is unauthorized")
+
+    # Recent writer reads from primary, not from lagging replicas
+    ReplicaRouter.note_user(user_id)
     
-    user = await GeneralDAO.get_record_by_id(record_id=user_id,
-                                             model=models.User, 
-                                             db=db)
-    
-    await CheckHTTP401Unauthorized(founding_item=user, text="User is unauthorized")
+    return await get_cached_user(user_id=user_id, db=db)
 
-    # Create response data using UserResponse schema to avoid recursion
-    user_data = await UserService.create_user_response(user=user)
 
-    return user_data
+async def get_cached_user(user_id: int,
+                          db: AsyncSession) -> response_schemas.UserResponse:
+    """
+    Get user response by ID from cache or database.
+    Cached entry lives until the user is updated in any worker.
+
+    :param user_id: User ID
+    :param db: Database session
+
+    :return: User data
+    :raises HTTPException: 401 if user not found
+    """
+    async def load_user():
+        user = await GeneralDAO.get_record_by_id(record_id=user_id,
+                                                 model=models.User, 
+                                                 db=db)
+        
+        await CheckHTTP401Unauthorized(founding_item=user, text="User is unauthorized")
+
+        # Create response data using UserResponse schema to avoid recursion
+        return await UserService.create_user_response(user=user)
+
+    return await CacheService.get_or_load(key=CacheService.make_key("User", user_id),
+                                          loader=load_user)
 
 
+@release_connection
 async def update_me(user_id: int,
                     user_data: schema.UserUpdate,
                     current_user: schema.User,
@@ -160,16 +198,22 @@ async def update_me(user_id: int,
     if not user_data.dict(exclude_unset=True):
         raise HTTPException(status_code=400, detail="No fields for update")
     
-    updating_user = await GeneralDAO.get_record_by_id(record_id=user_id,
-                                                      model=models.User,
-                                                      db=db)
-    
-    await CheckHTTP404NotFound(founding_item=updating_user, text="User not found")
-
-    updated_user = await GeneralDAO.update_record(model=models.User,
-                                                  record=updating_user,
-                                                  update_data=user_data,
-                                                  db=db)
+    async def write_update(write_db: AsyncSession) -> models.User:
+        updating_user = await GeneralDAO.get_record_by_id(record_id=user_id,
+                                                          model=models.User,
+                                                          db=write_db)
+        
+        await CheckHTTP404NotFound(founding_item=updating_user, text="User not found")
+
+        return await GeneralDAO.update_record(model=models.User,
+                                              record=updating_user,
+                                              update_data=user_data,
+                                              db=write_db)
+
+    updated_user = await WriteQueue.run(write_update, db=db)
+    # Drop stale copies of this user from caches of all workers
+    await InvalidationBus.publish("User", updated_user.id)
+    AvailabilityService.add(name=updated_user.name, email=updated_user.email)
 
     # Create response data using UserResponse schema to avoid recursion
     user_data = await UserService.create_user_response(user=updated_user)
@@ -180,8 +224,9 @@ async def update_me(user_id: int,
         data = user_data
     )
 
+@release_connection
 async def get_current_user_items(current_user: schema.User, 
-                                 db: AsyncSession = Depends(get_db)) -> response_schemas.UserWithItemsDataResponse:
+                                 db: AsyncSession = Depends(get_read_db)) -> response_schemas.UserWithItemsDataResponse:
     """
     Get all items belonging to the current authenticated user.
     
@@ -191,11 +236,9 @@ async def get_current_user_items(current_user: schema.User,
     :return: User's items
     :raises HTTPException: 404 if no items found
     """
-    items = await ItemDao.get_items_by_user_id(db=db, user_id=current_user.id)
-    await CheckHTTP404NotFound(items, "No items found for this user")
-
     # Use Response Schema to avoid recursion
     user_data = await UserDAO.get_user_with_items(user_id=current_user.id, db=db)
+    await CheckHTTP404NotFound(user_data.items, "No items found for this user")
 
     # Create response data using UserWithItemsResponse schema to avoid recursion
     return response_schemas.UserWithItemsDataResponse(
@@ -204,9 +247,10 @@ async def get_current_user_items(current_user: schema.User,
         data=user_data
     )
 
+@release_connection
 async def get_current_user_item(item_id: int,
                                 current_user: schema.User,
-                                db: AsyncSession = Depends(get_db)) -> response_schemas.ItemDetailResponse:
+                                db: AsyncSession = Depends(get_read_db)) -> response_schemas.ItemDetailResponse:
     """
     Get specific item belonging to the current user.
     
@@ -233,6 +277,29 @@ async def get_current_user_item(item_id: int,
         )
 
 
+@release_connection
+async def get_user(user_id: int,
+                   db: AsyncSession) -> response_schemas.UserWithItemsDataResponse:
+    """
+    Get user profile by ID with user's items.
+
+    :param user_id: ID of user to retrieve
+    :param db: Database session
+
+    :return: User data with items
+    :raises HTTPException: 404 if user not found
+    """
+    # Use Response Schema to avoid recursion
+    user_data = await UserDAO.get_user_with_items(user_id=user_id, db=db)
+
+    return response_schemas.UserWithItemsDataResponse(
+        message="User retrieved successfully",
+        status_code=200,
+        data=user_data
+    )
+
+
+@release_connection
 async def get_all_users(db: AsyncSession) -> response_schemas.UserListResponse:
     """
     Retrieve all users from the system with their items.
@@ -241,13 +308,37 @@ async def get_all_users(db: AsyncSession) -> response_schemas.UserListResponse:
     :return: List of all users with their items
     :raises HTTPException: 404 if no users found
     """
-    users = await GeneralDAO.get_all_records(db=db, model=models.User)
-    await exception_helper.CheckHTTP404NotFound(founding_item=users, text="Users not found")
-
     users = await UserDAO.get_all_users(db=db)
-    
+
     return response_schemas.UserListResponse(
         message="Users retrieved successfully",
         status_code=200,
         data=users
     )
+
+
+@release_connection
+async def check_availability(name: Optional[str],
+                             email: Optional[str],
+                             db: AsyncSession) -> response_schemas.UserAvailabilityResponse:
+    """
+    Check if username and/or email are free for registration.
+    Most free values are answered from in-memory filters without queries.
+
+    :param name: Username to check
+    :param email: Email to check
+    :param db: Database session
+
+    :return: Availability of provided values
+    :raises HTTPException: 400 if neither name nor email provided
+    """
+    await CheckHTTP400BadRequest(condition=(name is None and email is None),
+                                 text="Provide name and/or email to check")
+
+    availability = await AvailabilityService.check(db=db, name=name, email=email)
+
+    return response_schemas.UserAvailabilityResponse(
+        message="Availability checked",
+        status_code=200,
+        data=availability
+    )
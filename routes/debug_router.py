@@ -0,0 +1,301 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Dict, Any, Literal, Optional
+
+from starlette import status
+
+from config import settings
+from database.database import Base, get_pool_stats
+from helpers import memory_profiler_helper, query_profiler_helper, slow_query_helper
+from helpers.loop_watchdog_helper import LoopWatchdog
+from helpers.sampling_profiler_helper import ContinuousProfiler, SamplingProfiler
+from services.lane_services import LaneScheduler
+from services.load_shedding_services import ConcurrencyLimiter
+from services.rate_limit_services import RateLimiter
+from services.replica_services import ReplicaRouter
+from services.shard_services import ShardRouter
+from services.write_queue_services import WriteQueue
+
+"""
+Debug API routes.
+Runtime diagnostics for production: SQL statistics per route and other profilers.
+
+All endpoints require "X-Debug-Token" header equal to DEBUG_TOKEN setting.
+If DEBUG_TOKEN is not set, debug endpoints are disabled (404).
+"""
+
+
+async def verify_debug_token(x_debug_token: Optional[str] = Header(default=None)) -> None:
+    """
+    Dependency protecting debug endpoints.
+    
+    :param x_debug_token: Value of "X-Debug-Token" header
+    :raises HTTPException: 404 if debug endpoints are disabled, 403 if token is wrong
+    """
+    if not settings.DEBUG_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    if not hmac.compare_digest((x_debug_token or "").encode(), settings.DEBUG_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid debug token")
+
+
+# Router configuration with prefix and tags for Swagger documentation
+debug_router = APIRouter(
+    prefix="/debug",    # All routes will be prefixed with /debug
+    tags=["debug_router"],  # Grouped under "Debug" in Swagger UI
+    dependencies=[Depends(verify_debug_token)]  # Every endpoint is protected
+)
+
+
+@debug_router.get("/queries")
+async def get_query_stats(reset: bool = False) -> Dict[str, Any]:
+    """
+    Get SQL statistics aggregated per route:
+    requests, queries (total / avg / max per request), DB time, loaded rows and the slowest statement.
+    
+    - **reset**: Clear statistics after reading (query parameter)
+    
+    Routes with unexpected avg_queries show redundant queries.
+    """
+
+    stats = query_profiler_helper.get_route_stats()
+    if reset:
+        query_profiler_helper.reset_route_stats()
+
+    return {'routes': stats}
+
+
+@debug_router.get("/slow_queries")
+async def get_slow_queries(reset: bool = False) -> Dict[str, Any]:
+    """
+    Get statement shapes slower than SLOW_QUERY_MS with their query plans:
+    count, total / avg / max time, redacted parameters, plan and full_scan flag.
+    
+    - **reset**: Clear recorded shapes after reading (query parameter)
+    
+    full_scan=true usually means a missing index.
+    """
+
+    slow_queries = slow_query_helper.get_slow_queries()
+    if reset:
+        slow_query_helper.reset_slow_queries()
+
+    return slow_queries
+
+
+@debug_router.get("/pool")
+async def get_pool() -> Dict[str, Any]:
+    """
+    Get engine profile (DB_PROFILE with overrides) and live statistics of every pool:
+    connections by state, checkouts, timeouts, pings, average / max wait and hold time.
+
+    Growing timeouts or wait_ms_avg mean the pool is too small for the load
+    (or connections are held too long, see hold_ms_avg); tune with DB_POOL_SIZE / DB_MAX_OVERFLOW.
+    """
+
+    return get_pool_stats()
+
+
+@debug_router.get("/write_queue")
+async def get_write_queue() -> Dict[str, Any]:
+    """
+    Get group commit statistics (WRITE_QUEUE_ENABLED): queued write operations,
+    committed batches and operations, failed batch commits, average batch size.
+    """
+
+    return WriteQueue.get_stats()
+
+
+@debug_router.get("/concurrency")
+async def get_concurrency() -> Dict[str, Any]:
+    """
+    Get load shedding statistics (LOAD_SHED_ENABLED): adaptive concurrency limit,
+    requests in flight, limit of every priority class, admitted and shed requests,
+    baseline latency of every route the limit is adjusted by.
+    """
+
+    return ConcurrencyLimiter.get_stats()
+
+
+@debug_router.get("/lanes")
+async def get_lanes() -> Dict[str, Any]:
+    """
+    Get priority lanes statistics (LANES_ENABLED): slots, running and queued requests,
+    rejected (queue full) and timed out requests, executor threads and tasks of every lane.
+    """
+
+    return LaneScheduler.get_stats()
+
+
+@debug_router.get("/rate_limits")
+async def get_rate_limits() -> Dict[str, Any]:
+    """
+    Get rate limit statistics (RATE_LIMIT_ENABLED): backend (per worker memory or shared
+    memory file), tracked keys, every policy with its allowed and limited requests.
+    """
+
+    return RateLimiter.get_stats()
+
+
+@debug_router.get("/replicas")
+async def get_replicas() -> Dict[str, Any]:
+    """
+    Get read replicas status: health, replication lag, read-only sessions
+    routed to each replica and to primary, number of remembered recent writers.
+    """
+
+    return ReplicaRouter.get_stats()
+
+
+@debug_router.get("/shards")
+async def get_shards() -> Dict[str, Any]:
+    """
+    Get sharding configuration (DATABASE_SHARD_URLS): shards, routing (hash or range),
+    ORM statements routed to each shard, to every shard ("all") and concurrent list reads ("fan_out").
+
+    Many "all" statements mean lookups without user ID (by email, by item ID) that read every shard.
+    """
+
+    return ShardRouter.get_stats()
+
+
+@debug_router.post("/shards/rebalance")
+async def rebalance_shards(dry_run: bool = True) -> Dict[str, Any]:
+    """
+    Move users (with their items) to shards they belong to after shards or routing changed.
+    Pause writes of the application while moving.
+
+    - **dry_run**: Only count users per shard and planned moves (query parameter, default)
+    """
+
+    if not ShardRouter.enabled():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Sharding is disabled, set DATABASE_SHARD_URLS")
+
+    return await ShardRouter.rebalance(metadata=Base.metadata, dry_run=dry_run)
+
+
+@debug_router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(seconds: float = Query(default=10, gt=0, le=60),
+                      mode: Literal["threads", "tasks"] = "threads") -> PlainTextResponse:
+    """
+    Run sampling profiler for given time and return collapsed stacks (flamegraph input).
+    
+    - **seconds**: Profiling duration, requests keep being served meanwhile (query parameter)
+    - **mode**: "threads" - what every thread is executing (CPU: bcrypt, pydantic, SQLAlchemy),
+      "tasks" - where every asyncio task is waiting (query parameter)
+    
+    Render with: flamegraph.pl profile.txt > profile.svg (or open in speedscope).
+    Headers X-Profile-Samples and X-Profile-Overhead show number of samples
+    and share of time spent sampling.
+    """
+
+    if SamplingProfiler.running is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Profiler is already running")
+
+    profiler = SamplingProfiler(interval=settings.PROFILER_INTERVAL_MS / 1000)
+    await profiler.run(seconds=seconds, mode=mode)
+
+    return PlainTextResponse(profiler.collapsed(),
+                             headers={"X-Profile-Samples": str(profiler.sample_count),
+                                      "X-Profile-Overhead": f"{profiler.overhead:.4f}"})
+
+
+@debug_router.get("/profile/continuous", response_class=PlainTextResponse)
+async def get_continuous_profile() -> PlainTextResponse:
+    """
+    Return collapsed stacks of the always-on profiler (PROFILER_CONTINUOUS_ENABLED):
+    what every thread was executing during the last completed windows.
+    
+    Headers X-Profile-Samples, X-Profile-Seconds and X-Profile-Overhead show number of samples,
+    covered time and share of time spent sampling.
+    """
+
+    if not ContinuousProfiler.is_running():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Continuous profiler is disabled")
+
+    profile = ContinuousProfiler.get_profile()
+
+    return PlainTextResponse(profile["collapsed"],
+                             headers={"X-Profile-Samples": str(profile["samples"]),
+                                      "X-Profile-Seconds": f"{profile['seconds']:.1f}",
+                                      "X-Profile-Overhead": f"{profile['overhead']:.4f}"})
+
+
+@debug_router.get("/loop_stalls")
+async def get_loop_stalls(reset: bool = False) -> Dict[str, Any]:
+    """
+    Get event loop stalls detected by watchdog:
+    number of stalls, longest stall, offenders (blocking code lines) and recent stalls with stacks.
+    
+    - **reset**: Clear statistics after reading (query parameter)
+    """
+
+    stats = LoopWatchdog.get_stats()
+    if reset:
+        LoopWatchdog.reset()
+
+    return stats
+
+
+def check_memory_profiler_enabled() -> None:
+    """
+    Check that memory profiler is enabled.
+    
+    :raises HTTPException: 409 if MEMORY_PROFILER_ENABLED is off
+    """
+    if not settings.MEMORY_PROFILER_ENABLED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Memory profiler is disabled, set MEMORY_PROFILER_ENABLED=1")
+
+
+@debug_router.get("/memory")
+async def get_memory_stats(reset: bool = False) -> Dict[str, Any]:
+    """
+    Get memory allocated per route: net (kept after request) and peak bytes.
+    Requires MEMORY_PROFILER_ENABLED=1.
+    
+    - **reset**: Clear statistics after reading (query parameter)
+    """
+
+    check_memory_profiler_enabled()
+
+    stats = memory_profiler_helper.get_route_stats()
+    if reset:
+        memory_profiler_helper.reset_route_stats()
+
+    return {'traced': memory_profiler_helper.get_traced_memory(),
+            'routes': stats}
+
+
+@debug_router.post("/memory/snapshot")
+async def take_memory_snapshot() -> Dict[str, Any]:
+    """
+    Take baseline snapshot of allocations for /debug/memory/diff.
+    """
+
+    check_memory_profiler_enabled()
+
+    return {'blocks': memory_profiler_helper.take_baseline()}
+
+
+@debug_router.get("/memory/diff")
+async def get_memory_diff(limit: int = Query(default=20, gt=0, le=500),
+                          group_by: Literal["lineno", "filename", "traceback"] = "lineno") -> Dict[str, Any]:
+    """
+    Compare current allocations with baseline snapshot, biggest growth first.
+    
+    - **limit**: Number of locations to return (query parameter)
+    - **group_by**: Group allocations by source line, file or whole traceback (query parameter)
+    """
+
+    check_memory_profiler_enabled()
+
+    try:
+        diff = memory_profiler_helper.diff_baseline(limit=limit, group_by=group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    return {'diff': diff}
@@ -5,10 +5,12 @@ from typing import Dict, Any, List
 
 from context.request_context import RequestContext, get_request_context
 from database import response_schemas, schema
-from database.database import get_db
+from database.database import get_read_db
 
 from repository import item_repository
 from repository.user_repository import get_current_user
+from services.lane_services import LaneScheduler
+from services.rate_limit_services import RateLimiter
 
 
 """
@@ -35,8 +37,8 @@ item_router = APIRouter(
 )
 
 
-@item_router.get("/")
-async def get_items_list(db: AsyncSession = Depends(get_db)) -> response_schemas.ItemListResponse:
+@item_router.get("/", dependencies=[Depends(RateLimiter.limit("list")), Depends(LaneScheduler.lane("reads"))])
+async def get_items_list(db: AsyncSession = Depends(get_read_db)) -> response_schemas.ItemListResponse:
     """
     Retrieve all items from the system with user information.
     Public endpoint - no authentication required.
@@ -47,9 +49,9 @@ async def get_items_list(db: AsyncSession = Depends(get_db)) -> response_schemas
     return items_list
 
 
-@item_router.get("/item/{item_id}")
+@item_router.get("/item/{item_id}", dependencies=[Depends(LaneScheduler.lane("reads"))])
 async def get_item(item_id: int,
-                   db: AsyncSession = Depends(get_db)) -> response_schemas.ItemDetailResponse:
+                   db: AsyncSession = Depends(get_read_db)) -> response_schemas.ItemDetailResponse:
     """
     Retrieve a specific item by ID with user information.
     No authentication required - public access.
@@ -62,7 +64,8 @@ async def get_item(item_id: int,
                                            db=db)
 
 
-@item_router.post("/create_item")
+@item_router.post("/create_item",
+                  dependencies=[Depends(RateLimiter.limit("create_item")), Depends(LaneScheduler.lane("writes"))])
 async def add_item(request: schema.Item,
                    request_context: RequestContext = Depends(get_request_context)) -> response_schemas.ItemCreateResponse:
     """
@@ -83,7 +86,8 @@ async def add_item(request: schema.Item,
                                              current_user=request_context.current_user, 
                                              db=request_context.db)
 
-@item_router.patch("/update_item/{item_id}", status_code=200)
+@item_router.patch("/update_item/{item_id}", status_code=200,
+                   dependencies=[Depends(LaneScheduler.lane("writes"))])
 async def get_me(item_id: int,
                  item_data: schema.ItemUpdate,
                  request_context: RequestContext = Depends(get_request_context)) -> response_schemas.ItemUpdateResponse:
@@ -109,7 +113,7 @@ async def get_me(item_id: int,
                                              item_data=item_data,
                                              db=request_context.db)
 
-@item_router.delete("/delete_item/{item_id}")
+@item_router.delete("/delete_item/{item_id}", dependencies=[Depends(LaneScheduler.lane("writes"))])
 async def delete_item(item_id: int,
                       request_context: RequestContext = Depends(get_request_context)) -> response_schemas.ItemDeleteResponse:
     """
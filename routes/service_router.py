@@ -0,0 +1,68 @@
+import hmac
+
+from fastapi import APIRouter, Header, Response
+from fastapi.responses import PlainTextResponse
+from typing import Dict, Any, Optional
+
+from starlette import status
+
+from config import settings
+from helpers import metrics_helper
+from services.warmup_services import WarmupService
+
+"""
+Service API routes.
+Health and readiness probes for load balancers and orchestrators,
+metrics for Prometheus.
+
+/metrics shows routes, pool sizes and queue depths: if METRICS_TOKEN is set,
+it requires "Authorization: Bearer <METRICS_TOKEN>" (Prometheus
+authorization.credentials), otherwise it is open like the probes.
+"""
+
+# Router configuration with tags for Swagger documentation
+service_router = APIRouter(
+    tags=["service_router"]     # Grouped under "Service" in Swagger UI
+)
+
+
+@service_router.get("/health")
+async def health() -> Dict[str, Any]:
+    """
+    Liveness probe.
+    Returns 200 while the process is able to serve requests.
+    """
+
+    return {'status': 'alive'}
+
+@service_router.get("/ready")
+async def ready(response: Response) -> Dict[str, Any]:
+    """
+    Readiness probe.
+    Returns 503 until startup warm-up is finished, then 200.
+    """
+
+    if not WarmupService.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {'status': 'warming_up'}
+
+    return {'status': 'ready',
+            'warmup_seconds': round(WarmupService.duration, 3)}
+
+@service_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(authorization: Optional[str] = Header(default=None)) -> PlainTextResponse:
+    """
+    Prometheus metrics in text exposition format.
+    Route latency histograms, pool, bcrypt executor, cache and event loop stats.
+    """
+
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("Metrics are disabled\n", status_code=status.HTTP_404_NOT_FOUND)
+
+    if settings.METRICS_TOKEN and not hmac.compare_digest((authorization or "").encode(),
+                                                          f"Bearer {settings.METRICS_TOKEN}".encode()):
+        return PlainTextResponse("Invalid metrics token\n", status_code=status.HTTP_401_UNAUTHORIZED,
+                                 headers={"WWW-Authenticate": "Bearer"})
+
+    return PlainTextResponse(metrics_helper.render(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
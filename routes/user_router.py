@@ -1,15 +1,17 @@
 from fastapi import Depends, APIRouter, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from DAO.user_dao import UserDAO
-from context.request_context import RequestContext, get_request_context
-from database.database import get_db
+from context.request_context import RequestContext, get_read_request_context, get_request_context
+from database.database import get_db, get_read_db
 from database import schema, models, response_schemas
 from helpers import exception_helper
 
 from repository.user_repository import get_current_user
 from repository import user_repository
+from services.lane_services import LaneScheduler
+from services.rate_limit_services import RateLimiter
 
 from DAO.general_dao import GeneralDAO
 
@@ -25,7 +27,8 @@ user_router = APIRouter(
 )
 
 
-@user_router.post("/sign_up", status_code=201)
+@user_router.post("/sign_up", status_code=201,
+                  dependencies=[Depends(RateLimiter.limit("sign_up")), Depends(LaneScheduler.lane("auth"))])
 async def sign_up(request: schema.User,
                   db: AsyncSession = Depends(get_db)) -> response_schemas.UserCreateResponse:
     """
@@ -38,7 +41,7 @@ async def sign_up(request: schema.User,
 
     return await user_repository.sign_up(request, db)
 
-@user_router.post("/sign_in", status_code=200)
+@user_router.post("/sign_in", status_code=200, dependencies=[Depends(LaneScheduler.lane("auth"))])
 async def sign_in(request: schema.UserSignIn,
                   response: Response,
                   db: AsyncSession = Depends(get_db)) -> response_schemas.UserLoginResponse:
@@ -63,8 +66,8 @@ async def logout(response: Response) -> Dict[str, str]:
     response.delete_cookie(key='user_access_token')
     return {'message': 'User logout'}
 
-@user_router.get("/")
-async def get_users_for_user(db: AsyncSession = Depends(get_db)) -> response_schemas.UserListResponse:
+@user_router.get("/", dependencies=[Depends(RateLimiter.limit("list")), Depends(LaneScheduler.lane("reads"))])
+async def get_users_for_user(db: AsyncSession = Depends(get_read_db)) -> response_schemas.UserListResponse:
     """
     Get list of all users in the system.
     Public endpoint - no authentication required.
@@ -74,9 +77,26 @@ async def get_users_for_user(db: AsyncSession = Depends(get_db)) -> response_sch
 
     return await user_repository.get_all_users(db=db)
 
-@user_router.get("/user/{user_id}", status_code=200)
+@user_router.get("/available", status_code=200,
+                 dependencies=[Depends(RateLimiter.limit("availability")), Depends(LaneScheduler.lane("reads"))])
+async def check_availability(name: Optional[str] = None,
+                             email: Optional[str] = None,
+                             db: AsyncSession = Depends(get_read_db)) -> response_schemas.UserAvailabilityResponse:
+    """
+    Check if username and/or email are free (e.g. for "username available?" UI check).
+    Public endpoint - no authentication required.
+    
+    - **name**: Username to check (query parameter)
+    - **email**: Email to check (query parameter)
+    
+    Returns availability of each provided value.
+    """
+
+    return await user_repository.check_availability(name=name, email=email, db=db)
+
+@user_router.get("/user/{user_id}", status_code=200, dependencies=[Depends(LaneScheduler.lane("reads"))])
 async def get_user(user_id: int,
-                   db: AsyncSession = Depends(get_db)) -> response_schemas.UserWithItemsDataResponse:
+                   db: AsyncSession = Depends(get_read_db)) -> response_schemas.UserWithItemsDataResponse:
     """
     Get user profile by ID.
     Public endpoint - no authentication required.
@@ -86,16 +106,9 @@ async def get_user(user_id: int,
     Returns user data with their items.
     """
 
-    # Use Response Schema to avoid recursion
-    user_data = await UserDAO.get_user_with_items(user_id=user_id, db=db)
-    
-    return response_schemas.UserWithItemsDataResponse(
-        message="User retrieved successfully",
-        status_code=200,
-        data=user_data
-    )
+    return await user_repository.get_user(user_id=user_id, db=db)
 
-@user_router.get("/me/", status_code=200)
+@user_router.get("/me/", status_code=200, dependencies=[Depends(LaneScheduler.lane("reads"))])
 async def get_me(user_data: schema.User = Depends(get_current_user)) -> schema.User:
     """
     Get current authenticated user's profile.
@@ -106,7 +119,7 @@ async def get_me(user_data: schema.User = Depends(get_current_user)) -> schema.U
 
     return user_data
 
-@user_router.patch("/me/update", status_code=200)
+@user_router.patch("/me/update", status_code=200, dependencies=[Depends(LaneScheduler.lane("writes"))])
 async def update_me(user_data: schema.UserUpdate, 
                     request_context: RequestContext = Depends(get_request_context)) -> response_schemas.UserUpdateResponse:
     """
@@ -126,15 +139,15 @@ async def update_me(user_data: schema.UserUpdate,
                                            current_user=request_context.current_user,
                                            db=request_context.db)
 
-@user_router.get("/me/items", status_code=200)
-async def get_current_user_items(request_context: RequestContext = Depends(get_request_context)) -> response_schemas.UserWithItemsDataResponse:
+@user_router.get("/me/items", status_code=200, dependencies=[Depends(LaneScheduler.lane("reads"))])
+async def get_current_user_items(request_context: RequestContext = Depends(get_read_request_context)) -> response_schemas.UserWithItemsDataResponse:
     """
     Get all items belonging to the current authenticated user.
     Requires valid JWT token.
 
     - **request_context**: Request Context which use basic stuff:
         - **current_user**: Automatically injected authenticated user
-        - **db**: Database session dependency
+        - **db**: Read-only database session dependency
     
     Returns user's items with ownership information.
     """
@@ -142,9 +155,9 @@ async def get_current_user_items(request_context: RequestContext = Depends(get_r
     return await user_repository.get_current_user_items(current_user=request_context.current_user, db=request_context.db)
 
 
-@user_router.get("/me/item/{item_id}", status_code=200)
+@user_router.get("/me/item/{item_id}", status_code=200, dependencies=[Depends(LaneScheduler.lane("reads"))])
 async def get_current_user_item(item_id: int,
-                                request_context: RequestContext = Depends(get_request_context)) -> response_schemas.ItemDetailResponse:
+                                request_context: RequestContext = Depends(get_read_request_context)) -> response_schemas.ItemDetailResponse:
     """
     Get specific item belonging to the current user.
     Requires valid JWT token and item ownership.
@@ -152,7 +165,7 @@ async def get_current_user_item(item_id: int,
     - **item_id**: ID of item to retrieve (path parameter)
     - **request_context**: Request Context which use basic stuff:
         - **current_user**: Automatically injected authenticated user
-        - **db**: Database session dependency
+        - **db**: Read-only database session dependency
     
     Returns specific item data with user context.
     """
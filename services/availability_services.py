@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import logging
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from DAO.user_dao import UserDAO
+from config import settings
+from database import models, response_schemas
+from database.database import ReadSessionLocal
+from services.invalidation_services import InvalidationBus
+from services.replica_services import ReplicaRouter
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Compact probabilistic set.
+    "Not in filter" is always correct, "in filter" may be a false positive
+    with probability close to error_rate while the filter holds <= capacity values.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.count = 0
+
+        # Optimal number of bits and hash functions for capacity and error rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+
+        # Double hashing: k positions from two 64-bit hashes
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(value))
+
+
+class AvailabilityService:
+    """
+    Answers "is this username / email free?" mostly without database queries.
+
+    Keeps Bloom filters of all existing names and emails:
+    - value NOT in filter -> definitely free, no query
+    - value in filter     -> maybe taken, confirmed with UserDAO query
+
+    Filters are loaded on startup (warm-up) and updated:
+    - by sign_up / update_me in this worker
+    - by InvalidationBus messages about users written in other workers
+
+    Until filters are loaded every check is confirmed with the database.
+    sign_up still checks uniqueness itself, this service only answers UI checks.
+    """
+
+    _names: Optional[BloomFilter] = None
+    _emails: Optional[BloomFilter] = None
+    # Values added while filters are being (re)built
+    _pending: Optional[List[Tuple[Optional[str], Optional[str]]]] = None
+    _subscribed: bool = False
+
+    @classmethod
+    async def load(cls) -> int:
+        """
+        Build filters from all users in database.
+
+        :return: Number of loaded users
+        """
+        if cls._pending is not None:
+            return 0    # Already loading
+        cls._pending = []
+
+        if not cls._subscribed:
+            InvalidationBus.subscribe(cls._on_invalidation)
+            cls._subscribed = True
+
+        try:
+            names, emails = await cls._build_filters()
+        finally:
+            pending, cls._pending = cls._pending, None
+
+        for name, email in pending:
+            if name is not None:
+                names.add(name)
+            if email is not None:
+                emails.add(email)
+
+        cls._names, cls._emails = names, emails
+
+        return names.count
+
+    @classmethod
+    async def _build_filters(cls) -> Tuple[BloomFilter, BloomFilter]:
+        """Read all names and emails from database into new filters"""
+        async with ReadSessionLocal() as db:
+            users_count = sum(await db.scalars(select(func.count()).select_from(models.User)))  # Row per shard
+
+            capacity = max(settings.AVAILABILITY_FILTER_CAPACITY, users_count * 2)
+            names = BloomFilter(capacity=capacity, error_rate=settings.AVAILABILITY_FILTER_ERROR_RATE)
+            emails = BloomFilter(capacity=capacity, error_rate=settings.AVAILABILITY_FILTER_ERROR_RATE)
+
+            rows = await db.stream(select(models.User.name, models.User.email).execution_options(yield_per=1000))
+            async for name, email in rows:
+                names.add(name)
+                emails.add(email)
+
+        return names, emails
+
+    @classmethod
+    def add(cls, name: Optional[str] = None, email: Optional[str] = None) -> None:
+        """
+        Mark name and/or email as taken.
+        Filter is rebuilt in background when it holds more values than its capacity.
+
+        :param name: Taken username
+        :param email: Taken email
+        """
+        if cls._pending is not None:
+            cls._pending.append((name, email))
+
+        if cls._names is None:
+            return
+
+        if name is not None:
+            cls._names.add(name)
+        if email is not None:
+            cls._emails.add(email)
+
+        if cls._names.count > cls._names.capacity and cls._pending is None:
+            asyncio.create_task(cls.load())
+
+    @classmethod
+    async def check(cls,
+                    db: AsyncSession,
+                    name: Optional[str] = None,
+                    email: Optional[str] = None) -> response_schemas.AvailabilityResponse:
+        """
+        Check if username and/or email are free.
+
+        :param db: Database session (used only for possible matches)
+        :param name: Username to check
+        :param email: Email to check
+        :return: Availability of each provided value (None if value wasn't provided)
+        """
+        name_available = None
+        if name is not None:
+            name_available = True
+            if cls._names is None or name in cls._names:
+                name_available = await UserDAO.get_user_name(db=db, user_name=name) is None
+
+        email_available = None
+        if email is not None:
+            email_available = True
+            if cls._emails is None or email in cls._emails:
+                email_available = await UserDAO.get_user_email(db=db, user_email=email) is None
+
+        return response_schemas.AvailabilityResponse(name=name_available, email=email_available)
+
+    @classmethod
+    def _on_invalidation(cls, entity: str, ident: str, version: int, is_remote: bool) -> None:
+        """User was written by another worker: load its name and email into filters"""
+        if entity == "User" and is_remote:
+            asyncio.create_task(cls._add_user(user_id=int(ident)))
+
+    @classmethod
+    async def _add_user(cls, user_id: int) -> None:
+        """
+        Runs in every worker for every remote user write, so it reads with the
+        read-only pool: the writer pool may have a single connection (prod-sqlite).
+        A replica may not have the write yet: then it is read again once replica lag is over.
+        """
+        try:
+            async with ReadSessionLocal() as db:
+                user = await UserDAO.get_user_by_id(db=db, user_id=user_id)
+            staleness = ReplicaRouter.get_read_staleness_ns()
+            if user is None and staleness:
+                await asyncio.sleep(staleness / 1_000_000_000)
+                async with ReadSessionLocal() as db:
+                    user = await UserDAO.get_user_by_id(db=db, user_id=user_id)
+        except Exception:
+            logger.exception("Failed to load user %s into availability filters", user_id)
+            return
+
+        if user is not None:
+            cls.add(name=user.name, email=user.email)
@@ -0,0 +1,355 @@
+import fcntl
+import json
+import logging
+import os
+import stat
+import time
+import zlib
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from config import settings
+from database import response_schemas
+from helpers import path_helper
+from services.replica_services import ReplicaRouter
+
+logger = logging.getLogger(__name__)
+
+
+class CacheService:
+    """
+    Per-worker in-memory cache for hot read paths.
+
+    Entries are stored under entity keys like "User:5" or "Item:list".
+    Every entry remembers the version (time in ns) at which its data was loaded,
+    so an invalidation with a newer version always drops it, even if the
+    invalidation arrives while the data is still being loaded.
+
+    Invalidations come from InvalidationBus (services/invalidation_services.py),
+    which delivers writes made by ANY worker to every worker.
+
+    Cached values are shared by all requests, so they are immutable: response
+    models are frozen and lists are stored as tuples.
+
+    Cache survives restarts: it is saved to CACHE_SNAPSHOT_PATH on shutdown
+    and restored on startup after a check against the database
+    (see save_snapshot / load_snapshot, WarmupService.restore_cache).
+
+    Usage example:
+        user = await CacheService.get_or_load(
+            key=CacheService.make_key("User", user_id),
+            loader=lambda: load_user(user_id)
+        )
+    """
+
+    CACHE_RULES = {
+        "User": {
+            "dependent_keys": ["User:list", "Item:list"]
+        },
+
+        "Item": {
+            "dependent_keys": ["Item:list"]
+        }
+    }
+
+    """
+    Dictionary with invalidation rules for each model.
+
+    Structure:
+        "ModelName": {
+            "dependent_keys": [...]   # Keys that embed data of this model
+        }
+
+    A write to "User:5" drops "User:5" itself and every dependent key,
+    e.g. the items list, because it contains user names and emails.
+    """
+
+    # key -> (loaded_version, expires_at, value)
+    _entries: Dict[str, Tuple[int, float, Any]] = {}
+    # key -> version of the latest known write
+    _versions: Dict[str, int] = {}
+
+    hits: int = 0
+    misses: int = 0
+    # key -> number of reads, used to prefill the hottest keys on startup
+    _reads: Counter = Counter()
+
+    PRUNE_THRESHOLD = 10000     # Size after which expired entries and old versions are pruned
+    SNAPSHOT_FORMAT = 2     # Bump when entry layout changes, old snapshots are ignored
+    SNAPSHOT_HOT_KEYS = 1000    # Number of hottest keys saved to snapshot
+
+    SNAPSHOT_SCHEMAS = {
+        "User": response_schemas.UserResponse,
+        "User:list": Tuple[response_schemas.UserResponse, ...],
+        "Item:list": Tuple[response_schemas.ItemWithUserResponse, ...],
+    }
+    """
+    Schemas of cached values saved to snapshots: full key or entity -> type of value.
+
+    Values are saved as JSON and validated against their schema when loaded,
+    keys without a schema are not saved.
+    """
+
+    _adapters: Dict[Any, TypeAdapter] = {}
+
+    @staticmethod
+    def make_key(entity: str, ident: Any) -> str:
+        """
+        Build cache key for entity.
+
+        :param entity: Model name (e.g. "User", "Item")
+        :param ident: Record ID or collection name (e.g. 5, "list")
+        :return: Cache key string
+        """
+        return f"{entity}:{ident}"
+
+    @staticmethod
+    def new_version() -> int:
+        """
+        Version token for loads and writes.
+        Uses wall-clock ns so versions are comparable between workers and restarts.
+        """
+        return time.time_ns()
+
+    @classmethod
+    def get(cls, key: str) -> Optional[Any]:
+        """
+        Get cached value if it exists and is not expired.
+
+        :param key: Cache key
+        :return: Cached value or None
+        """
+        cls._reads[key] += 1
+
+        entry = cls._entries.get(key)
+        if entry is None:
+            cls.misses += 1
+            return None
+
+        if entry[1] < time.time():
+            cls._entries.pop(key, None)
+            cls.misses += 1
+            return None
+
+        cls.hits += 1
+        return entry[2]
+
+    @classmethod
+    def set(cls, key: str, value: Any, loaded_version: int, ttl: Optional[int] = None) -> None:
+        """
+        Store value loaded at loaded_version.
+        Value is NOT stored if a write for this key happened during loading.
+
+        :param key: Cache key
+        :param value: Value to store (frozen models or lists of them, lists are stored as tuples)
+        :param loaded_version: Version taken BEFORE loading value from DB
+        :param ttl: Time to live in seconds (CACHE_TTL_SECONDS by default)
+        """
+        if cls._versions.get(key, 0) >= loaded_version:
+            return
+
+        if isinstance(value, list):
+            value = tuple(value)
+
+        ttl = settings.CACHE_TTL_SECONDS if ttl is None else ttl
+        cls._entries[key] = (loaded_version, time.time() + ttl, value)
+
+        if len(cls._entries) > cls.PRUNE_THRESHOLD:
+            cls.prune()
+
+    @classmethod
+    async def get_or_load(cls, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return cached value or load it with loader and cache it.
+
+        :param key: Cache key
+        :param loader: Async function without args returning value
+        :return: Cached or loaded value
+        """
+        value = cls.get(key)
+        if value is not None:
+            return value
+
+        # Data read from replica may be older than load start by up to replica lag
+        loaded_version = cls.new_version() - ReplicaRouter.get_read_staleness_ns()
+        value = await loader()
+        cls.set(key, value, loaded_version)
+
+        return value
+
+    @classmethod
+    def invalidate(cls, entity: str, ident: Any, version: int) -> None:
+        """
+        Apply write of entity with version to local cache.
+        Drops the entity key and all dependent keys from CACHE_RULES.
+
+        :param entity: Model name (e.g. "User")
+        :param ident: Record ID
+        :param version: Version of write
+        """
+        keys = [cls.make_key(entity, ident)]
+        keys.extend(cls.CACHE_RULES.get(entity, {}).get("dependent_keys", []))
+
+        for key in keys:
+            if cls._versions.get(key, 0) < version:
+                cls._versions[key] = version
+
+            entry = cls._entries.get(key)
+            if entry is not None and entry[0] <= version:
+                cls._entries.pop(key, None)
+
+        if len(cls._versions) > cls.PRUNE_THRESHOLD:
+            cls.prune()
+
+    @classmethod
+    def hot_keys(cls, limit: int) -> List[str]:
+        """
+        Get the most read keys.
+
+        :param limit: Max number of keys
+        :return: Keys ordered from the hottest
+        """
+        return [key for key, _ in cls._reads.most_common(limit)]
+
+    @classmethod
+    def prune(cls) -> None:
+        """
+        Drop expired entries and versions older than CACHE_TTL_SECONDS.
+        Old versions are useless: anything loaded before them is already expired.
+        """
+        now = time.time()
+        cls._entries = {key: entry for key, entry in cls._entries.items() if entry[1] >= now}
+        cls._reads = Counter(dict(cls._reads.most_common(cls.SNAPSHOT_HOT_KEYS)))
+
+        oldest_version = int((now - settings.CACHE_TTL_SECONDS) * 1_000_000_000)
+        cls._versions = {key: version for key, version in cls._versions.items() if version >= oldest_version}
+
+    @classmethod
+    def save_snapshot(cls, path: str) -> int:
+        """
+        Save cached responses to compressed JSON snapshot file (on shutdown).
+
+        Several workers can stop at the same time, so the file is locked
+        and merged with the snapshot already saved by other workers.
+        Only keys with a schema in SNAPSHOT_SCHEMAS are saved.
+
+        :param path: Snapshot file path (its directory must be private, see _is_private)
+        :return: Number of saved entries
+        """
+        if not cls._is_private(path):
+            return 0
+
+        lock_fd = os.open(f"{path}.lock", os.O_WRONLY | os.O_CREAT, 0o600)
+        with os.fdopen(lock_fd, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            entries, reads = cls._read_snapshot(path)
+            for key, (loaded_version, _, value) in cls._entries.items():
+                adapter = cls._snapshot_adapter(key)
+                if adapter is not None and entries.get(key, (0, None))[0] < loaded_version:
+                    entries[key] = (loaded_version, adapter.dump_python(value, mode="json"))
+            reads.update(cls._reads)
+
+            data = {
+                "format": cls.SNAPSHOT_FORMAT,
+                "saved_at": time.time(),
+                "entries": entries,
+                "hot_keys": dict(reads.most_common(cls.SNAPSHOT_HOT_KEYS))
+            }
+            payload = zlib.compress(json.dumps(data, separators=(",", ":")).encode())
+
+            # Write to temp file and rename, so readers never see a half-written snapshot
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as snapshot_file:
+                snapshot_file.write(payload)
+            os.replace(tmp_path, path)
+
+        return len(entries)
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> Dict[str, Tuple[int, Any]]:
+        """
+        Read entries saved by previous workers (on startup) and remember their hot keys.
+
+        Entries are NOT cached here: writes made while workers were down are unknown
+        to the snapshot, so the caller checks entries against the database and
+        caches the ones still matching (see WarmupService.restore_cache).
+
+        :param path: Snapshot file path
+        :return: Dictionary key -> (loaded_version, value)
+        """
+        if not cls._is_private(path):
+            return {}
+
+        entries, reads = cls._read_snapshot(path)
+        cls._reads.update(reads)
+
+        restored = {}
+        for key, (loaded_version, value) in entries.items():
+            adapter = cls._snapshot_adapter(key)
+            if adapter is None:
+                continue
+            try:
+                restored[key] = (loaded_version, adapter.validate_python(value))
+            except ValidationError:
+                continue    # Schema changed since the snapshot was saved
+
+        return restored
+
+    @classmethod
+    def _read_snapshot(cls, path: str) -> Tuple[Dict[str, Tuple[int, Any]], Counter]:
+        """
+        Read snapshot file, returns empty snapshot if file is missing, broken
+        or older than CACHE_SNAPSHOT_MAX_AGE_SECONDS
+        """
+        try:
+            with open(path, "rb") as snapshot_file:
+                data = json.loads(zlib.decompress(snapshot_file.read()))
+        except (FileNotFoundError, zlib.error, ValueError):
+            return {}, Counter()
+
+        if (not isinstance(data, dict) or data.get("format") != cls.SNAPSHOT_FORMAT
+                or time.time() - data.get("saved_at", 0) > settings.CACHE_SNAPSHOT_MAX_AGE_SECONDS):
+            return {}, Counter()
+
+        entries = {key: (int(entry[0]), entry[1]) for key, entry in data["entries"].items()}
+        return entries, Counter(data.get("hot_keys", {}))
+
+    @classmethod
+    def _snapshot_adapter(cls, key: str) -> Optional[TypeAdapter]:
+        """Adapter (de)serializing value of key, None if the key is not saved to snapshots"""
+        schema = cls.SNAPSHOT_SCHEMAS.get(key, cls.SNAPSHOT_SCHEMAS.get(key.split(":", 1)[0]))
+        if schema is None:
+            return None
+
+        adapter = cls._adapters.get(schema)
+        if adapter is None:
+            adapter = cls._adapters[schema] = TypeAdapter(schema)
+        return adapter
+
+    @staticmethod
+    def _is_private(path: str) -> bool:
+        """
+        Snapshots fill the cache get_current_user reads from, so only files no other
+        local user could have written are used: the directory and the file must be
+        owned by this user and not writable by group or others.
+        The directory is created with mode 0700 if it doesn't exist.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        for target, is_private in ((directory, path_helper.make_private_directory(directory)),
+                                   (path, path_helper.is_private(path, stat.S_ISREG))):
+            if not is_private:
+                logger.warning("Cache snapshot %s is not used: %s must be owned by this user "
+                               "and not writable by group or others", path, target)
+                return False
+
+        return True
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop all entries and versions"""
+        cls._entries.clear()
+        cls._versions.clear()
+        cls._reads.clear()
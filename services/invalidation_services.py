@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import os
+import socket
+from typing import Any, Callable, List, Optional
+
+from config import settings
+from helpers import path_helper
+from services.cache_services import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationBus:
+    """
+    Cross-worker cache invalidation bus.
+
+    Every committed write publishes a compact message "<Entity>|<id>|<version>|<worker>".
+    The message is applied to the local CacheService immediately and broadcast
+    to all other workers, which apply it to their own caches.
+
+    Transport depends on database:
+    - PostgreSQL: LISTEN/NOTIFY on CACHE_BUS_CHANNEL (works across hosts)
+    - SQLite: Unix domain datagram sockets in CACHE_BUS_SOCKET_DIR
+              (one socket per worker on the same host)
+
+    If the bus is not started (scripts, migrations), writes are still applied
+    to the local cache, so a single process always stays consistent.
+
+    Usage Example:
+    ---------------
+    **Publish write of user with ID 5**
+    - await InvalidationBus.publish("User", 5)
+
+    **React to every applied write (local or remote)**
+    - InvalidationBus.subscribe(callback)  # callback(entity, ident, version, is_remote)
+    """
+
+    worker_id: str = str(os.getpid())
+
+    _backend: Optional[Any] = None
+    _subscribers: List[Callable[[str, str, int, bool], Any]] = []
+
+    @classmethod
+    async def start(cls, engine) -> None:
+        """
+        Start listening for invalidations from other workers.
+        Transport is selected by engine dialect.
+
+        :param engine: SQLAlchemy async engine used by application
+        """
+        if cls._backend is not None:
+            return
+
+        cls.worker_id = str(os.getpid())
+
+        if engine.dialect.name == "postgresql":
+            backend = _PostgresBackend(engine=engine, on_message=cls._on_message)
+        else:
+            backend = _UnixSocketBackend(on_message=cls._on_message)
+
+        await backend.start()
+        cls._backend = backend
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Stop listening and release transport resources"""
+        if cls._backend is None:
+            return
+
+        backend, cls._backend = cls._backend, None
+        await backend.stop()
+
+    @classmethod
+    def subscribe(cls, callback: Callable[[str, str, int, bool], Any]) -> None:
+        """
+        Register callback called for every applied invalidation.
+
+        :param callback: Function (entity, ident, version, is_remote)
+        """
+        cls._subscribers.append(callback)
+
+    @classmethod
+    async def publish(cls, entity: str, ident: Any) -> None:
+        """
+        Publish write of entity record.
+        Applies invalidation locally and broadcasts it to other workers.
+
+        :param entity: Model name (e.g. "User", "Item")
+        :param ident: ID of written record
+        """
+        version = CacheService.new_version()
+        cls._apply(entity=entity, ident=str(ident), version=version, is_remote=False)
+
+        if cls._backend is not None:
+            message = f"{entity}|{ident}|{version}|{cls.worker_id}"
+            cls._backend.send(message)
+
+    @classmethod
+    def _on_message(cls, message: str) -> None:
+        """Parse message from another worker and apply it"""
+        try:
+            entity, ident, version, worker_id = message.split("|")
+            version = int(version)
+        except ValueError:
+            logger.warning("Malformed invalidation message: %r", message)
+            return
+
+        # PostgreSQL delivers NOTIFY to the sender too
+        if worker_id == cls.worker_id:
+            return
+
+        cls._apply(entity=entity, ident=ident, version=version, is_remote=True)
+
+    @classmethod
+    def _apply(cls, entity: str, ident: str, version: int, is_remote: bool) -> None:
+        CacheService.invalidate(entity=entity, ident=ident, version=version)
+
+        for callback in cls._subscribers:
+            try:
+                callback(entity, ident, version, is_remote)
+            except Exception:
+                logger.exception("Invalidation subscriber failed")
+
+
+class _PostgresBackend:
+    """
+    LISTEN/NOTIFY transport.
+    Uses one dedicated asyncpg connection outside of SQLAlchemy pool.
+    Messages are sent from a background task, so writers never wait for NOTIFY.
+    """
+
+    def __init__(self, engine, on_message: Callable[[str], None]):
+        self._dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._on_message = on_message
+        self._connection = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._sender: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self._dsn)
+        await self._connection.add_listener(settings.CACHE_BUS_CHANNEL, self._listener)
+        self._sender = asyncio.create_task(self._send_loop())
+
+    async def stop(self) -> None:
+        if self._sender is not None:
+            self._sender.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+
+    def send(self, message: str) -> None:
+        self._queue.put_nowait(message)
+
+    def _listener(self, connection, pid, channel, payload) -> None:
+        self._on_message(payload)
+
+    async def _send_loop(self) -> None:
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._connection.execute("SELECT pg_notify($1, $2)",
+                                               settings.CACHE_BUS_CHANNEL,
+                                               message)
+            except Exception:
+                logger.exception("Failed to publish invalidation %r", message)
+
+
+class _UnixSocketBackend:
+    """
+    Unix domain datagram transport for SQLite deployments (single host).
+    Each worker binds "<pid>.sock" in CACHE_BUS_SOCKET_DIR and sends
+    every message to all other sockets in that directory.
+
+    Any socket in the directory receives every write and can drop cache entries,
+    so the directory must be private to the user running the workers (mode 0700).
+    """
+
+    def __init__(self, on_message: Callable[[str], None]):
+        self._directory = settings.CACHE_BUS_SOCKET_DIR
+        self._path = os.path.join(self._directory, f"{os.getpid()}.sock")
+        self._on_message = on_message
+        self._transport = None
+        self._sender: Optional[socket.socket] = None
+
+    async def start(self) -> None:
+        if not path_helper.make_private_directory(self._directory):
+            raise PermissionError(f"Cache invalidation socket directory {self._directory} must be owned "
+                                  f"by this user and not writable by group or others")
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self._on_message),
+            local_addr=self._path,
+            family=socket.AF_UNIX,
+        )
+
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+
+    async def stop(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+        if self._sender is not None:
+            self._sender.close()
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+    def send(self, message: str) -> None:
+        payload = message.encode("utf-8")
+
+        for entry in os.scandir(self._directory):
+            if not entry.name.endswith(".sock") or entry.path == self._path:
+                continue
+            try:
+                self._sender.sendto(payload, entry.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker is gone, remove its socket
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                logger.warning("Invalidation dropped, worker socket %s is full", entry.name)
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, on_message: Callable[[str], None]):
+        self._on_message = on_message
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self._on_message(data.decode("utf-8"))
@@ -0,0 +1,220 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional
+
+from fastapi import HTTPException, Request
+from starlette import status
+
+from helpers import metrics_helper
+
+
+class LaneBusyError(HTTPException):
+    """Lane of request has no free slot and its queue is full, or the wait timed out"""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         detail=f"Too many {lane} requests, retry later",
+                         headers={"Retry-After": str(retry_after)})
+
+
+@dataclass(eq=False)
+class Lane:
+    """Budget and state of one traffic class"""
+    name: str
+    slots: int  # Requests running at once
+    max_queue: int  # Requests waiting for a slot
+    workers: int    # Threads of lane executor
+    active: int = 0
+    admitted: int = 0
+    rejected: int = 0   # Queue was full
+    timed_out: int = 0  # Waited longer than queue timeout
+    executor_in_flight: int = 0
+    executor: Optional[ThreadPoolExecutor] = None
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+
+
+_current_lane: ContextVar[Optional[Lane]] = ContextVar("current_lane", default=None)
+
+
+class LaneScheduler:
+    """
+    Priority lanes: separate capacity for auth, writes and reads (LANES_ENABLED).
+
+    Routes declare their lane in routers: dependencies=[Depends(LaneScheduler.lane("reads"))].
+    Every lane has its own budget (LANES setting):
+    - slots: requests of the lane running at once. Every request holds at most one
+      pool connection at a time, so slots are the lane's share of pool connections
+    - queue: requests waiting for a slot; more are rejected at once with 503 and Retry-After,
+      so are requests that waited longer than LANE_QUEUE_TIMEOUT_MS
+    - workers: threads of the lane's executor (bcrypt of auth, see password_helper)
+
+    A login storm fills the auth lane only: its requests queue for auth slots and
+    auth threads, while reads and writes keep their slots and executors.
+
+    Time spent in a lane queue is stored in scope state (WAIT_STATE) and left out
+    of latency of the load shedder: waiting for its own lane is not overload of the service.
+    """
+
+    LANE_NAMES = ("auth", "writes", "reads")
+    WAIT_STATE = "lane_wait_seconds"
+
+    enabled: bool = False
+    queue_timeout: float = 1.0
+    retry_after: int = 1
+    lanes: Dict[str, Lane] = {}
+
+    @classmethod
+    def configure(cls, lanes: Dict[str, Dict[str, int]], queue_timeout: float, retry_after: int) -> None:
+        """
+        Create lanes and their executors.
+
+        :param lanes: Lane name -> {"slots": ..., "queue": ..., "workers": ...}
+        :param queue_timeout: Max seconds a request waits for a slot
+        :param retry_after: Seconds in Retry-After header of rejected requests
+        :raises ValueError: If a lane is missing, unknown or has no slots or workers
+        """
+        if set(lanes) != set(cls.LANE_NAMES):
+            raise ValueError(f"LANES must configure exactly: {', '.join(cls.LANE_NAMES)}")
+
+        for name, budget in lanes.items():
+            if budget["slots"] < 1 or budget["workers"] < 1 or budget["queue"] < 0:
+                raise ValueError(f"Lane '{name}' needs at least one slot and one worker")
+
+        cls.shutdown()
+        cls.lanes = {name: Lane(name=name, slots=budget["slots"], max_queue=budget["queue"],
+                                workers=budget["workers"],
+                                executor=ThreadPoolExecutor(max_workers=budget["workers"],
+                                                            thread_name_prefix=f"lane_{name}"))
+                     for name, budget in lanes.items()}
+        cls.queue_timeout = queue_timeout
+        cls.retry_after = retry_after
+        cls.enabled = True
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Stop executors of lanes (running tasks are finished)"""
+        for lane in cls.lanes.values():
+            if lane.executor is not None:
+                lane.executor.shutdown(wait=False)
+        cls.enabled = False
+
+    @classmethod
+    def lane(cls, name: str) -> Callable:
+        """
+        Dependency running request in lane (declare before session dependencies,
+        e.g. in route "dependencies", so the slot is taken before pool connections).
+
+        :param name: Lane name (one of LANE_NAMES)
+        :return: FastAPI dependency
+        :raises ValueError: If lane name is unknown
+        """
+        if name not in cls.LANE_NAMES:
+            raise ValueError(f"Unknown lane '{name}', expected one of: {', '.join(cls.LANE_NAMES)}")
+
+        async def run_in_lane(request: Request):
+            if not cls.enabled:
+                yield
+                return
+
+            lane = cls.lanes[name]
+            started = time.perf_counter()
+            await cls._acquire(lane)
+            wait = time.perf_counter() - started
+            setattr(request.state, cls.WAIT_STATE, wait)   # Stored in scope["state"]
+            metrics_helper.LANE_QUEUE_WAIT.observe(wait, name)
+
+            token = _current_lane.set(lane)
+            try:
+                yield
+            finally:
+                _current_lane.reset(token)
+                cls._release(lane)
+
+        return run_in_lane
+
+    @classmethod
+    async def _acquire(cls, lane: Lane) -> None:
+        if lane.active < lane.slots and not lane.waiters:
+            lane.active += 1
+            lane.admitted += 1
+            return
+
+        if len(lane.waiters) >= lane.max_queue:
+            lane.rejected += 1
+            metrics_helper.LANE_REJECTED.inc(lane.name, "queue_full")
+            raise LaneBusyError(lane.name, cls.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), cls.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                cls._release(lane)  # Slot was handed over just now: pass it on
+            else:
+                waiter.cancel()
+                lane.waiters.remove(waiter)
+
+            if isinstance(e, TimeoutError):    # asyncio.TimeoutError is this builtin since Python 3.11
+                lane.timed_out += 1
+                metrics_helper.LANE_REJECTED.inc(lane.name, "timeout")
+                raise LaneBusyError(lane.name, cls.retry_after) from None
+            raise
+
+        lane.admitted += 1
+
+    @classmethod
+    def _release(cls, lane: Lane) -> None:
+        """Hand slot over to the first waiting request, or free it"""
+        while lane.waiters:
+            waiter = lane.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        lane.active -= 1
+
+    @classmethod
+    async def run_in_executor(cls, default_executor: ThreadPoolExecutor, func: Callable, *args) -> Any:
+        """
+        Run blocking function in executor of current request's lane.
+
+        :param default_executor: Executor used outside of lanes (lanes disabled, background tasks)
+        :param func: Blocking function
+        :param args: Arguments of function
+        :return: Result of function
+        """
+        lane = _current_lane.get() if cls.enabled else None
+        if lane is None:
+            return await asyncio.get_running_loop().run_in_executor(default_executor, func, *args)
+
+        lane.executor_in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(lane.executor, func, *args)
+        finally:
+            lane.executor_in_flight -= 1
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        """
+        Get lane statistics.
+
+        :return: Budget, running and queued requests, rejections and executor load of every lane
+        """
+        return {
+            "enabled": cls.enabled,
+            "queue_timeout_ms": round(cls.queue_timeout * 1000),
+            "lanes": {name: {"slots": lane.slots,
+                             "active": lane.active,
+                             "queued": len(lane.waiters),
+                             "max_queue": lane.max_queue,
+                             "admitted": lane.admitted,
+                             "rejected": lane.rejected,
+                             "timed_out": lane.timed_out,
+                             "workers": lane.workers,
+                             "executor_in_flight": lane.executor_in_flight}
+                      for name, lane in cls.lanes.items()},
+        }
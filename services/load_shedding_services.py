@@ -0,0 +1,199 @@
+import math
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from helpers import metrics_helper
+
+
+class ConcurrencyLimiter:
+    """
+    Adaptive limit of concurrent requests (load shedding, LOAD_SHED_ENABLED).
+
+    Requests over the limit are rejected at once with 503 and Retry-After
+    (LoadSheddingMiddleware) instead of queueing on pool and bcrypt executor,
+    so admitted requests keep their normal latency and goodput holds at capacity.
+
+    The limit follows observed latency (gradient algorithm, as in Netflix Gradient2):
+    - every route has a baseline latency: average that drops fast and grows slowly
+    - every WINDOW_SECONDS latency/baseline of finished requests is averaged:
+      gradient = LATENCY_TOLERANCE / average, clamped to [0.5, 1]
+    - new limit = limit * gradient + sqrt(limit) (room for a small queue), smoothed:
+      latency over tolerance shrinks the limit, normal latency lets it grow
+    - the limit doesn't grow while less than half of it is used (nothing learned)
+    Latency is compared per route, so slow routes (bcrypt sign in) don't look like overload.
+
+    Priority classes (ROUTE_PRIORITIES, route name -> class) share the limit:
+    a request is admitted while requests in flight < limit * PRIORITY_SHARES[class],
+    so low priority requests are shed first and high priority ones last.
+
+    Usage Example:
+    ---------------
+    - if not ConcurrencyLimiter.try_acquire(priority): reject with 503
+    - ConcurrencyLimiter.release(route, latency) when admitted request is finished
+    """
+
+    PRIORITY_SHARES = {
+        "critical": None,
+        "high": 1.0,
+        "normal": 0.9,
+        "low": 0.7,
+    }
+    """
+    Priority class -> share of the limit its requests may fill.
+
+    critical: never shed (health and readiness probes, metrics).
+    high: writes of signed in users, shed only when the whole limit is in use.
+    normal: default of routes not in ROUTE_PRIORITIES.
+    low: expensive lists and sign up, shed first.
+    """
+
+    LATENCY_TOLERANCE = 1.5     # Latency/baseline treated as normal
+    SMOOTHING = 0.5     # Weight of new limit in smoothed limit
+    WINDOW_SECONDS = 0.25   # Limit is updated once per window
+    MIN_WINDOW_SAMPLES = 10     # Fewer finished requests in window: wait for more
+    BASELINE_SAMPLES = 1000     # Finished requests of a route for baseline to follow latency growth
+
+    enabled: bool = False
+    limit: float = 20.0
+    min_limit: int = 4
+    max_limit: int = 200
+    retry_after: int = 1
+    route_priorities: Dict[str, str] = {}
+
+    in_flight: int = 0
+    shed: Counter = Counter()   # priority class -> rejected requests
+    admitted: Counter = Counter()
+
+    _baselines: Dict[str, float] = {}   # route -> baseline latency in seconds
+    _window_started: float = 0.0
+    _window_sum: float = 0.0
+    _window_samples: int = 0
+    _window_max_in_flight: int = 0
+
+    @classmethod
+    def configure(cls,
+                  initial_limit: int,
+                  min_limit: int,
+                  max_limit: int,
+                  route_priorities: Dict[str, str],
+                  retry_after: int) -> None:
+        """
+        Enable limiter.
+
+        :param initial_limit: Limit before latency is observed
+        :param min_limit: Limit never goes lower
+        :param max_limit: Limit never goes higher
+        :param route_priorities: Route name ("POST /api/v1/items/create_item") -> priority class
+        :param retry_after: Seconds in Retry-After header of rejected requests
+        :raises ValueError: If limits are inconsistent or priority class is unknown
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Concurrency limits must satisfy 1 <= min <= initial <= max, "
+                             f"got {min_limit}, {initial_limit}, {max_limit}")
+
+        unknown = set(route_priorities.values()) - set(cls.PRIORITY_SHARES)
+        if unknown:
+            raise ValueError(f"Unknown priority classes: {', '.join(sorted(unknown))}, "
+                             f"expected one of: {', '.join(cls.PRIORITY_SHARES)}")
+
+        cls.enabled = True
+        cls.limit = float(initial_limit)
+        cls.min_limit = min_limit
+        cls.max_limit = max_limit
+        cls.route_priorities = dict(route_priorities)
+        cls.retry_after = retry_after
+        cls._baselines = {}
+        cls._reset_window(time.monotonic())
+
+    @classmethod
+    def get_priority(cls, route: str) -> str:
+        """
+        Get priority class of route.
+
+        :param route: Route name
+        :return: Priority class, "normal" for routes not in ROUTE_PRIORITIES
+        """
+        return cls.route_priorities.get(route, "normal")
+
+    @classmethod
+    def try_acquire(cls, priority: str) -> bool:
+        """
+        Admit request if its priority class has room under the limit.
+
+        :param priority: Priority class of request
+        :return: True if admitted (call release() when finished), False if request must be rejected
+        """
+        share = cls.PRIORITY_SHARES[priority]
+        if share is not None and cls.in_flight >= max(1, int(cls.limit * share)):
+            cls.shed[priority] += 1
+            metrics_helper.REQUESTS_SHED.inc(priority)
+            return False
+
+        cls.in_flight += 1
+        cls.admitted[priority] += 1
+        cls._window_max_in_flight = max(cls._window_max_in_flight, cls.in_flight)
+        return True
+
+    @classmethod
+    def release(cls, route: str, latency: Optional[float] = None) -> None:
+        """
+        Finish admitted request.
+
+        :param route: Route name of request
+        :param latency: Seconds request took, None if it didn't finish normally (not a sample)
+        """
+        cls.in_flight -= 1
+        if latency is None:
+            return
+
+        baseline = cls._baselines.get(route, latency)
+        if latency < baseline:
+            baseline += (latency - baseline) * 0.1
+        else:
+            # Slow growth, capped: a sustained overload can't raise baseline to its own latency quickly
+            baseline += (min(latency, baseline * cls.LATENCY_TOLERANCE) - baseline) / cls.BASELINE_SAMPLES
+        cls._baselines[route] = baseline
+
+        cls._window_sum += latency / baseline if baseline > 0 else 1.0
+        cls._window_samples += 1
+
+        now = time.monotonic()
+        if now - cls._window_started >= cls.WINDOW_SECONDS and cls._window_samples >= cls.MIN_WINDOW_SAMPLES:
+            cls._update_limit(cls._window_sum / cls._window_samples)
+            cls._reset_window(now)
+
+    @classmethod
+    def _update_limit(cls, latency_ratio: float) -> None:
+        gradient = max(0.5, min(1.0, cls.LATENCY_TOLERANCE / latency_ratio))
+        if gradient == 1.0 and cls._window_max_in_flight < cls.limit / 2:
+            return  # Limit isn't reached, latency says nothing about it
+
+        new_limit = cls.limit * gradient + math.sqrt(cls.limit)
+        limit = cls.limit * (1 - cls.SMOOTHING) + new_limit * cls.SMOOTHING
+        cls.limit = max(float(cls.min_limit), min(float(cls.max_limit), limit))
+
+    @classmethod
+    def _reset_window(cls, now: float) -> None:
+        cls._window_started = now
+        cls._window_sum = 0.0
+        cls._window_samples = 0
+        cls._window_max_in_flight = cls.in_flight
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        """
+        Get limiter statistics.
+
+        :return: Current limit, requests in flight, admitted and shed requests per priority class
+        """
+        return {
+            "enabled": cls.enabled,
+            "limit": round(cls.limit, 1),
+            "in_flight": cls.in_flight,
+            "limits_per_priority": {priority: None if share is None else max(1, int(cls.limit * share))
+                                    for priority, share in cls.PRIORITY_SHARES.items()},
+            "admitted": dict(cls.admitted),
+            "shed": dict(cls.shed),
+            "baseline_ms": {route: round(baseline * 1000, 2) for route, baseline in sorted(cls._baselines.items())},
+        }
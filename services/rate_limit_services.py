@@ -0,0 +1,361 @@
+import fcntl
+import math
+import mmap
+import os
+import struct
+import time
+from collections import Counter
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+from starlette import status
+
+from config import settings
+from repository.user_repository import get_current_user
+
+# Policy state: three numbers whose meaning depends on the algorithm (see RateLimitPolicy.apply)
+State = Tuple[float, float, float]
+
+
+class RateLimitExceededError(HTTPException):
+    """Client made more requests than its rate limit policy allows"""
+
+    def __init__(self, decision: "Decision"):
+        super().__init__(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                         detail="Too many requests, retry later",
+                         headers={"Retry-After": str(max(1, math.ceil(decision.retry_after))),
+                                  **decision.headers()})
+
+
+@dataclass
+class Decision:
+    """Result of one rate limit check"""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # Seconds until next request is allowed (0 if allowed)
+    reset: float    # Seconds until limit is fully available again
+
+    def headers(self) -> Dict[str, str]:
+        """RateLimit-* response headers"""
+        return {"RateLimit-Limit": str(self.limit),
+                "RateLimit-Remaining": str(self.remaining),
+                "RateLimit-Reset": str(math.ceil(self.reset))}
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """
+    Rate limit of routes: limit requests per period for every key (user or client IP).
+
+    token_bucket: bucket of `limit` tokens refilled at limit/period per second,
+    every request takes one. Allows bursts of `limit` after idle time.
+    sliding_window: requests of current fixed window plus a share of previous window's
+    requests (by how much of the previous window still overlaps the last `period`).
+    No bursts over `limit` at window borders, unlike fixed windows.
+
+    Both keep three numbers per key, so every check is O(1).
+    """
+    name: str
+    algorithm: str
+    limit: int
+    period: float
+    key: str
+
+    def apply(self, state: Optional[State], now: float) -> Tuple[Decision, State, float]:
+        """
+        Count request in state of its key.
+
+        :param state: State of key, None for new or expired keys
+        :param now: Current time (time.time())
+        :return: Decision, new state of key and time after which state can be forgotten
+        """
+        if self.algorithm == "token_bucket":
+            return self._apply_token_bucket(state, now)
+        return self._apply_sliding_window(state, now)
+
+    def _apply_token_bucket(self, state: Optional[State], now: float) -> Tuple[Decision, State, float]:
+        rate = self.limit / self.period
+        tokens, updated = (state[0], state[1]) if state is not None else (float(self.limit), now)
+        tokens = min(float(self.limit), tokens + max(0.0, now - updated) * rate)
+
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+
+        decision = Decision(allowed=allowed,
+                            limit=self.limit,
+                            remaining=int(tokens),
+                            retry_after=0.0 if allowed else (1.0 - tokens) / rate,
+                            reset=(self.limit - tokens) / rate)
+        # Full bucket is the same as no state
+        return decision, (tokens, now, 0.0), now + decision.reset
+
+    def _apply_sliding_window(self, state: Optional[State], now: float) -> Tuple[Decision, State, float]:
+        window = now - now % self.period
+        started, current, previous = state if state is not None else (window, 0.0, 0.0)
+        if started != window:
+            # One window later: current becomes previous, more: both are empty
+            previous = current if window - started < self.period * 1.5 else 0.0
+            current = 0.0
+
+        overlap = 1.0 - (now - window) / self.period     # Share of previous window in the last period
+        count = previous * overlap + current
+
+        allowed = count + 1.0 <= self.limit
+        if allowed:
+            current += 1.0
+            count += 1.0
+            retry_after = 0.0
+        elif current + 1.0 <= self.limit and previous > 0:
+            # Allowed again when enough of previous window slides out
+            retry_after = (overlap - (self.limit - 1.0 - current) / previous) * self.period
+        else:
+            retry_after = window + self.period - now
+
+        decision = Decision(allowed=allowed,
+                            limit=self.limit,
+                            remaining=max(0, int(self.limit - count)),
+                            retry_after=max(0.0, retry_after),
+                            reset=window + (2 * self.period if current else self.period) - now)
+        return decision, (window, current, previous), window + 2 * self.period
+
+
+class MemoryBackend:
+    """
+    Rate limit state of this worker.
+
+    Keys are spread over SHARDS dictionaries. Expired state is ignored when its key
+    is checked again (lazy expiry); every check also drops up to SWEEP expired keys
+    from the least recently updated end of its shard, so idle keys don't pile up.
+    """
+
+    SHARDS = 16
+    SWEEP = 2
+
+    def __init__(self):
+        self._shards: List[Dict[str, Tuple[State, float]]] = [{} for _ in range(self.SHARDS)]
+
+    def check(self, key: str, policy: RateLimitPolicy, now: float) -> Decision:
+        shard = self._shards[hash(key) % self.SHARDS]
+        entry = shard.pop(key, None)    # Re-inserted at the end: shard stays ordered by last update
+        decision, state, expires = policy.apply(entry[0] if entry is not None and entry[1] > now else None, now)
+        shard[key] = (state, expires)
+
+        for _ in range(self.SWEEP):
+            oldest = next(iter(shard))
+            if shard[oldest][1] > now:
+                break
+            del shard[oldest]
+
+        return decision
+
+    def size(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class SharedMemoryBackend:
+    """
+    Rate limit state shared by all workers of a host (RATE_LIMIT_SHARED_PATH).
+
+    Fixed size hash table in a memory-mapped file, split into shards of
+    slots_per_shard slots. A key lives in one of PROBES slots after its hash position,
+    its shard is locked (fcntl byte-range lock) for the check. Expired slots are
+    reused when met (lazy expiry); if all probed slots are live, the one expiring
+    first is evicted (its key starts over), so size the table above the number of active keys.
+    """
+
+    SLOT = struct.Struct("<Qdddd")  # Key hash (0 = empty), state, expiry time
+    PROBES = 8
+
+    def __init__(self, path: str, shards: int, slots_per_shard: int):
+        self.shards = shards
+        self.slots_per_shard = max(slots_per_shard, self.PROBES)
+        self._shard_bytes = self.slots_per_shard * self.SLOT.size
+        size = self.shards * self._shard_bytes
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)    # New pages are zeros: empty slots
+        self._map = mmap.mmap(self._fd, size)
+
+    def check(self, key: str, policy: RateLimitPolicy, now: float) -> Decision:
+        key_hash = int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        shard = key_hash % self.shards
+        shard_offset = shard * self._shard_bytes
+        position = (key_hash // self.shards) % self.slots_per_shard
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._shard_bytes, shard_offset)
+        try:
+            found, free, victim, victim_expires = None, None, None, math.inf
+            for probe in range(self.PROBES):
+                offset = shard_offset + (position + probe) % self.slots_per_shard * self.SLOT.size
+                slot_hash, first, second, third, expires = self.SLOT.unpack_from(self._map, offset)
+                if slot_hash == key_hash:
+                    found = offset
+                    state = (first, second, third) if expires > now else None
+                    break
+                if free is None and (slot_hash == 0 or expires <= now):
+                    free = offset
+                if expires < victim_expires:
+                    victim, victim_expires = offset, expires
+
+            if found is None:
+                found, state = free if free is not None else victim, None
+
+            decision, new_state, expires = policy.apply(state, now)
+            self.SLOT.pack_into(self._map, found, key_hash, *new_state, expires)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._shard_bytes, shard_offset)
+
+        return decision
+
+    def size(self) -> int:
+        now = time.time()
+        return sum(1 for offset in range(0, len(self._map), self.SLOT.size)
+                   if self.SLOT.unpack_from(self._map, offset)[4] > now)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+class RateLimiter:
+    """
+    Rate limits of routes (RATE_LIMIT_ENABLED).
+
+    Policies are defined in RATE_LIMIT_POLICIES and declared per route in routers, before
+    the lane: dependencies=[Depends(RateLimiter.limit("create_item")), Depends(LaneScheduler.lane("writes"))],
+    so requests over the limit are rejected without taking a lane slot. A policy counts requests
+    per key: "user" (ID of get_current_user, client IP for anonymous requests) or "ip".
+    Requests over the limit get 429 with Retry-After; allowed responses
+    carry RateLimit-Limit, RateLimit-Remaining and RateLimit-Reset headers.
+
+    State is kept by a backend:
+    - MemoryBackend: per worker, so every worker allows the full limit
+    - SharedMemoryBackend: one table for all workers of a host (RATE_LIMIT_SHARED_PATH)
+
+    Usage Example:
+    ---------------
+    **Limit writes of every user**
+    - @router.post("/create_new_model", dependencies=[Depends(RateLimiter.limit("create_item"))])
+    """
+
+    ALGORITHMS = ("token_bucket", "sliding_window")
+    KEYS = ("user", "ip")
+
+    enabled: bool = False
+    policies: Dict[str, RateLimitPolicy] = {}
+    backend = MemoryBackend()
+
+    allowed: Counter = Counter()    # policy -> allowed requests
+    limited: Counter = Counter()    # policy -> rejected requests
+
+    @classmethod
+    def configure(cls,
+                  policies: Dict[str, Dict],
+                  shared_path: str = "",
+                  shared_shards: int = 16,
+                  shared_slots: int = 65536) -> None:
+        """
+        Set policies and backend.
+
+        :param policies: Policy name -> {"algorithm": ..., "limit": ..., "period_seconds": ..., "key": ...}
+        :param shared_path: File of shared memory table, empty for per-worker memory
+        :param shared_shards: Shards (lock ranges) of shared table
+        :param shared_slots: Slots of shared table (keys it can hold)
+        :raises ValueError: If a policy is invalid
+        """
+        parsed = {}
+        for name, policy in policies.items():
+            if policy["algorithm"] not in cls.ALGORITHMS or policy["key"] not in cls.KEYS:
+                raise ValueError(f"Rate limit policy '{name}': algorithm must be one of {', '.join(cls.ALGORITHMS)}, "
+                                 f"key one of {', '.join(cls.KEYS)}")
+            if policy["limit"] < 1 or policy["period_seconds"] <= 0:
+                raise ValueError(f"Rate limit policy '{name}' needs limit >= 1 and period_seconds > 0")
+
+            parsed[name] = RateLimitPolicy(name=name, algorithm=policy["algorithm"], limit=int(policy["limit"]),
+                                           period=float(policy["period_seconds"]), key=policy["key"])
+
+        if isinstance(cls.backend, SharedMemoryBackend):
+            cls.backend.close()
+        cls.backend = (SharedMemoryBackend(shared_path, shards=shared_shards,
+                                           slots_per_shard=max(1, shared_slots // shared_shards))
+                       if shared_path else MemoryBackend())
+        cls.policies = parsed
+        cls.enabled = True
+
+    @classmethod
+    def limit(cls, policy_name: str) -> Callable:
+        """
+        Dependency counting request against policy (429 over the limit).
+
+        :param policy_name: Name of policy in RATE_LIMIT_POLICIES
+        :return: FastAPI dependency
+        :raises ValueError: If policy is not defined in RATE_LIMIT_POLICIES
+        """
+        if policy_name not in settings.RATE_LIMIT_POLICIES:
+            raise ValueError(f"Unknown rate limit policy '{policy_name}', define it in RATE_LIMIT_POLICIES")
+
+        if settings.RATE_LIMIT_POLICIES[policy_name]["key"] == "ip":
+            async def limit_by_ip(request: Request, response: Response):
+                cls.check(policy_name, f"ip:{cls.get_client_ip(request)}", response)
+
+            return limit_by_ip
+
+        async def limit_by_user(request: Request, response: Response, current_user=Depends(get_current_user)):
+            # get_current_user is resolved once per request, the route reuses it
+            user_id = getattr(current_user, "id", None)
+            key = f"user:{user_id}" if user_id is not None else f"ip:{cls.get_client_ip(request)}"
+            cls.check(policy_name, key, response)
+
+        return limit_by_user
+
+    @staticmethod
+    def get_client_ip(request: Request) -> str:
+        """Client address (behind a proxy, run uvicorn with --proxy-headers)"""
+        return request.client.host if request.client is not None else "unknown"
+
+    @classmethod
+    def check(cls, policy_name: str, key: str, response: Optional[Response] = None) -> Decision:
+        """
+        Count request of key against policy.
+
+        :param policy_name: Name of policy
+        :param key: Client key ("user:1", "ip:127.0.0.1")
+        :param response: Response to set RateLimit-* headers on
+        :return: Decision (allowed if limiter is disabled)
+        :raises RateLimitExceededError: If key is over the limit (429)
+        """
+        if not cls.enabled:
+            return Decision(allowed=True, limit=0, remaining=0, retry_after=0.0, reset=0.0)
+
+        policy = cls.policies[policy_name]
+        decision = cls.backend.check(f"{policy_name}|{key}", policy, time.time())
+        if not decision.allowed:
+            cls.limited[policy_name] += 1
+            raise RateLimitExceededError(decision)
+
+        cls.allowed[policy_name] += 1
+        if response is not None:
+            response.headers.update(decision.headers())
+        return decision
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        """
+        Get rate limit statistics.
+
+        :return: Policies, backend, tracked keys, allowed and limited requests per policy
+        """
+        return {
+            "enabled": cls.enabled,
+            "backend": "shared_memory" if isinstance(cls.backend, SharedMemoryBackend) else "memory",
+            "keys": cls.backend.size(),
+            "policies": {name: {"algorithm": policy.algorithm, "limit": policy.limit,
+                                "period_seconds": policy.period, "key": policy.key,
+                                "allowed": cls.allowed[name], "limited": cls.limited[name]}
+                         for name, policy in cls.policies.items()},
+        }
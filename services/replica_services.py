@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import math
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc, text
+
+logger = logging.getLogger(__name__)
+
+# Lag of PostgreSQL standby: 0 when everything received is replayed
+_PG_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+@dataclass
+class RoutingState:
+    """Read routing of one request"""
+    prefer_primary: bool = False    # Reads go to primary (request of a recent writer)
+    wrote: bool = False     # Request committed a write
+    user_id: Optional[str] = None
+
+
+_request_state: ContextVar[Optional[RoutingState]] = ContextVar("replica_routing_state", default=None)
+
+
+class ReplicaRouter:
+    """
+    Routes read-only sessions (get_read_db) between read replicas.
+
+    Writes always go to primary (get_db). Read-only sessions get an engine from choose():
+    - healthy replica with the fewest checked out connections (round-robin on ties)
+    - primary, if no replica is configured or healthy,
+      or if the request comes from a client or user that wrote recently
+
+    Read-your-writes: replicas lag behind primary, so after a write its author
+    reads from primary for READ_YOUR_WRITES_SECONDS. Recent writers are recognized by:
+    - "read_primary_until" cookie set on responses of writing requests (any worker)
+    - user ID remembered by this worker (other clients of the same user)
+
+    Health: replicas are checked every REPLICA_HEALTH_INTERVAL_SECONDS (SELECT 1,
+    replay lag on PostgreSQL). A replica is taken out of rotation when a check or
+    a request fails with connection error, or when it lags more than READ_YOUR_WRITES_SECONDS.
+    It comes back after the next successful check.
+
+    Configured once by database.py; start()/stop() run health checks on startup/shutdown.
+    """
+
+    COOKIE_NAME = "read_primary_until"
+    HEALTH_TIMEOUT = 2.0    # Seconds for one replica check
+    PRUNE_THRESHOLD = 10000     # Number of remembered writers after which expired ones are dropped
+
+    primary: Any = None     # Read-only engine of primary (fallback)
+    replicas: Dict[str, Any] = {}
+    window: float = 5.0
+
+    down: Dict[str, str] = {}   # replica name -> reason
+    lag: Dict[str, float] = {}
+    routed: Counter = Counter()     # target ("primary" or replica name) -> number of sessions
+
+    _recent_writers: Dict[str, float] = {}   # user ID -> time until reads go to primary
+    _next: int = 0
+    _health_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def configure(cls, primary, replicas: Dict[str, Any], window: float) -> None:
+        """
+        Set engines to route between.
+
+        :param primary: Read-only engine of primary database
+        :param replicas: Dictionary replica name -> read-only engine
+        :param window: Read-your-writes window and maximal allowed replica lag in seconds
+        """
+        cls.primary = primary
+        cls.replicas = dict(replicas)
+        cls.window = window
+        cls.down = {}
+        cls.lag = {}
+
+        for name, engine in cls.replicas.items():
+            event.listen(engine.sync_engine, "handle_error", cls._make_error_handler(name))
+
+    @classmethod
+    def _make_error_handler(cls, name: str):
+        def handle_error(exception_context):
+            if exception_context.is_disconnect or isinstance(exception_context.sqlalchemy_exception, exc.OperationalError):
+                cls.mark_down(name, type(exception_context.original_exception).__name__)
+        return handle_error
+
+    @classmethod
+    def mark_down(cls, name: str, reason: str) -> None:
+        """
+        Take replica out of rotation until its next successful health check.
+
+        :param name: Replica name
+        :param reason: Shown in /debug/replicas
+        """
+        if name not in cls.down:
+            logger.warning("Replica %s is down: %s", name, reason)
+        cls.down[name] = reason
+
+    @classmethod
+    def choose(cls):
+        """
+        Choose engine for new read-only session of current request.
+
+        :return: Async engine (replica or primary)
+        """
+        state = _request_state.get()
+        healthy = [name for name in cls.replicas if name not in cls.down]
+
+        if not healthy or (state is not None and state.prefer_primary):
+            cls.routed["primary"] += 1
+            return cls.primary
+
+        cls._next += 1
+        start = cls._next % len(healthy)
+        ordered = healthy[start:] + healthy[:start]
+        name = min(ordered, key=lambda replica: cls._checked_out(cls.replicas[replica]))
+
+        cls.routed[name] += 1
+        return cls.replicas[name]
+
+    @staticmethod
+    def _checked_out(engine) -> int:
+        pool = engine.pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+    @classmethod
+    def begin_request(cls, cookie_value: Optional[str]) -> RoutingState:
+        """
+        Start routing of request (called by ReadYourWritesMiddleware).
+
+        :param cookie_value: Value of read_primary_until cookie
+        :return: Routing state of request
+        """
+        state = RoutingState()
+        if cookie_value:
+            try:
+                until = float(cookie_value)
+            except ValueError:
+                until = 0.0
+            now = time.time()
+            # Forged far-future values are ignored
+            state.prefer_primary = now < until <= now + cls.window
+
+        _request_state.set(state)
+        return state
+
+    @classmethod
+    def make_cookie(cls) -> str:
+        """
+        Build Set-Cookie value sending next reads of client to primary.
+
+        :return: Cookie header value
+        """
+        max_age = math.ceil(cls.window)
+        return f"{cls.COOKIE_NAME}={time.time() + cls.window:.3f}; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax"
+
+    @classmethod
+    def note_user(cls, user_id: Any) -> None:
+        """
+        Remember author of current request: reads go to primary if the user wrote recently.
+
+        :param user_id: Authenticated user ID
+        """
+        state = _request_state.get()
+        if state is None:
+            return
+
+        state.user_id = str(user_id)
+        until = cls._recent_writers.get(state.user_id)
+        if until is not None:
+            if until > time.time():
+                state.prefer_primary = True
+            else:
+                cls._recent_writers.pop(state.user_id, None)
+
+    @classmethod
+    def on_commit(cls, session) -> None:
+        """SQLAlchemy after_commit listener: current request has written"""
+        cls.note_write()
+
+    @classmethod
+    def note_write(cls) -> None:
+        """Current request has written: its author reads from primary for the window"""
+        state = _request_state.get()
+        if state is None:
+            return
+
+        state.wrote = True
+        state.prefer_primary = True
+        if state.user_id is not None:
+            now = time.time()
+            cls._recent_writers[state.user_id] = now + cls.window
+
+            if len(cls._recent_writers) > cls.PRUNE_THRESHOLD:
+                cls._recent_writers = {user_id: until for user_id, until in cls._recent_writers.items() if until > now}
+
+    @classmethod
+    def get_read_staleness_ns(cls) -> int:
+        """
+        How old data read by current request may be.
+        Cache uses it to not store replica data older than a recent write.
+
+        :return: Staleness in ns (0 when reads go to primary)
+        """
+        state = _request_state.get()
+        if not cls.replicas or (state is not None and state.prefer_primary):
+            return 0
+
+        return int(cls.window * 1_000_000_000)
+
+    @classmethod
+    async def check_health(cls) -> Dict[str, Any]:
+        """
+        Check every replica once and update rotation.
+
+        :return: Replication status (see get_stats)
+        """
+        for name, engine in cls.replicas.items():
+            try:
+                async with asyncio.timeout(cls.HEALTH_TIMEOUT):
+                    async with engine.connect() as conn:
+                        if engine.dialect.name == "postgresql":
+                            lag = float(await conn.scalar(_PG_LAG_QUERY) or 0)
+                        else:
+                            await conn.execute(text("SELECT 1"))
+                            lag = 0.0
+            except Exception as e:
+                cls.mark_down(name, type(e).__name__)
+                continue
+
+            cls.lag[name] = lag
+            if lag > cls.window:
+                cls.mark_down(name, f"lag {lag:.1f}s")
+            elif cls.down.pop(name, None) is not None:
+                logger.info("Replica %s is back in rotation", name)
+
+        return cls.get_stats()
+
+    @classmethod
+    async def start(cls, interval: float) -> None:
+        """
+        Start periodic health checks.
+
+        :param interval: Seconds between checks
+        """
+        if cls._health_task is None and cls.replicas:
+            await cls.check_health()
+            cls._health_task = asyncio.create_task(cls._health_loop(interval))
+
+    @classmethod
+    async def _health_loop(cls, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await cls.check_health()
+            except Exception:
+                logger.exception("Replica health check failed")
+
+    @classmethod
+    def stop(cls) -> None:
+        """Stop periodic health checks"""
+        if cls._health_task is not None:
+            cls._health_task.cancel()
+            cls._health_task = None
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get replication status.
+
+        :return: Replicas with health and lag, sessions per target, read-your-writes window
+        """
+        return {
+            "window_seconds": cls.window,
+            "replicas": {name: {"healthy": name not in cls.down,
+                                "reason": cls.down.get(name),
+                                "lag_seconds": cls.lag.get(name)}
+                         for name in cls.replicas},
+            "routed": dict(cls.routed),
+            "recent_writers": len(cls._recent_writers),
+        }
@@ -0,0 +1,387 @@
+import asyncio
+import heapq
+import logging
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, TypeVar
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+
+from helpers import metrics_helper
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Jump consistent hash (Lamping, Veach): bucket of key among buckets.
+    Growing from N to N + 1 buckets moves only 1 / (N + 1) of keys, all of them to the new bucket.
+
+    :param key: Integer key (user ID)
+    :param buckets: Number of buckets (shards)
+    :return: Bucket index
+    """
+    key &= 0xFFFFFFFFFFFFFFFF
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+
+    return bucket
+
+
+class ShardRouter:
+    """
+    Routes users and their items between N databases (shards) by user ID (opt-in, DATABASE_SHARD_URLS).
+
+    A user and all of their items live on shard_for(user_id):
+    - hash: jump consistent hash of user ID (adding a shard moves ~1/N of users)
+    - range: SHARD_RANGES upper bounds, e.g. "100000,200000" -> shard_0 below 100000,
+      shard_1 below 200000, shard_2 for the rest
+
+    Sessions (SessionLocal, ReadSessionLocal) are SQLAlchemy ShardedSessions using choosers below:
+    - statements with user ID criteria (users.id, item.user_id; = or IN) run on its shard(s)
+    - relationship loads run on the shard of their parent
+    - other statements (lookups by email, item ID) run on every shard, rows are concatenated
+    - new rows go to the shard of their user, so IDs are assigned before flush (allocate_id)
+
+    Lists of all rows (GET /items/, GET /users/) use fan_out(): every shard is read
+    concurrently in its own session and results are merged by ID (merge_by_cursor).
+
+    IDs are unique across shards (rows can move between shards): every worker takes
+    blocks of SHARD_ID_BLOCK_SIZE IDs from shard_id_blocks table of primary database (hi/lo).
+
+    Rebalancing: after changing shards or routing, rebalance() moves users with their items
+    to their new shards (/debug/shards). Writes of moving users should be paused meanwhile.
+
+    Cross-shard uniqueness of email and name is checked before writes (reads of every shard),
+    database constraints enforce it per shard only. Read replicas and WriteQueue
+    are used only without sharding.
+
+    Configured once by database.py.
+    """
+
+    SHARD_KEYS = {
+        "users": "id",
+        "item": "user_id",
+    }
+    """
+    Sharded tables: table name -> column holding user ID.
+
+    Rows of every table are stored on shard of their user ID.
+    Order matters for moving rows: parents first (inserted first, deleted last).
+    """
+
+    MOVE_BATCH = 500    # Users moved in one transaction by rebalance()
+
+    shards: Dict[str, Any] = {}     # shard name -> engine (writes)
+    read_shards: Dict[str, Any] = {}    # shard name -> read-only engine
+    routing: str = "hash"
+    ranges: List[int] = []
+    block_size: int = 1000
+
+    routed: Counter = Counter()     # shard name or "all" -> number of ORM statements
+
+    _directory: Any = None  # Engine of primary database (ID blocks)
+    _blocks: Dict[str, List[int]] = {}  # entity -> [next ID, end of block]
+    _lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def configure(cls,
+                  shards: Dict[str, Any],
+                  read_shards: Dict[str, Any],
+                  routing: str,
+                  ranges: List[int],
+                  directory,
+                  block_size: int) -> None:
+        """
+        Set shards to route between.
+
+        :param shards: Dictionary shard name -> async engine, in shard order
+        :param read_shards: Dictionary shard name -> read-only async engine
+        :param routing: "hash" or "range"
+        :param ranges: Upper bounds (exclusive) of user IDs of all shards but the last one ("range")
+        :param directory: Async engine of primary database holding ID blocks
+        :param block_size: IDs taken from primary database at once
+        :raises ValueError: Unknown routing or ranges not matching shards
+        """
+        if routing not in ("hash", "range"):
+            raise ValueError(f"Unknown SHARD_ROUTING '{routing}', expected hash or range")
+        if routing == "range" and (len(ranges) != len(shards) - 1 or ranges != sorted(ranges)):
+            raise ValueError(f"SHARD_RANGES needs {len(shards) - 1} ascending bounds for {len(shards)} shards")
+
+        cls.shards = dict(shards)
+        cls.read_shards = dict(read_shards)
+        cls.routing = routing
+        cls.ranges = list(ranges)
+        cls._directory = directory
+        cls.block_size = max(1, block_size)
+        cls._blocks = {}
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return bool(cls.shards)
+
+    @classmethod
+    def shard_for(cls, user_id: int) -> str:
+        """
+        Get shard of user.
+
+        :param user_id: User ID
+        :return: Shard name
+        """
+        names = list(cls.shards)
+        if cls.routing == "range":
+            return names[bisect_right(cls.ranges, int(user_id))]
+
+        return names[jump_hash(int(user_id), len(names))]
+
+    # Choosers of ShardedSession
+
+    @classmethod
+    def shard_chooser(cls, mapper, instance, clause=None) -> str:
+        """Shard of flushed instance (or of statements without mapper, e.g. session.connection())"""
+        if mapper is None or instance is None:
+            return next(iter(cls.shards))
+
+        key = cls.SHARD_KEYS.get(mapper.local_table.name)
+        user_id = getattr(instance, key, None) if key else None
+        if user_id is None:
+            raise ValueError(f"{mapper.class_.__name__} needs {key} before flush with sharding "
+                             f"(see ShardRouter.allocate_id)")
+
+        return cls.shard_for(user_id)
+
+    @classmethod
+    def identity_chooser(cls, mapper, primary_key, *, lazy_loaded_from, **kwargs) -> List[str]:
+        """Shards to look up identity (session.get(), refresh) on"""
+        if lazy_loaded_from is not None:
+            return [lazy_loaded_from.identity_token]
+
+        if cls.SHARD_KEYS.get(mapper.local_table.name) == mapper.primary_key[0].key:
+            return [cls.shard_for(primary_key[0])]
+
+        return list(cls.shards)
+
+    @classmethod
+    def execute_chooser(cls, orm_context) -> List[str]:
+        """Shards to run ORM statement on: by user ID criteria, or every shard"""
+        if orm_context.lazy_loaded_from is not None:
+            return [orm_context.lazy_loaded_from.identity_token]
+
+        user_ids = cls._find_user_ids(orm_context.statement, orm_context.parameters or {})
+        if user_ids:
+            shards = sorted({cls.shard_for(user_id) for user_id in user_ids}, key=list(cls.shards).index)
+            for shard in shards:
+                cls.routed[shard] += 1
+                metrics_helper.SHARD_STATEMENTS.inc(shard)
+            return shards
+
+        cls.routed["all"] += 1
+        metrics_helper.SHARD_STATEMENTS.inc("all")
+        return list(cls.shards)
+
+    @classmethod
+    def _find_user_ids(cls, statement, parameters: Dict[str, Any]) -> Set[int]:
+        """User IDs compared with shard key columns (= or IN) anywhere in statement"""
+        user_ids = set()
+        for element in visitors.iterate(statement):
+            if not isinstance(element, BinaryExpression) or element.operator not in (operators.eq, operators.in_op):
+                continue
+
+            column, value = element.left, element.right
+            table = getattr(column, "table", None)
+            if getattr(table, "name", None) is None or cls.SHARD_KEYS.get(table.name) != getattr(column, "key", None):
+                continue
+            if not isinstance(value, BindParameter):
+                continue
+
+            # Relationship loads (selectin) pass values as execution parameters
+            values = value.effective_value
+            if values is None:
+                values = parameters.get(value.key)
+            if values is None:
+                continue
+            if isinstance(values, (list, tuple, set)):
+                user_ids.update(int(user_id) for user_id in values)
+            else:
+                user_ids.add(int(values))
+
+        return user_ids
+
+    # Global IDs
+
+    @classmethod
+    async def allocate_id(cls, entity: str) -> Optional[int]:
+        """
+        Get ID of new row, unique across shards.
+
+        :param entity: Table name (every table has its own blocks)
+        :return: New ID, or None without sharding (database assigns it)
+        """
+        if not cls.shards:
+            return None
+
+        block = cls._blocks.get(entity)
+        if block is None or block[0] >= block[1]:
+            if cls._lock is None:
+                cls._lock = asyncio.Lock()
+            async with cls._lock:
+                block = cls._blocks.get(entity)
+                if block is None or block[0] >= block[1]:
+                    block = cls._blocks[entity] = await cls._take_block(entity)
+
+        new_id = block[0]
+        block[0] += 1
+        return new_id
+
+    @classmethod
+    async def _take_block(cls, entity: str) -> List[int]:
+        """Take next free block of IDs from primary database"""
+        async with cls._directory.begin() as conn:
+            number = await conn.scalar(text("INSERT INTO shard_id_blocks (entity) VALUES (:entity) RETURNING id"),
+                                       {"entity": entity})
+
+        return [number * cls.block_size, (number + 1) * cls.block_size]
+
+    # Fan-out
+
+    @classmethod
+    async def fan_out(cls, operation: Callable[[AsyncSession], Awaitable[T]], read_only: bool = True) -> List[T]:
+        """
+        Run operation on every shard concurrently, each in its own session.
+
+        :param operation: Async function (db) -> result, db is bound to one shard
+        :param read_only: Use read-only engines of shards
+        :return: Results in shard order
+        """
+        engines = cls.read_shards if read_only else cls.shards
+
+        async def run(shard_engine) -> T:
+            async with AsyncSession(bind=shard_engine, autoflush=False, expire_on_commit=False) as db:
+                return await operation(db)
+
+        cls.routed["fan_out"] += 1
+        metrics_helper.SHARD_STATEMENTS.inc("fan_out")
+        return await asyncio.gather(*(run(shard_engine) for shard_engine in engines.values()))
+
+    @staticmethod
+    def merge_by_cursor(results: Iterable[Iterable[T]],
+                        key: Callable[[T], Any],
+                        after: Any = None,
+                        limit: Optional[int] = None) -> List[T]:
+        """
+        Merge lists of shards, each sorted by key, into one sorted list.
+        Rows with the same key are returned once: while rebalance moves a user,
+        its rows are committed on the target shard before they are deleted from the source.
+
+        :param results: Sorted lists of every shard
+        :param key: Cursor of a row, unique across shards (ID)
+        :param after: Return only rows with cursor greater than this
+        :param limit: Max number of rows
+        :return: Merged rows
+        """
+        merged = []
+        last = after
+        for row in heapq.merge(*results, key=key):
+            cursor = key(row)
+            # Rows before the cursor and copies of the row just returned
+            if last is not None and cursor <= last:
+                continue
+            merged.append(row)
+            last = cursor
+            if limit is not None and len(merged) >= limit:
+                break
+
+        return merged
+
+    # Rebalancing
+
+    @classmethod
+    async def rebalance(cls, metadata, dry_run: bool = True) -> Dict[str, Any]:
+        """
+        Move users whose shard changed (new shard, other routing or ranges) with all their rows.
+
+        Rows are copied to the new shard and committed first, then deleted from the old one;
+        a move interrupted between the two is finished by the next run.
+
+        :param metadata: MetaData with sharded tables (Base.metadata)
+        :param dry_run: Only count users to move
+        :return: Users per shard and moves (source -> target -> number of users)
+        """
+        users_table = next(iter(cls.SHARD_KEYS))
+        moves: Dict[str, Dict[str, List[int]]] = {}
+        users = {}
+
+        for name, shard_engine in cls.shards.items():
+            async with shard_engine.connect() as conn:
+                user_ids = (await conn.scalars(select(metadata.tables[users_table].c[cls.SHARD_KEYS[users_table]]))).all()
+
+            users[name] = len(user_ids)
+            for user_id in user_ids:
+                target = cls.shard_for(user_id)
+                if target != name:
+                    moves.setdefault(name, {}).setdefault(target, []).append(user_id)
+
+        moved = 0
+        if not dry_run:
+            for source, targets in moves.items():
+                for target, user_ids in targets.items():
+                    for start in range(0, len(user_ids), cls.MOVE_BATCH):
+                        await cls._move_users(metadata, source, target, user_ids[start:start + cls.MOVE_BATCH])
+                        moved += len(user_ids[start:start + cls.MOVE_BATCH])
+                    logger.info("Moved %s users from %s to %s", len(user_ids), source, target)
+
+        return {
+            "dry_run": dry_run,
+            "routing": cls.routing,
+            "users": users,
+            "moves": {source: {target: len(user_ids) for target, user_ids in targets.items()}
+                      for source, targets in moves.items()},
+            "moved_users": moved,
+        }
+
+    @classmethod
+    async def _move_users(cls, metadata, source: str, target: str, user_ids: List[int]) -> None:
+        """Copy rows of users to target shard, then delete them from source shard"""
+        tables = [(metadata.tables[name], column) for name, column in cls.SHARD_KEYS.items()]
+
+        async with cls.shards[source].connect() as source_conn:
+            rows = {}
+            for table, column in tables:
+                result = await source_conn.execute(select(table).where(table.c[column].in_(user_ids)))
+                rows[table.name] = [dict(row) for row in result.mappings()]
+
+        async with cls.shards[target].begin() as target_conn:
+            # Leftovers of an interrupted move are replaced
+            for table, column in reversed(tables):
+                await target_conn.execute(delete(table).where(table.c[column].in_(user_ids)))
+            for table, _ in tables:
+                if rows[table.name]:
+                    await target_conn.execute(insert(table), rows[table.name])
+
+        async with cls.shards[source].begin() as source_conn:
+            for table, column in reversed(tables):
+                await source_conn.execute(delete(table).where(table.c[column].in_(user_ids)))
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get sharding configuration and routing statistics.
+
+        :return: Shards, routing, statements per shard ("all": every shard, "fan_out": concurrent lists)
+        """
+        return {
+            "enabled": bool(cls.shards),
+            "shards": list(cls.shards),
+            "routing": cls.routing,
+            "ranges": cls.ranges,
+            "id_block_size": cls.block_size,
+            "routed": dict(cls.routed),
+        }
@@ -141,14 +141,16 @@ class ValidationService:
         Internally uses SQLAlchemy exists() for efficient checking
         (doesn't load the actual record, only checks for existence).
         """
-        # Build the base query to check for existence of the value in the field 
-        query = select(exists().where(getattr(model, field) == value))
+        # Build the conditions to check for existence of the value in the field 
+        conditions = [getattr(model, field) == value]
         # Exclude the current record if updating
+        # (inside EXISTS: outer WHERE would make the query read the whole table)
         if current_record_id is not None:
-            query = query.where(model.id != current_record_id)
+            conditions.append(model.id != current_record_id)
         
+        query = select(exists().where(*conditions))
         result = await db.execute(query)
-        return result.scalar()
+        return any(result.scalars())    # One row per shard with sharding
 
     @classmethod
     async def validate_update(cls,
@@ -322,15 +324,13 @@ class ValidationService:
         if user_id is None:
             return False
         
-        # Build the query to check for existence of the value for this user
-        query = select(exists().where(
-            (getattr(model, field) == value) &
-            (model.user_id == user_id)
-        ))
+        # Build the conditions to check for existence of the value for this user
+        conditions = [getattr(model, field) == value, model.user_id == user_id]
         
-        # Exclude the current record by ID
+        # Exclude the current record by ID (inside EXISTS, see check_field_duplicates)
         if hasattr(record, 'id') and record.id:
-            query = query.where(model.id != record.id)
+            conditions.append(model.id != record.id)
         
+        query = select(exists().where(*conditions))
         result = await db.execute(query)
-        return result.scalar()
\ No newline at end of file
+        return any(result.scalars())    # One row per shard with sharding
\ No newline at end of file
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from DAO.general_dao import GeneralDAO
+from DAO.item_dao import ItemDao
+from DAO.user_dao import UserDAO
+from config import settings
+from database import models
+from database.database import ReadSessionLocal, SessionLocal, get_engines
+from repository.user_repository import get_cached_user
+from services.availability_services import AvailabilityService
+from services.cache_services import CacheService
+from services.replica_services import ReplicaRouter
+from services.user_services import UserService
+from services.validation_services import ValidationService
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupService:
+    """
+    Startup warm-up phase.
+
+    Runs in background right after startup and does the work
+    that the first requests would otherwise pay for:
+    1. Opens pool_size connections of every pool (pool priming)
+    2. Runs every DAO lookup once against the primary and the read pool, so SQLAlchemy
+       compiles and caches its SQL. These are real queries (matching no rows),
+       sent to the databases on every start
+    3. Generates /openapi.json
+    4. Loads username/email availability filters
+    5. Optionally prefills cache with top-N hot keys from the last snapshot
+
+    Readiness endpoint (/ready) reports 200 only after warm-up is finished.
+    Response models are not warmed up: FastAPI builds their validators and
+    serializers when routes are declared, and the first use costs about 0.1 ms.
+    """
+
+    RESTORE_BATCH_SIZE = 500    # User IDs per query when restoring cache snapshot
+
+    ready: bool = False
+    duration: float = 0.0
+
+    @classmethod
+    async def run(cls, app: FastAPI) -> None:
+        """
+        Run all warm-up steps and mark application as ready.
+        Failed steps are logged and don't block readiness.
+
+        :param app: FastAPI application
+        """
+        started = time.perf_counter()
+
+        steps = [
+            *(cls.prime_pool(engine=engine) for engine in get_engines().values()),
+            cls.precompile_statements(session_factory=SessionLocal),
+            cls.precompile_statements(session_factory=ReadSessionLocal),
+            cls.build_openapi(app=app),
+            AvailabilityService.load(),
+        ]
+        if settings.WARMUP_PREFILL_TOP_N > 0:
+            steps.append(cls.prefill_cache(top_n=settings.WARMUP_PREFILL_TOP_N))
+
+        for step in steps:
+            try:
+                await step
+            except Exception:
+                logger.exception("Warm-up step failed")
+
+        cls.duration = time.perf_counter() - started
+        cls.ready = True
+        logger.info("Warm-up finished in %.3fs", cls.duration)
+
+    @staticmethod
+    async def prime_pool(engine: AsyncEngine) -> int:
+        """
+        Open pool_size connections at once and return them to the pool.
+
+        :param engine: SQLAlchemy async engine
+        :return: Number of opened connections
+        """
+        pool_size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+
+        connections = await asyncio.gather(*(engine.connect() for _ in range(pool_size)))
+        try:
+            await asyncio.gather(*(connection.execute(select(1)) for connection in connections))
+        finally:
+            await asyncio.gather(*(connection.close() for connection in connections))
+
+        return pool_size
+
+    @staticmethod
+    async def precompile_statements(session_factory) -> None:
+        """
+        Run every DAO and validation lookup with values that match nothing.
+        Compiled SQL lands in SQLAlchemy compiled cache, so real requests skip compilation.
+        The lookups are real queries: every start sends them to the database
+        behind session_factory (primary or read pool) and checks out its connections.
+
+        :param session_factory: SessionLocal or ReadSessionLocal (every engine has its own cache)
+        """
+        missing_record = SimpleNamespace(id=-1, user_id=-1)
+
+        async with session_factory() as db:
+            await UserDAO.get_user_email(db=db, user_email="")
+            await UserDAO.get_user_name(db=db, user_name="")
+            await UserDAO.get_user_by_id(db=db, user_id=-1)
+
+            await ItemDao.get_item_name(db=db, item_name="")
+            await ItemDao.get_items_by_user_id(db=db, user_id=-1)
+            await ItemDao.get_item_by_user_id(db=db, item_id=-1, user_id=-1)
+            await ItemDao.get_item_by_user_id_and_item_name(db=db, user_id=-1, item_name="")
+
+            for model in (models.User, models.Item):
+                await GeneralDAO.get_record_by_id(record_id=-1, model=model, db=db)
+
+                rules = ValidationService.get_validation_rules(model)
+                for field in rules.get("unique_fields", []):
+                    await ValidationService.check_field_duplicates(field=field,
+                                                                   value="",
+                                                                   model=model,
+                                                                   current_record_id=-1,
+                                                                   db=db)
+                for field in rules.get("unique_per_user_fields", []):
+                    await ValidationService.check_field_duplicates_per_user(field=field,
+                                                                            value="",
+                                                                            model=model,
+                                                                            record=missing_record,
+                                                                            db=db)
+
+    @staticmethod
+    async def build_openapi(app: FastAPI) -> None:
+        """
+        Generate OpenAPI schema once, FastAPI caches it for /openapi.json and /docs.
+
+        :param app: FastAPI application
+        """
+        app.openapi()
+
+    @classmethod
+    async def prefill_cache(cls, top_n: int) -> int:
+        """
+        Load top-N hot cache keys (remembered in cache snapshot) that are not cached yet.
+
+        :param top_n: Number of hottest keys to prefill
+        :return: Number of loaded keys
+        """
+        loaded = 0
+        async with ReadSessionLocal() as db:
+            for key in CacheService.hot_keys(top_n):
+                if CacheService.get(key) is not None:
+                    continue
+                if await cls.load_key(key=key, db=db):
+                    loaded += 1
+
+        return loaded
+
+    @classmethod
+    async def restore_cache(cls, path: str) -> int:
+        """
+        Restore cache snapshot saved by previous workers.
+
+        Writes made while workers were down are not in the snapshot, so every entry
+        is checked against the database with one batched query per entity:
+        a user entry is cached only if it still matches the user's row.
+        Lists are checked by reading them, so they are simply reloaded (one query each).
+        Run after InvalidationBus is started: writes made during the check drop
+        the restored entries like any other load.
+
+        :param path: Snapshot file (CACHE_SNAPSHOT_PATH)
+        :return: Number of restored entries
+        """
+        entries = CacheService.load_snapshot(path)
+        if not entries:
+            return 0
+
+        user_keys = {int(key.split(":", 1)[1]): key for key in entries
+                     if key.startswith("User:") and key.split(":", 1)[1].isdigit()}
+
+        restored = 0
+        async with ReadSessionLocal() as db:
+            user_ids = list(user_keys)
+            for offset in range(0, len(user_ids), cls.RESTORE_BATCH_SIZE):
+                loaded_version = CacheService.new_version() - ReplicaRouter.get_read_staleness_ns()
+                batch = user_ids[offset:offset + cls.RESTORE_BATCH_SIZE]
+                users = await db.execute(select(models.User).where(models.User.id.in_(batch)))
+                for user in users.scalars():
+                    key = user_keys[user.id]
+                    current = await UserService.create_user_response(user=user)
+                    if current == entries[key][1]:
+                        CacheService.set(key, current, loaded_version)
+                        restored += 1
+
+            for key in entries:
+                if key not in user_keys.values() and await cls.load_key(key=key, db=db):
+                    restored += 1
+
+        logger.info("Cache snapshot: %d of %d entries restored", restored, len(entries))
+        return restored
+
+    @staticmethod
+    async def load_key(key: str, db) -> bool:
+        """
+        Load value of cache key from database into cache.
+
+        :param key: Cache key ("User:5", "User:list", "Item:list")
+        :param db: Read-only database session
+        :return: True if value was loaded, False for unknown keys and missing records
+        """
+        entity, ident = key.split(":", 1)
+        try:
+            if key == "User:list":
+                await UserDAO.get_all_users(db=db)
+            elif key == "Item:list":
+                await ItemDao.get_all_items(db=db)
+            elif entity == "User" and ident.isdigit():
+                await get_cached_user(user_id=int(ident), db=db)
+            else:
+                return False
+        except HTTPException:
+            # Record was deleted or list is empty, nothing to cache
+            return False
+
+        return True
@@ -0,0 +1,234 @@
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import SessionLocal
+from helpers import metrics_helper
+from services.replica_services import ReplicaRouter
+from services.shard_services import ShardRouter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# (operation, context of caller, future of caller)
+_Entry = Tuple[Callable[[AsyncSession], Awaitable[Any]], contextvars.Context, asyncio.Future]
+
+
+class WriteQueue:
+    """
+    Group commit for write operations (opt-in, WRITE_QUEUE_ENABLED).
+
+    Every write of repository layer goes through WriteQueue.run(operation, db).
+    An operation is an async function of a session that writes without committing
+    (flush to get IDs) and returns its result.
+
+    Disabled: operation runs on caller's session, which is then committed.
+    Enabled: operations of concurrent requests are collected into batches and
+    one background task runs each batch in one transaction on one connection:
+
+        BEGIN -> SAVEPOINT op1 ... RELEASE -> SAVEPOINT op2 ... ROLLBACK TO -> ... -> COMMIT
+
+    - every operation is in its own SAVEPOINT: an error (409, IntegrityError)
+      rolls back only its writes and is raised to its caller
+    - one COMMIT (one fsync on SQLite) per batch instead of one per request;
+      if it fails, every caller of the batch gets the error
+    - a batch starts at most WRITE_QUEUE_MAX_LATENCY_MS after its first operation
+      arrived, or as soon as WRITE_QUEUE_MAX_BATCH operations are waiting
+    - operations run in context of their callers (tracing, query profiler)
+
+    Made for prod-sqlite (one writer connection); on PostgreSQL it serializes writes
+    of a worker on one connection, measure before enabling. Not started with sharding
+    (a batch runs on one connection, writes of a request go to the shard of its user).
+
+    Usage Example:
+    ---------------
+    **Create item and publish invalidation after commit**
+    - item = await WriteQueue.run(lambda write_db: ItemDao.create_item(db=write_db, ...), db=db)
+    - await InvalidationBus.publish("Item", item.id)
+    """
+
+    DRAIN_TIMEOUT = 5.0     # Seconds to finish queued operations on shutdown
+
+    max_batch: int = 64
+    max_latency: float = 0.002
+
+    batches: int = 0
+    operations: int = 0
+    failed_batches: int = 0
+
+    _queue: Optional[asyncio.Queue] = None
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def run(cls, operation: Callable[[AsyncSession], Awaitable[T]], db: AsyncSession) -> T:
+        """
+        Run write operation and commit it.
+
+        Started queue: caller's session is closed first (the writer connection
+        is needed by the batch), so operation must do its own reads of rows it writes.
+        Returned ORM objects are detached with loaded attributes (expire_on_commit=False).
+
+        :param operation: Async function (db) -> result, writes without committing
+        :param db: Session of caller
+        :return: Result of operation after its writes are committed
+        :raises Exception: Error of operation (its writes are rolled back) or of batch commit
+        """
+        if cls._queue is None:
+            try:
+                result = await operation(db)
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+            return result
+
+        await db.close()
+
+        future = asyncio.get_running_loop().create_future()
+        cls._queue.put_nowait((operation, contextvars.copy_context(), future))
+        result = await future
+
+        ReplicaRouter.note_write()  # Batch commit happened outside of request context
+        return result
+
+    @classmethod
+    async def start(cls, max_batch: int, max_latency: float) -> None:
+        """
+        Start batching writes.
+
+        :param max_batch: Max operations in one transaction
+        :param max_latency: Max seconds an operation waits for its batch to start
+        """
+        if cls._task is not None:
+            return
+        if ShardRouter.enabled():
+            logger.warning("Write queue is not used with sharding, writes commit directly")
+            return
+
+        cls.max_batch = max(1, max_batch)
+        cls.max_latency = max(0.0, max_latency)
+        cls._queue = asyncio.Queue()
+        cls._task = asyncio.create_task(cls._worker())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Finish queued operations (up to DRAIN_TIMEOUT) and stop batching"""
+        if cls._task is None:
+            return
+
+        queue, task = cls._queue, cls._task
+        cls._queue = None   # New writes commit directly
+        try:
+            async with asyncio.timeout(cls.DRAIN_TIMEOUT):
+                await queue.join()
+        except TimeoutError:
+            logger.warning("Write queue stopped with %s operations left", queue.qsize())
+
+        task.cancel()
+        cls._task = None
+
+        while not queue.empty():
+            _, _, future = queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Write queue stopped"))
+
+    @classmethod
+    async def _worker(cls) -> None:
+        queue = cls._queue
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + cls.max_latency
+
+            while len(batch) < cls.max_batch:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except TimeoutError:
+                    break
+
+            try:
+                await cls._run_batch(batch)
+            except Exception as e:
+                logger.exception("Write batch failed")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    @classmethod
+    async def _run_batch(cls, batch: List[_Entry]) -> None:
+        """Run operations of batch in savepoints of one transaction and commit it"""
+        started = time.perf_counter()
+        done = []
+
+        async with SessionLocal() as db:
+            conn = await db.connection()
+            if conn.dialect.name == "sqlite":
+                # pysqlite starts transactions lazily: without BEGIN the first RELEASE would commit
+                await conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+            for operation, context, future in batch:
+                if future.done():
+                    continue    # Caller was cancelled
+
+                try:
+                    async with db.begin_nested():
+                        await db.connection()   # SAVEPOINT is emitted here, not counted as query of request
+                        # context= is Python 3.11+ (minimum of this project, see README)
+                        result = await asyncio.create_task(operation(db), context=context)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+
+                done.append((future, result))
+
+            try:
+                await db.commit()
+            except Exception as e:
+                cls.failed_batches += 1
+                logger.warning("Write batch commit failed: %s", type(e).__name__)
+                for future, _ in done:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+        cls.batches += 1
+        cls.operations += len(batch)
+        metrics_helper.WRITE_BATCH_SIZE.observe(len(batch))
+        metrics_helper.WRITE_BATCH_DURATION.observe(time.perf_counter() - started)
+
+        for future, result in done:
+            if not future.done():
+                future.set_result(result)
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        """
+        Get write queue statistics.
+
+        :return: Queued operations, committed batches and operations, average batch size
+        """
+        return {
+            "enabled": cls._queue is not None,
+            "queued": cls._queue.qsize() if cls._queue is not None else 0,
+            "batches": cls.batches,
+            "operations": cls.operations,
+            "failed_batches": cls.failed_batches,
+            "avg_batch_size": round(cls.operations / cls.batches, 2) if cls.batches else 0.0,
+        }
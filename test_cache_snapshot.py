@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import time
+import zlib
+
+"""
+Cache snapshot (warm restart) check.
+
+Caches users and lists, saves a snapshot, changes one user in the database
+behind the cache's back (a write made while workers were down), clears the cache
+and restores the snapshot.
+
+Checks:
+- snapshot is compressed JSON, not pickle
+- unchanged users are restored with a fresh TTL, the changed user is not
+- snapshots in directories or files writable by others, and too old snapshots, are ignored
+
+Run with:  pytest -s test_cache_snapshot.py
+"""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from config import settings
+from DAO.item_dao import ItemDao
+from database import models
+from database.database import ReadSessionLocal, SessionLocal
+from helpers.seed_helper import seed_database
+from main import app
+from repository.user_repository import get_cached_user
+from services.cache_services import CacheService
+from services.warmup_services import WarmupService
+
+
+def test_cache_snapshot(database):
+    """Snapshot entries are restored only if they still match the database"""
+    directory = tempfile.mkdtemp()  # Mode 0700
+    path = os.path.join(directory, "cache", "cache.snapshot")
+
+    async def fill_cache() -> None:
+        await seed_database(SessionLocal, users=3, items_per_user=1)
+        async with ReadSessionLocal() as db:
+            for user_id in (1, 2, 3):
+                await get_cached_user(user_id=user_id, db=db)
+            await ItemDao.get_all_items(db=db)
+
+    async def change_user() -> None:
+        async with SessionLocal() as db:
+            await db.execute(update(models.User).where(models.User.id == 2).values(bio="Changed while down"))
+            await db.commit()
+
+    with TestClient(app) as client:
+        CacheService.clear()
+        client.portal.call(fill_cache)
+        saved = CacheService.save_snapshot(path)
+
+        client.portal.call(change_user)
+        CacheService.clear()
+        restored = client.portal.call(WarmupService.restore_cache, path)
+        cached = {user_id: CacheService.get(CacheService.make_key("User", user_id)) for user_id in (1, 2, 3)}
+        expires = CacheService._entries["User:1"][1]
+        items_list = CacheService.get("Item:list")
+
+        with open(path, "rb") as snapshot_file:
+            data = json.loads(zlib.decompress(snapshot_file.read()))
+
+        # Snapshot written by anyone else is not used
+        os.chmod(os.path.dirname(path), 0o777)
+        from_open_directory = CacheService.load_snapshot(path)
+        os.chmod(os.path.dirname(path), 0o700)
+        os.chmod(path, 0o666)
+        from_open_file = CacheService.load_snapshot(path)
+        os.chmod(path, 0o600)
+        from_private_file = CacheService.load_snapshot(path)
+
+        data["saved_at"] = time.time() - settings.CACHE_SNAPSHOT_MAX_AGE_SECONDS - 1
+        with open(path, "wb") as snapshot_file:
+            snapshot_file.write(zlib.compress(json.dumps(data).encode()))
+        from_old_file = CacheService.load_snapshot(path)
+
+    print(f"\nSaved {saved} entries, restored {restored}")
+
+    assert saved == 4, saved
+    assert set(data["entries"]) == {"User:1", "User:2", "User:3", "Item:list"}, data["entries"]
+
+    # Changed user is loaded from the database on next read, not from the snapshot
+    assert cached[1] is not None and cached[3] is not None, cached
+    assert cached[2] is None, cached[2]
+    assert restored == 3, restored     # Users 1, 3 and the reloaded items list
+    assert items_list is not None and len(items_list) == 3, items_list
+    assert expires > time.time() + settings.CACHE_TTL_SECONDS - 5, expires
+
+    assert from_open_directory == {} and from_open_file == {}, (from_open_directory, from_open_file)
+    assert len(from_private_file) == 4, from_private_file
+    assert from_old_file == {}, from_old_file
+
@@ -0,0 +1,69 @@
+"""
+Connection release check.
+
+Repository functions decorated with @release_connection must give their pool
+connection back before FastAPI validates and encodes the response, so slow
+serialization of big responses doesn't hold connections.
+Records checked out connections of every pool while the repository builds the
+response (connection still held) and while FastAPI serializes it (released).
+
+Run with:  pytest -s test_connection_release.py
+"""
+
+from fastapi import routing
+from fastapi.testclient import TestClient
+
+from database.database import SessionLocal, get_engines
+from helpers.seed_helper import seed_database, SEED_PASSWORD
+from main import app
+from services.cache_services import CacheService
+from services.item_services import ItemService
+
+API = "/api/v1"
+SERIALIZE_RESPONSE = routing.serialize_response
+CREATE_ITEMS_DETAIL_RESPONSE = ItemService.create_items_detail_response
+
+
+def checked_out() -> int:
+    """Connections checked out of all pools"""
+    return sum(engine.pool.checkedout() for engine in get_engines().values() if hasattr(engine.pool, "checkedout"))
+
+
+def test_connection_released_before_serialization(database):
+    """Connection is held while the repository runs and returned before the response is serialized"""
+    in_repository = []
+    in_serializer = {}
+
+    async def prepare() -> None:
+        await seed_database(SessionLocal, users=2, items_per_user=2)
+
+    async def create_items_detail_response(item):
+        in_repository.append(checked_out())
+        return await CREATE_ITEMS_DETAIL_RESPONSE(item=item)
+
+    async def serialize_response(**kwargs):
+        response_model = kwargs["field"].name if kwargs.get("field") is not None else ""
+        in_serializer.setdefault(response_model, []).append(checked_out())
+        return await SERIALIZE_RESPONSE(**kwargs)
+
+    with TestClient(app) as client:
+        client.portal.call(prepare)
+        CacheService.clear()
+        response = client.post(f"{API}/users/sign_in", json={"email": "user1@example.com", "password": SEED_PASSWORD})
+        assert response.status_code == 200, response.text
+
+        routing.serialize_response = serialize_response
+        ItemService.create_items_detail_response = staticmethod(create_items_detail_response)
+        try:
+            for path in (f"{API}/users/me/item/1", f"{API}/users/me/items", f"{API}/items/", f"{API}/items/item/3",
+                         f"{API}/users/"):
+                response = client.get(path)
+                assert response.status_code == 200, f"{path}: {response.text}"
+        finally:
+            routing.serialize_response = SERIALIZE_RESPONSE
+            ItemService.create_items_detail_response = staticmethod(CREATE_ITEMS_DETAIL_RESPONSE)
+
+    # Control: the connection is really checked out while the repository builds the response
+    assert in_repository and all(count >= 1 for count in in_repository), in_repository
+    assert sum(len(counts) for counts in in_serializer.values()) == 5, in_serializer
+    assert all(count == 0 for counts in in_serializer.values() for count in counts), in_serializer
@@ -0,0 +1,80 @@
+import logging
+import os
+
+"""
+Engine profile and pool logging check.
+
+Checks:
+- get_engine_profile returns the DB_PROFILE profile with its URL setting resolved
+- DB_* environment overrides are applied with their types, empty values are ignored
+- unknown profiles and pre_ping values are refused with the accepted values listed
+- instrumented pools log like the stock pool: under sqlalchemy.pool, quiet by default
+
+Run with:  pytest -s test_engine_profile.py
+"""
+
+from config import ENGINE_PROFILE_OVERRIDES, Settings, get_engine_profile, settings
+from database.database import InstrumentedQueuePool, get_engines
+
+OVERRIDES = {"DB_POOL_SIZE": "3", "DB_POOL_TIMEOUT": "2.5", "DB_PRE_PING": "never", "DB_SINGLE_WRITER": "1",
+             "DB_MAX_OVERFLOW": ""}
+NO_OVERRIDES = {variable: "" for variable, _ in ENGINE_PROFILE_OVERRIDES.values()}    # Hide overrides of the environment
+
+
+def get_profile(profile: str, **environ) -> dict:
+    """get_engine_profile with given DB_PROFILE and environment variables"""
+    db_profile = settings.DB_PROFILE
+    previous = {variable: os.environ.get(variable) for variable in environ}
+    settings.DB_PROFILE = profile
+    os.environ.update(environ)
+    try:
+        return get_engine_profile()
+    finally:
+        settings.DB_PROFILE = db_profile
+        for variable, value in previous.items():
+            if value is None:
+                os.environ.pop(variable)
+            else:
+                os.environ[variable] = value
+
+
+def test_engine_profile_overrides():
+    """Profile values, resolved URL and typed overrides"""
+    dev = get_profile("dev", **NO_OVERRIDES)
+    assert dev["name"] == "dev" and dev["url"] == settings.DATABASE_URL
+    assert {key: value for key, value in dev.items() if key not in ("name", "url")} == \
+        {key: value for key, value in Settings.ENGINE_PROFILES["dev"].items() if key != "url"}
+
+    overridden = get_profile("prod-pg", **{**NO_OVERRIDES, **OVERRIDES})
+    assert overridden["url"] == settings.DATABASE_URL_POSTGRE
+    assert overridden["pool_size"] == 3 and overridden["pool_timeout"] == 2.5, overridden
+    assert overridden["pre_ping"] == "never" and overridden["single_writer"] is True, overridden
+    # Empty value keeps the profile's one
+    assert overridden["max_overflow"] == Settings.ENGINE_PROFILES["prod-pg"]["max_overflow"], overridden
+
+    # Overrides don't change the profile definitions
+    assert get_profile("prod-pg", **NO_OVERRIDES) == {**Settings.ENGINE_PROFILES["prod-pg"], "name": "prod-pg",
+                                      "url": settings.DATABASE_URL_POSTGRE}
+
+
+def test_engine_profile_errors():
+    """Unknown DB_PROFILE and pre_ping are refused"""
+    for profile, environ, expected in (("prod-mysql", {}, "dev, prod-pg, prod-sqlite"),
+                                       ("dev", {"DB_PRE_PING": "sometimes"}, "always, idle or never")):
+        try:
+            get_profile(profile, **{**NO_OVERRIDES, **environ})
+        except ValueError as error:
+            assert expected in str(error), error
+        else:
+            raise AssertionError(f"{profile} {environ} accepted")
+
+
+def test_pool_logging():
+    """Pool events (dispose, recreate) stay at the stock pool's logger and level"""
+    pools = [engine.pool for engine in get_engines().values() if isinstance(engine.pool, InstrumentedQueuePool)]
+    assert pools
+
+    for pool in pools:
+        assert pool.logger.name == "sqlalchemy.pool.impl.AsyncAdaptedQueuePool", pool.logger.name
+        assert not pool.logger.isEnabledFor(logging.INFO)
+        assert not pool.recreate().logger.isEnabledFor(logging.INFO)
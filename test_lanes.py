@@ -0,0 +1,255 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict
+
+"""
+Priority lanes check and benchmark: item reads during a login storm.
+
+Check (pytest): bcrypt is replaced by a gate, so STORM_CLIENTS sign ins hold the auth lane
+for as long as the check needs. Lane state is compared with its budget, not with the clock:
+- sign ins up to auth slots run, up to auth queue wait, the rest get 503 with Retry-After at once
+- item reads succeed while the auth lane is full
+- once bcrypt finishes, every admitted sign in succeeds: the auth lane serves its
+  slots and queue even during a storm
+- lane metrics (queue wait, rejections, lane state) are exported
+
+Benchmark (only with --benchmark, timings depend on the machine): BENCH_STORM_CLIENTS
+clients call POST /users/sign_in (real bcrypt) in a loop while BENCH_READERS clients read
+GET /items/item/{id}, for BENCH_DURATION seconds, with lanes off and on.
+
+Run with:        pytest -s test_lanes.py
+With benchmark:  pytest -s test_lanes.py --benchmark
+"""
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from config import settings
+from database.database import SessionLocal
+from helpers import metrics_helper, password_helper
+from helpers.seed_helper import seed_database, SEED_PASSWORD
+from main import app
+from services.lane_services import LaneScheduler
+from services.load_shedding_services import ConcurrencyLimiter
+
+VERIFY_PASSWORD = password_helper.verify_password
+
+STORM_CLIENTS = int(os.getenv("BENCH_STORM_CLIENTS", "32"))
+READERS = int(os.getenv("BENCH_READERS", "4"))
+DURATION = float(os.getenv("BENCH_DURATION", "3"))
+API = "/api/v1"
+BACKOFF = 0.2   # Seconds a rejected client waits before its next request
+BCRYPT_BUSY = []    # Seconds of every bcrypt call of the benchmark
+
+TEST_LANES = {
+    "auth": {"slots": 2, "queue": 2, "workers": 1},
+    "writes": {"slots": 4, "queue": 64, "workers": 1},
+    "reads": {"slots": 16, "queue": 128, "workers": 1},
+}
+
+
+async def run_storm() -> Dict[str, Any]:
+    """Login storm with concurrent item reads"""
+    transport = httpx.ASGITransport(app=app)
+    result = {"reads": 0, "read_errors": {}, "read_latencies": [],
+              "sign_ins": 0, "sign_in_errors": {}, "retry_after": set()}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        for _ in range(3):  # Baseline latency of both routes
+            await client.post(f"{API}/users/sign_in", json={"email": "user1@example.com", "password": SEED_PASSWORD})
+            await client.get(f"{API}/items/item/1")
+
+        BCRYPT_BUSY.clear()
+        started = time.perf_counter()
+        deadline = started + DURATION
+
+        async def sign_in(number: int) -> None:
+            while time.perf_counter() < deadline:
+                response = await client.post(f"{API}/users/sign_in",
+                                             json={"email": f"user{number % 5 + 1}@example.com",
+                                                   "password": SEED_PASSWORD})
+                if response.status_code == 200:
+                    result["sign_ins"] += 1
+                    continue
+
+                result["sign_in_errors"][response.status_code] = result["sign_in_errors"].get(response.status_code, 0) + 1
+                result["retry_after"].add(response.headers.get("retry-after"))
+                await asyncio.sleep(BACKOFF)
+
+        async def read(number: int) -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(f"{API}/items/item/{number % 5 + 1}")
+                if response.status_code == 200:
+                    result["reads"] += 1
+                    result["read_latencies"].append(time.perf_counter() - started)
+                else:
+                    result["read_errors"][response.status_code] = result["read_errors"].get(response.status_code, 0) + 1
+                    await asyncio.sleep(BACKOFF)
+
+        await asyncio.gather(*(sign_in(number) for number in range(STORM_CLIENTS)),
+                             *(read(number) for number in range(READERS)))
+        # Requests sent before the deadline finish after it: without lanes, all of them queue for bcrypt
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(result["read_latencies"]) or [0.0]
+    result["read_p95"] = latencies[int(len(latencies) * 0.95)]
+    result["elapsed"] = elapsed
+    result["reads_per_second"] = result["reads"] / elapsed
+    result["sign_ins_per_second"] = result["sign_ins"] / elapsed
+    result["bcrypt_busy"] = sum(BCRYPT_BUSY) / elapsed
+    return result
+
+
+def timed_verify_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password recording its time (run in executor threads)"""
+    started = time.perf_counter()
+    try:
+        return VERIFY_PASSWORD(plain_password, hashed_password)
+    finally:
+        BCRYPT_BUSY.append(time.perf_counter() - started)
+
+
+def reset_limiter() -> None:
+    ConcurrencyLimiter.configure(initial_limit=settings.LOAD_SHED_INITIAL_LIMIT,
+                                 min_limit=settings.LOAD_SHED_MIN_LIMIT,
+                                 max_limit=settings.LOAD_SHED_MAX_LIMIT,
+                                 route_priorities=settings.ROUTE_PRIORITIES,
+                                 retry_after=settings.LOAD_SHED_RETRY_AFTER_SECONDS)
+
+
+async def run_gated_storm(gate: threading.Event) -> Dict[str, Any]:
+    """Sign ins held in bcrypt by gate, item reads while the auth lane is full"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        async def sign_in(number: int) -> httpx.Response:
+            return await client.post(f"{API}/users/sign_in",
+                                     json={"email": f"user{number % 5 + 1}@example.com", "password": SEED_PASSWORD})
+
+        storm = [asyncio.create_task(sign_in(number)) for number in range(STORM_CLIENTS)]
+        auth = LaneScheduler.lanes["auth"]
+        for _ in range(500):    # Until every sign in is running, queued or rejected
+            if sum(task.done() for task in storm) + auth.active + len(auth.waiters) == STORM_CLIENTS:
+                break
+            await asyncio.sleep(0.01)
+        during_storm = LaneScheduler.get_stats()["lanes"]
+
+        reads = [await client.get(f"{API}/items/item/{number % 5 + 1}") for number in range(READERS * 5)]
+
+        gate.set()
+        sign_ins = await asyncio.gather(*storm)
+
+    return {"during_storm": during_storm, "reads": reads, "sign_ins": sign_ins}
+
+
+def test_lanes(database):
+    """Auth lane serves its budget during a login storm, item reads keep running"""
+    async def prepare() -> None:
+        await seed_database(SessionLocal, users=5, items_per_user=1)
+
+    gate = threading.Event()
+    in_bcrypt = []
+
+    def verify_password(plain_password: str, hashed_password: str) -> bool:
+        in_bcrypt.append(threading.current_thread().name)
+        return gate.wait(timeout=30)
+
+    try:
+        with TestClient(app) as client:
+            client.portal.call(prepare)
+            LaneScheduler.configure(lanes=TEST_LANES, queue_timeout=30,
+                                    retry_after=settings.LOAD_SHED_RETRY_AFTER_SECONDS)
+            ConcurrencyLimiter.enabled = False  # Only lanes reject requests
+            password_helper.verify_password = verify_password
+
+            result = client.portal.call(run_gated_storm, gate)
+            stats = LaneScheduler.get_stats()
+            metrics = client.get("/metrics").text
+    finally:
+        password_helper.verify_password = VERIFY_PASSWORD
+        LaneScheduler.configure(lanes=settings.LANES,
+                                queue_timeout=settings.LANE_QUEUE_TIMEOUT_MS / 1000,
+                                retry_after=settings.LOAD_SHED_RETRY_AFTER_SECONDS)
+        LaneScheduler.enabled = settings.LANES_ENABLED
+        ConcurrencyLimiter.enabled = settings.LOAD_SHED_ENABLED
+
+    auth_budget = TEST_LANES["auth"]["slots"] + TEST_LANES["auth"]["queue"]
+    during_storm = result["during_storm"]
+    statuses = [response.status_code for response in result["sign_ins"]]
+    print(f"\nAuth lane during storm of {STORM_CLIENTS} sign ins: {during_storm['auth']}")
+
+    # Storm fills the auth lane only: slots run, queue waits, the rest is rejected at once
+    assert during_storm["auth"]["active"] == TEST_LANES["auth"]["slots"], during_storm
+    assert during_storm["auth"]["queued"] == TEST_LANES["auth"]["queue"], during_storm
+    assert during_storm["auth"]["rejected"] == STORM_CLIENTS - auth_budget, during_storm
+    assert during_storm["reads"]["active"] == during_storm["reads"]["queued"] == 0, during_storm
+
+    # Reads don't wait for the auth lane
+    assert all(response.status_code == 200 for response in result["reads"]), \
+        [(response.status_code, response.text) for response in result["reads"] if response.status_code != 200]
+
+    # Auth lane capacity: every admitted sign in succeeds, in auth lane threads
+    assert statuses.count(200) == auth_budget, statuses
+    assert statuses.count(503) == STORM_CLIENTS - auth_budget, statuses
+    assert all(response.headers["retry-after"] == str(settings.LOAD_SHED_RETRY_AFTER_SECONDS)
+               for response in result["sign_ins"] if response.status_code == 503)
+    assert len(in_bcrypt) == auth_budget and all(name.startswith("lane_auth") for name in in_bcrypt), in_bcrypt
+    assert stats["lanes"]["auth"]["admitted"] == auth_budget and stats["lanes"]["auth"]["timed_out"] == 0, stats
+    assert all(lane["active"] == 0 and lane["queued"] == 0 for lane in stats["lanes"].values()), stats
+
+    # Per-lane metrics
+    assert 'lane_queue_wait_seconds_count{lane="auth"}' in metrics
+    assert 'lane_requests{lane="reads",state="slots"}' in metrics
+    assert metrics_helper.LANE_REJECTED._values, metrics_helper.LANE_REJECTED._values
+
+
+@pytest.mark.benchmark
+def test_lanes_benchmark(database):
+    """Item reads and sign ins per second during a login storm with real bcrypt, lanes off and on"""
+    async def prepare() -> None:
+        await seed_database(SessionLocal, users=5, items_per_user=1)
+
+    try:
+        with TestClient(app) as client:
+            client.portal.call(prepare)
+            LaneScheduler.configure(lanes=settings.LANES,
+                                    queue_timeout=settings.LANE_QUEUE_TIMEOUT_MS / 1000,
+                                    retry_after=settings.LOAD_SHED_RETRY_AFTER_SECONDS)
+            password_helper.verify_password = timed_verify_password
+
+            LaneScheduler.enabled = False
+            reset_limiter()
+            shared = client.portal.call(run_storm)
+
+            LaneScheduler.enabled = True
+            reset_limiter()
+            lanes = client.portal.call(run_storm)
+            stats = LaneScheduler.get_stats()
+    finally:
+        password_helper.verify_password = VERIFY_PASSWORD
+        reset_limiter()
+        LaneScheduler.enabled = settings.LANES_ENABLED
+        ConcurrencyLimiter.enabled = settings.LOAD_SHED_ENABLED
+
+    workers = settings.LANES["auth"]["workers"]
+    print(f"{STORM_CLIENTS} clients signing in, {READERS} clients reading items, {DURATION:.0f} s")
+    for name, result in (("shared", shared), ("lanes", lanes)):
+        print(f"{name:>7}: {result['elapsed']:.1f} s, reads {result['reads_per_second']:6.1f}/s, "
+              f"read p95 {result['read_p95'] * 1000:7.1f} ms, read errors {result['read_errors']}, "
+              f"sign ins {result['sign_ins_per_second']:.1f}/s, sign in errors {result['sign_in_errors']}, "
+              f"bcrypt threads busy {result['bcrypt_busy']:.2f}")
+    print(f"Auth lane: {stats['lanes']['auth']}")
+
+    # Reads keep their capacity
+    assert sum(lanes["read_errors"].values()) < 0.1 * lanes["reads"], lanes["read_errors"]
+    assert lanes["reads_per_second"] > shared["reads_per_second"], (lanes["reads"], shared["reads"])
+
+    # Auth lane keeps its bcrypt threads busy, so sign ins keep their rate; on fewer
+    # cores than threads, reads and bcrypt share the CPU and each call takes longer
+    assert lanes["bcrypt_busy"] > 0.8 * workers, (lanes["bcrypt_busy"], workers)
+    assert lanes["sign_ins_per_second"] > 0.5 * shared["sign_ins_per_second"], \
+        (lanes["sign_ins_per_second"], shared["sign_ins_per_second"])
+
@@ -0,0 +1,191 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict
+
+"""
+Load shedding check and benchmark.
+
+Adds two routes sharing a resource of CAPACITY slots, WORK seconds per request
+(stand-in for pool connections), one of high and one of low priority.
+CLIENTS concurrent clients call them for DURATION seconds, first with load shedding
+off, then on. Goodput counts responses answered within SLO_SECONDS.
+
+Checks with load shedding on:
+- goodput holds near capacity, and is higher than without shedding (everyone queues)
+- rejected requests get 503 with Retry-After at once
+- low priority requests are shed more than high priority ones, probes never
+- shed responses carry CORS headers and CORS preflights are never shed
+
+Run with:  pytest -s test_load_shedding.py
+"""
+
+import httpx
+from fastapi.testclient import TestClient
+
+from config import settings
+from main import app
+from services.load_shedding_services import ConcurrencyLimiter
+
+CAPACITY = 4
+WORK = 0.1
+CLIENTS = int(os.getenv("BENCH_CLIENTS", "48"))
+DURATION = float(os.getenv("BENCH_DURATION", "3"))
+SLO_SECONDS = 5 * WORK
+CAPACITY_RATE = CAPACITY / WORK     # Requests per second the resource can serve
+BACKOFF = 0.2   # Seconds a rejected client waits before its next request
+
+ROUTE_PRIORITIES = {**settings.ROUTE_PRIORITIES, "GET /test/capacity": "high", "GET /test/capacity_low": "low"}
+
+_slots = None
+
+
+async def use_capacity() -> dict:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(CAPACITY)
+    async with _slots:
+        await asyncio.sleep(WORK)
+    return {"done": True}
+
+
+@app.get("/test/capacity")
+async def capacity_high():
+    return await use_capacity()
+
+
+@app.get("/test/capacity_low")
+async def capacity_low():
+    return await use_capacity()
+
+
+async def run_load() -> Dict[str, Any]:
+    """CLIENTS clients calling both routes for DURATION seconds; a probe is sent meanwhile"""
+    transport = httpx.ASGITransport(app=app)
+    result = {"good": 0, "slow": 0, "latencies": [],
+              "shed": {"high": 0, "low": 0}, "sent": {"high": 0, "low": 0},
+              "shed_latencies": [], "retry_after": set(), "probes": []}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        for _ in range(5):  # Baseline latency of unloaded routes
+            await client.get("/test/capacity")
+            await client.get("/test/capacity_low")
+
+        deadline = time.perf_counter() + DURATION
+
+        async def worker(number: int) -> None:
+            priority = "high" if number % 2 else "low"
+            path = "/test/capacity" if priority == "high" else "/test/capacity_low"
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(path)
+                elapsed = time.perf_counter() - started
+                result["sent"][priority] += 1
+
+                if response.status_code == 503:
+                    result["shed"][priority] += 1
+                    result["shed_latencies"].append(elapsed)
+                    result["retry_after"].add(response.headers.get("retry-after"))
+                    await asyncio.sleep(BACKOFF)
+                    continue
+
+                assert response.status_code == 200, response.text
+                result["latencies"].append(elapsed)
+                if elapsed <= SLO_SECONDS:
+                    result["good"] += 1
+                else:
+                    result["slow"] += 1
+
+        async def probe() -> None:
+            await asyncio.sleep(DURATION / 2)
+            result["probes"].append((await client.get("/health")).status_code)
+
+        await asyncio.gather(probe(), *(worker(number) for number in range(CLIENTS)))
+
+    result["goodput"] = result["good"] / DURATION
+    result["latencies"].sort()
+    result["p50"] = result["latencies"][len(result["latencies"]) // 2] if result["latencies"] else 0.0
+    result["shed_latencies"].sort()
+    result["shed_p99"] = (result["shed_latencies"][int(len(result["shed_latencies"]) * 0.99)]
+                          if result["shed_latencies"] else 0.0)
+    return result
+
+
+def configure_limiter() -> None:
+    ConcurrencyLimiter.configure(initial_limit=settings.LOAD_SHED_INITIAL_LIMIT,
+                                 min_limit=settings.LOAD_SHED_MIN_LIMIT,
+                                 max_limit=settings.LOAD_SHED_MAX_LIMIT,
+                                 route_priorities=ROUTE_PRIORITIES,
+                                 retry_after=settings.LOAD_SHED_RETRY_AFTER_SECONDS)
+
+
+def test_load_shedding(database):
+    """Goodput holds at capacity with shedding, low priority requests are shed first"""
+    try:
+        with TestClient(app) as client:
+            configure_limiter()
+            ConcurrencyLimiter.enabled = False
+            unlimited = client.portal.call(run_load)
+
+            configure_limiter()
+            limited = client.portal.call(run_load)
+            stats = ConcurrencyLimiter.get_stats()
+    finally:
+        configure_limiter()
+        ConcurrencyLimiter.route_priorities = dict(settings.ROUTE_PRIORITIES)
+        ConcurrencyLimiter.enabled = settings.LOAD_SHED_ENABLED
+
+    print(f"\n{CLIENTS} clients, capacity {CAPACITY_RATE:.0f} req/s, SLO {SLO_SECONDS * 1000:.0f} ms")
+    for name, result in (("no shedding", unlimited), ("shedding", limited)):
+        shed = sum(result["shed"].values())
+        print(f"{name:>12}: goodput {result['goodput']:6.1f} req/s, p50 {result['p50'] * 1000:6.1f} ms, "
+              f"shed {shed} (high {result['shed']['high']}, low {result['shed']['low']}), "
+              f"shed p99 {result['shed_p99'] * 1000:.1f} ms")
+    print(f"Limit after load: {stats['limit']}")
+
+    assert sum(unlimited["shed"].values()) == 0, unlimited["shed"]
+
+    # Goodput holds near capacity instead of collapsing
+    assert limited["goodput"] >= 0.5 * CAPACITY_RATE, limited["goodput"]
+    assert limited["goodput"] > 2 * unlimited["goodput"], (limited["goodput"], unlimited["goodput"])
+    assert limited["p50"] <= SLO_SECONDS, limited["p50"]
+
+    # Fast rejections with Retry-After
+    assert sum(limited["shed"].values()) > 0, limited["shed"]
+    assert limited["retry_after"] == {str(settings.LOAD_SHED_RETRY_AFTER_SECONDS)}, limited["retry_after"]
+    assert limited["shed_p99"] < WORK, limited["shed_p99"]
+
+    # Priorities: low is shed more, probes never
+    low_share = limited["shed"]["low"] / limited["sent"]["low"]
+    high_share = limited["shed"]["high"] / limited["sent"]["high"]
+    assert low_share > high_share, (low_share, high_share)
+    assert limited["probes"] == [200], limited["probes"]
+    assert settings.LOAD_SHED_MIN_LIMIT <= stats["limit"] < settings.LOAD_SHED_INITIAL_LIMIT, stats
+
+
+def test_shed_requests_keep_cors(database):
+    """CORS runs before load shedding: shed responses carry CORS headers, preflights are never shed"""
+    origin = "http://localhost:5173"
+    try:
+        with TestClient(app) as client:
+            configure_limiter()
+            ConcurrencyLimiter.in_flight = 10 ** 6    # Every request but probes is over the limit
+            shed_before = sum(ConcurrencyLimiter.shed.values())
+
+            shed = client.get("/test/capacity_low", headers={"Origin": origin})
+            preflight = client.options("/test/capacity_low",
+                                       headers={"Origin": origin, "Access-Control-Request-Method": "GET"})
+            shed_count = sum(ConcurrencyLimiter.shed.values()) - shed_before
+    finally:
+        ConcurrencyLimiter.in_flight = 0
+        configure_limiter()
+        ConcurrencyLimiter.route_priorities = dict(settings.ROUTE_PRIORITIES)
+        ConcurrencyLimiter.enabled = settings.LOAD_SHED_ENABLED
+
+    assert shed.status_code == 503, shed.text
+    assert shed.headers["access-control-allow-origin"] == origin, shed.headers
+    assert shed.headers["retry-after"] == str(settings.LOAD_SHED_RETRY_AFTER_SECONDS), shed.headers
+
+    assert preflight.status_code == 200, preflight.text
+    assert preflight.headers["access-control-allow-origin"] == origin, preflight.headers
+    assert shed_count == 1, shed_count     # Only the GET
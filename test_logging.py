@@ -0,0 +1,109 @@
+import contextvars
+import io
+import json
+import logging
+import queue
+import sys
+
+"""
+Structured logging pipeline check.
+
+Checks:
+- SamplingFilter keeps 1 of every round(1 / sample_rate) records per logger and message
+  and marks kept records with "sampled"
+- ContextQueueHandler only enqueues: records are not formatted in the calling thread,
+  trace id of the current request is attached
+- setup_logging writes JSON lines from the background thread, stop_logging
+  gives the root logger its handlers back
+- importing the application doesn't touch logging, its startup does
+
+Run with:  pytest -s test_logging.py
+"""
+
+from fastapi.testclient import TestClient
+
+from helpers import logging_helper, tracing_helper
+from main import app
+
+
+def make_record(message: str = "Token has expired", name: str = "helpers.token_helper", **extra) -> logging.LogRecord:
+    record = logging.LogRecord(name, logging.INFO, __file__, 1, message, (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_filter():
+    """Sampled records are thinned per logger and message, others always pass"""
+    sampling = logging_helper.SamplingFilter()
+
+    kept = [record for record in (make_record(sample_rate=0.1) for _ in range(100)) if sampling.filter(record)]
+    assert len(kept) == 10, len(kept)
+    assert all(record.sampled == 10 for record in kept)
+
+    # Every logger and message has its own counter: the first record of each is kept
+    assert sampling.filter(make_record(message="Other message", sample_rate=0.1))
+    assert sampling.filter(make_record(name="helpers.user_helper", sample_rate=0.1))
+
+    assert all(sampling.filter(make_record()) for _ in range(10))
+    assert sampling.filter(make_record(sample_rate=1))
+    assert not any(sampling.filter(make_record(message="Dropped", sample_rate=0)) for _ in range(10))
+    assert not hasattr(make_record(), "sampled")
+
+
+def test_context_queue_handler():
+    """Records are enqueued as they are, with trace id of current request"""
+    log_queue = queue.SimpleQueue()
+    handler = logging_helper.ContextQueueHandler(log_queue)
+    args = {"user_id": 5}
+
+    def emit_traced() -> str:
+        root = tracing_helper.start_trace("GET /api/v1/users/me/")
+        handler.handle(logging.LogRecord("test", logging.INFO, __file__, 1, "User %(user_id)s", (args,), None))
+        return root.trace_id
+
+    trace_id = contextvars.copy_context().run(emit_traced)
+    handler.handle(make_record())
+
+    traced, untraced = log_queue.get_nowait(), log_queue.get_nowait()
+    assert traced.trace_id == trace_id and untraced.trace_id is None
+    # Not formatted in the calling thread: message and arguments are left for the writer thread
+    assert traced.msg == "User %(user_id)s" and traced.args == args and not hasattr(traced, "message")
+    assert traced.getMessage() == "User 5"
+
+
+def test_setup_logging():
+    """JSON lines are written by background thread, root logger is restored on stop"""
+    root = logging.getLogger()
+    handlers, level = root.handlers, root.level
+    stderr = sys.stderr
+    sys.stderr = output = io.StringIO()
+    try:
+        logging_helper.setup_logging(level="INFO", log_format="json", levels="test_logging.quiet=ERROR")
+        assert isinstance(root.handlers[0], logging_helper.ContextQueueHandler) and len(root.handlers) == 1
+
+        logging.getLogger("test_logging").info("Item %s created", 7, extra={"item_id": 7})
+        logging.getLogger("test_logging").debug("Below root level")
+        logging.getLogger("test_logging.quiet").warning("Below logger level")
+        logging_helper.stop_logging()
+    finally:
+        sys.stderr = stderr
+        logging_helper.stop_logging()
+        logging.getLogger("test_logging.quiet").setLevel(logging.NOTSET)
+
+    assert root.handlers == handlers and root.level == level
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(lines) == 1, lines
+    assert lines[0]["logger"] == "test_logging" and lines[0]["level"] == "INFO", lines
+    assert lines[0]["message"] == "Item 7 created" and lines[0]["item_id"] == 7, lines
+
+
+def test_logging_configured_on_startup(database):
+    """Import leaves root logger alone, startup configures it and shutdown restores it"""
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    assert not any(isinstance(handler, logging_helper.ContextQueueHandler) for handler in handlers)
+
+    with TestClient(app):
+        assert isinstance(root.handlers[0], logging_helper.ContextQueueHandler), root.handlers
+
+    assert root.handlers == handlers
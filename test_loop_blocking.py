@@ -0,0 +1,75 @@
+import os
+import time
+
+"""
+Event loop blocking check.
+
+Runs main user and item flows against a SQLite database in strict watchdog mode:
+fails if any request blocks the event loop longer than LOOP_BLOCK_LIMIT_MS
+(sync bcrypt, blocking I/O, heavy CPU work inside coroutines...).
+Failure message contains stack of the blocking code.
+
+Run with:  pytest -s test_loop_blocking.py
+"""
+
+from fastapi.testclient import TestClient
+
+from helpers.loop_watchdog_helper import LoopWatchdog, LoopBlockedError
+
+LOOP_BLOCK_LIMIT_MS = float(os.getenv("LOOP_BLOCK_LIMIT_MS", "50"))
+
+API_PREFIX = "/api/v1"
+
+USER = {"name": "loop_user", "email": "loop_user@example.com", "password": "password", "bio": "Loop blocking check"}
+
+FLOW = [
+    ("POST", "/users/sign_up", USER),
+    ("POST", "/users/sign_in", {"email": USER["email"], "password": USER["password"]}),
+    ("GET", "/users/me/", None),
+    ("POST", "/items/create_item", {"name": "loop_item", "description": "Loop blocking item"}),
+    ("GET", "/items/", None),
+    ("GET", "/items/item/1", None),
+    ("PATCH", "/items/update_item/1", {"name": "loop_item_renamed"}),
+    ("GET", "/users/", None),
+    ("GET", "/users/me/items", None),
+    ("PATCH", "/users/me/update", {"bio": "Updated biography"}),
+    ("DELETE", "/items/delete_item/1", None),
+    ("POST", "/users/logout", None),
+]
+"""
+Requests sent in order, as one client (sign_in cookie is reused).
+Structure: (method, path without API prefix, json body or None)
+"""
+
+
+def check_watchdog_detects_blocking(client: TestClient) -> None:
+    """Strict mode catches blocking call on event loop (self-check of the test itself)"""
+    try:
+        with LoopWatchdog.strict(max_ms=LOOP_BLOCK_LIMIT_MS):
+            # Sync function passed to portal runs on event loop thread
+            client.portal.call(time.sleep, LOOP_BLOCK_LIMIT_MS * 3 / 1000)
+    except LoopBlockedError:
+        return
+
+    raise AssertionError("Watchdog didn't detect blocked event loop")
+
+
+async def restart_watchdog() -> None:
+    """Record stalls down to LOOP_BLOCK_LIMIT_MS (strict mode sees only stalls over watchdog threshold)"""
+    LoopWatchdog.stop()
+    LoopWatchdog.start(threshold=LOOP_BLOCK_LIMIT_MS / 1000)
+
+
+def test_requests_dont_block_loop(database):
+    """No request of the main flow blocks event loop longer than LOOP_BLOCK_LIMIT_MS"""
+    from main import app
+
+    with TestClient(app) as client:
+        client.portal.call(restart_watchdog)
+        check_watchdog_detects_blocking(client)
+
+        for method, path, body in FLOW:
+            with LoopWatchdog.strict(max_ms=LOOP_BLOCK_LIMIT_MS):
+                response = client.request(method, API_PREFIX + path, json=body)
+
+            assert response.status_code < 500, f"{method} {path} failed: {response.status_code}"
@@ -0,0 +1,103 @@
+import asyncio
+import gc
+import tracemalloc
+from typing import Dict
+
+"""
+Memory benchmark of list endpoints.
+
+Seeds SQLite database, calls every route from MEMORY_BUDGETS with cold cache
+and measures peak memory allocated during the request with tracemalloc
+(ORM objects, pydantic models and JSON are alive at the same time).
+Fails if peak bytes per returned row is over its budget.
+
+Run with:  pytest -s test_memory_budget.py
+"""
+
+from fastapi.testclient import TestClient
+
+from database.database import engine, SessionLocal
+from helpers.seed_helper import seed_database
+from services.cache_services import CacheService
+
+SEED_USERS = 200
+SEED_ITEMS_PER_USER = 5
+API_PREFIX = "/api/v1"
+
+MEMORY_BUDGETS = {
+    "/items/": 4 * 1024,
+    "/users/": 28 * 1024,     # Every user row carries its items (5 per seeded user)
+}
+"""
+Max peak bytes allocated per returned row ("data" list item) for one cold-cache request.
+Lower the budget when a route gets cheaper, never raise it without a reason.
+"""
+
+
+async def prepare_database() -> None:
+    """Seed users with items (tables are created by the database fixture)"""
+    await seed_database(SessionLocal, users=SEED_USERS, items_per_user=SEED_ITEMS_PER_USER)
+
+    # Connections belong to this event loop, TestClient runs its own
+    await engine.dispose()
+
+
+def measure_routes() -> Dict[str, Dict]:
+    """
+    Call every route from MEMORY_BUDGETS and measure its peak memory.
+
+    :return: Dictionary path -> {"rows", "peak_bytes", "bytes_per_row", "budget"}
+    """
+    asyncio.run(prepare_database())
+
+    results = {}
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        from main import app
+
+        with TestClient(app) as client:
+            for path, budget in MEMORY_BUDGETS.items():
+                client.get(API_PREFIX + path)     # First call imports and compiles everything lazily created
+
+                CacheService.clear()    # Budgets are for cold cache
+                gc.collect()    # Garbage of earlier checks, finalized during the request, would count in its peak
+                tracemalloc.reset_peak()
+                started_memory = tracemalloc.get_traced_memory()[0]
+
+                response = client.get(API_PREFIX + path)
+
+                peak = tracemalloc.get_traced_memory()[1] - started_memory
+                assert response.status_code == 200, f"{path} failed: {response.status_code}"
+
+                rows = len(response.json()["data"])
+                results[path] = {
+                    "rows": rows,
+                    "peak_bytes": peak,
+                    "bytes_per_row": peak // max(rows, 1),
+                    "budget": budget,
+                }
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    return results
+
+
+def print_report(results: Dict[str, Dict]) -> None:
+    for path, result in results.items():
+        mark = "OK  " if result["bytes_per_row"] <= result["budget"] else "OVER"
+        print(f"{mark} GET {path}: {result['rows']} rows, peak {result['peak_bytes'] / 1024:.0f} KiB, "
+              f"{result['bytes_per_row']}/{result['budget']} bytes per row")
+
+
+def test_memory_budgets(database):
+    """Every list route stays within its peak memory per row budget"""
+    results = measure_routes()
+    print_report(results)
+
+    over_budget = {path: f"{result['bytes_per_row']} > {result['budget']} bytes per row"
+                   for path, result in results.items()
+                   if result["bytes_per_row"] > result["budget"]}
+    assert not over_budget, f"Routes over memory budget: {over_budget}"
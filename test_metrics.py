@@ -0,0 +1,103 @@
+import re
+
+"""
+Prometheus /metrics scrape check.
+
+Runs real requests and scrapes /metrics like Prometheus, checks that:
+- every metric is declared once (# HELP / # TYPE), even if metrics are installed again
+- request counters and latency histograms carry method, route template and status labels
+- pool and cache metrics collected on scrape are present, every pool once
+- with METRICS_TOKEN set, scrapes need "Authorization: Bearer <token>"
+
+Run with:  pytest -s test_metrics.py
+"""
+
+from fastapi.testclient import TestClient
+
+from config import settings
+from database.database import SessionLocal, get_engines
+from helpers import metrics_helper
+from helpers.seed_helper import seed_database
+from main import app
+
+API = "/api/v1"
+METRICS_TOKEN = "metrics-check"
+SAMPLE = re.compile(r'^([a-z_]+)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-z_]+)="((?:[^"\\]|\\.)*)"')
+
+
+def scrape(response) -> dict:
+    """Parse Prometheus text format into {"types": {name: type}, "samples": [(name, labels, value)]}"""
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4"), response.headers
+
+    types, samples = {}, []
+    for line in response.text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, type_name = line.split(" ")
+            assert name not in types, f"{name} declared twice"
+            types[name] = type_name
+        elif line and not line.startswith("#"):
+            match = SAMPLE.match(line)
+            assert match, line
+            name, labels, value = match.groups()
+            samples.append((name, dict(LABEL.findall(labels or "")), float(value)))
+
+    return {"types": types, "samples": samples}
+
+
+def find(metrics: dict, name: str, **labels) -> list:
+    """Samples of metric name having all given labels"""
+    return [(sample_labels, value) for sample_name, sample_labels, value in metrics["samples"]
+            if sample_name == name and labels.items() <= sample_labels.items()]
+
+
+def test_metrics_scrape(database):
+    """Metric names, types and labels of a scrape after real requests"""
+    async def prepare() -> None:
+        await seed_database(SessionLocal, users=2, items_per_user=1)
+
+    metrics_helper.install(get_engines())     # Installed again: nothing is registered twice
+
+    with TestClient(app) as client:
+        client.portal.call(prepare)
+        assert client.get(f"{API}/items/").status_code == 200
+        assert client.get(f"{API}/items/item/999").status_code == 404
+        metrics = scrape(client.get("/metrics"))
+
+    types = metrics["types"]
+    assert types["http_requests_total"] == "counter", types
+    assert types["http_request_duration_seconds"] == "histogram", types
+    assert types["db_pool_connections"] == "gauge" and types["cache_reads_total"] == "counter", types
+
+    # Route template, not the raw path, so label cardinality stays bounded
+    assert find(metrics, "http_requests_total", method="GET", route=f"{API}/items/", status="200"), metrics
+    assert find(metrics, "http_requests_total", method="GET", route=f"{API}/items/item/{{item_id}}", status="404")
+    assert not find(metrics, "http_requests_total", route=f"{API}/items/item/999")
+
+    buckets = find(metrics, "http_request_duration_seconds_bucket", method="GET", route=f"{API}/items/")
+    assert buckets and {labels["le"] for labels, _ in buckets} >= {"0.005", "+Inf"}, buckets
+    assert find(metrics, "http_request_duration_seconds_count", method="GET", route=f"{API}/items/")[0][1] >= 1
+
+    pools = {labels["pool"] for labels, _ in find(metrics, "db_pool_connections")}
+    assert pools and {labels["state"] for labels, _ in find(metrics, "db_pool_connections")} >= \
+        {"size", "checked_out"}, metrics
+    assert len(find(metrics, "db_pool_connections", state="size")) == len(pools), "pool collected twice"
+    assert {labels["result"] for labels, _ in find(metrics, "cache_reads_total")} == {"hit", "miss"}
+
+
+def test_metrics_token(database):
+    """With METRICS_TOKEN, scrapes without the bearer token are refused"""
+    metrics_token = settings.METRICS_TOKEN
+    settings.METRICS_TOKEN = METRICS_TOKEN
+    try:
+        with TestClient(app) as client:
+            anonymous = client.get("/metrics")
+            wrong = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+            allowed = client.get("/metrics", headers={"Authorization": f"Bearer {METRICS_TOKEN}"})
+    finally:
+        settings.METRICS_TOKEN = metrics_token
+
+    assert anonymous.status_code == 401 and anonymous.headers["www-authenticate"] == "Bearer", anonymous.text
+    assert wrong.status_code == 401, wrong.text
+    assert "http_requests_total" in scrape(allowed)["types"]
@@ -0,0 +1,290 @@
+import asyncio
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+"""
+Query budget check for every route of user_router and item_router.
+
+Runs each route against a seeded SQLite database, counts SQL statements
+it emits and fails if a route goes over its budget from QUERY_BUDGETS.
+Repeated statements in one request are reported:
+- relationships loaded more than once (ORM relationship load events, e.g. selectin
+  loads of User.item run once per parent instead of once per parent query) as N+1 patterns
+- other repeated statements as duplicate queries
+
+Run with:  pytest -s test_query_budget.py
+"""
+
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from database import models
+from database.database import engine, SessionLocal, get_engines
+from helpers.seed_helper import seed_database, SEED_PASSWORD
+from routes.item_router import item_router
+from routes.user_router import user_router
+from services.cache_services import CacheService
+
+SEED_USERS = 5
+SEED_ITEMS_PER_USER = 3
+API_PREFIX = "/api/v1"
+
+QUERY_BUDGETS = {
+    "POST /users/sign_up": {
+        "budget": 5,
+        "json": {"name": "new_user", "email": "new_user@example.com", "password": "password", "bio": "Budget check user"}
+    },
+    "POST /users/sign_in": {
+        "budget": 2,
+        "json": {"email": "user1@example.com", "password": SEED_PASSWORD}
+    },
+    "POST /users/logout": {
+        "budget": 0
+    },
+    "GET /users/": {
+        "budget": 2
+    },
+    "GET /users/available": {
+        "budget": 3,    # Filters are not loaded without warm-up, both values are checked in DB
+        "path": "/users/available?name=user1&email=free@example.com"
+    },
+    "GET /users/user/{user_id}": {
+        "budget": 2,
+        "path": "/users/user/1"
+    },
+    "GET /users/me/": {
+        "budget": 2,
+        "auth": True
+    },
+    "PATCH /users/me/update": {
+        "budget": 5,
+        "auth": True,
+        "json": {"bio": "Updated biography"}
+    },
+    "GET /users/me/items": {
+        "budget": 4,
+        "auth": True
+    },
+    "GET /users/me/item/{item_id}": {
+        "budget": 4,
+        "auth": True,
+        "path": "/users/me/item/1"
+    },
+    "GET /items/": {
+        "budget": 2
+    },
+    "GET /items/item/{item_id}": {
+        "budget": 2,
+        "path": "/items/item/1"
+    },
+    "POST /items/create_item": {
+        "budget": 4,
+        "auth": True,
+        "json": {"name": "new_item", "description": "Budget check item"}
+    },
+    "PATCH /items/update_item/{item_id}": {
+        "budget": 5,
+        "auth": True,
+        "path": "/items/update_item/1",
+        "json": {"name": "renamed_item"}
+    },
+    "DELETE /items/delete_item/{item_id}": {
+        "budget": 3,
+        "auth": True,
+        "path": "/items/delete_item/2"
+    },
+}
+
+"""
+Budget of every route: max number of SQL statements for one cold-cache request.
+
+Structure:
+    "METHOD /path/template": {
+        "budget": N,        # Max statements (authentication queries included)
+        "auth": True,       # Send request as signed in user1 (optional)
+        "path": "...",      # Concrete path if template has parameters (optional)
+        "json": {...}       # Request body (optional)
+    }
+
+Every route of user_router and item_router MUST be listed here.
+Lower the budget when a route gets cheaper, never raise it without a reason.
+"""
+
+
+def get_router_routes() -> List[str]:
+    """Get "METHOD /path" of every route in user_router and item_router"""
+    routes = []
+    for router in (user_router, item_router):
+        for route in router.routes:
+            if isinstance(route, APIRoute):
+                for method in sorted(route.methods):
+                    routes.append(f"{method} {route.path}")
+
+    return routes
+
+
+def normalize_statement(statement: str) -> str:
+    """Statement shape: same SQL with different parameters is one shape"""
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+def find_repeated_statements(statements: List[Tuple[str, Optional[str]]]) -> List[str]:
+    """
+    Find relationships loaded and statements executed more than once in one request.
+
+    Relationship loads are grouped by relationship, not by SQL: a selectin load
+    has as many placeholders as parents, so its SQL differs between loads, while
+    a per-parent load ("WHERE item.user_id = ?") is the same every time.
+
+    :param statements: Executed statements with relationship they load (None for other statements)
+    :return: Human readable reports
+    """
+    reports = []
+    loads = Counter(relationship for _, relationship in statements if relationship is not None)
+    for relationship, count in loads.items():
+        if count > 1:
+            example = next(statement for statement, loaded in statements if loaded == relationship)
+            reports.append(f"N+1 relationship load of {relationship} x{count}: {normalize_statement(example)[:160]}")
+
+    queries = Counter(normalize_statement(statement) for statement, relationship in statements if relationship is None)
+    for statement, count in queries.items():
+        if count > 1:
+            reports.append(f"duplicate query x{count}: {statement[:160]}")
+
+    return reports
+
+
+@contextmanager
+def record_statements() -> Iterator[List[Tuple[str, Optional[str]]]]:
+    """
+    Record statements of every engine (writes and read-only sessions).
+
+    :return: List filled with (statement, relationship it loads or None)
+    """
+    statements: List[Tuple[str, Optional[str]]] = []
+    loading: List[Optional[str]] = [None]   # Relationship of ORM statement about to run
+
+    def note_relationship_load(state: ORMExecuteState) -> None:
+        # Path of a relationship load ends with the relationship, e.g. "User.item"
+        loading[0] = str(state.loader_strategy_path.path[-1]) if state.is_relationship_load else None
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, loading[0]))
+        loading[0] = None
+
+    event.listen(Session, "do_orm_execute", note_relationship_load)
+    for counted_engine in get_engines().values():
+        event.listen(counted_engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(Session, "do_orm_execute", note_relationship_load)
+        for counted_engine in get_engines().values():
+            event.remove(counted_engine.sync_engine, "before_cursor_execute", count_statement)
+
+
+async def prepare_database() -> None:
+    """Seed users with items (tables are created by the database fixture)"""
+    await seed_database(SessionLocal, users=SEED_USERS, items_per_user=SEED_ITEMS_PER_USER)
+
+    # Connections belong to this event loop, TestClient runs its own
+    await engine.dispose()
+
+
+def check_query_budgets() -> Dict[str, Dict]:
+    """
+    Run every route and compare number of statements with its budget.
+
+    :return: Dictionary route -> {"queries", "budget", "repeated", "status_code"}
+    :raises AssertionError: If a route has no budget
+    """
+    routes = get_router_routes()
+    missing = [route for route in routes if route not in QUERY_BUDGETS]
+    assert not missing, f"Routes without query budget in QUERY_BUDGETS: {missing}"
+
+    asyncio.run(prepare_database())
+
+    from main import app
+
+    results = {}
+    with record_statements() as statements, TestClient(app) as client:
+        sign_in = client.post(f"{API_PREFIX}/users/sign_in",
+                              json={"email": "user1@example.com", "password": SEED_PASSWORD})
+        token = sign_in.json()["data"]["user_access_token"]
+
+        for route in routes:
+            spec = QUERY_BUDGETS[route]
+            method, template = route.split(" ", 1)
+            headers = {"Authorization": f"Bearer {token}"} if spec.get("auth") else {}
+
+            CacheService.clear()    # Budgets are for cold cache
+            client.cookies.clear()  # Authentication only through "auth"
+            statements.clear()
+
+            response = client.request(method,
+                                      API_PREFIX + spec.get("path", template),
+                                      json=spec.get("json"),
+                                      headers=headers)
+
+            results[route] = {
+                "queries": len(statements),
+                "budget": spec["budget"],
+                "repeated": find_repeated_statements(statements),
+                "status_code": response.status_code,
+            }
+
+    return results
+
+
+def print_report(results: Dict[str, Dict]) -> None:
+    for route, result in results.items():
+        mark = "OK  " if result["queries"] <= result["budget"] else "OVER"
+        print(f"{mark} {route}: {result['queries']}/{result['budget']} queries (HTTP {result['status_code']})")
+        for report in result["repeated"]:
+            print(f"       {report}")
+
+
+def test_query_budgets(database):
+    """Every route stays within its query budget and answers without server error"""
+    results = check_query_budgets()
+    print_report(results)
+
+    failed_requests = {route: result["status_code"] for route, result in results.items()
+                       if result["status_code"] >= 500}
+    assert not failed_requests, f"Routes failed: {failed_requests}"
+
+    over_budget = {route: f"{result['queries']} > {result['budget']}; " + "; ".join(result["repeated"])
+                   for route, result in results.items()
+                   if result["queries"] > result["budget"]}
+    assert not over_budget, f"Routes over query budget: {over_budget}"
+
+
+def test_n_plus_one_report(database):
+    """Per-parent relationship loads are reported as N+1, one selectin load per query is not"""
+    async def load_users() -> Tuple[List[str], List[str]]:
+        await prepare_database()
+        try:
+            with record_statements() as statements:
+                async with SessionLocal() as db:
+                    await db.execute(select(models.User))     # One query, one selectin load of items
+                    batched = find_repeated_statements(statements)
+
+                    statements.clear()
+                    db.expunge_all()
+                    for user_id in range(1, SEED_USERS + 1):  # Items loaded once per user
+                        await db.get(models.User, user_id)
+                    per_user = find_repeated_statements(statements)
+        finally:
+            await engine.dispose()
+        return batched, per_user
+
+    batched, per_user = asyncio.run(load_users())
+
+    assert batched == [], batched
+    assert any(report.startswith(f"N+1 relationship load of User.item x{SEED_USERS}") for report in per_user), per_user
+    assert not any(report.startswith("duplicate query") and "item" in report for report in per_user), per_user
+
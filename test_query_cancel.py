@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+"""
+Statement timeout and client disconnect cancellation check.
+
+Adds two routes running one slow SQLite statement (recursive CTE, ~10 s uncancelled):
+- with a route statement timeout of TIMEOUT_MS: must answer 503 right after the timeout
+- without timeout, called directly through ASGI with a client that disconnects
+  after DISCONNECT_AFTER seconds: request must end right after the disconnect
+
+Checks that aborted statements are counted in db_queries_cancelled_total and
+that every pool connection is back in the pool afterwards.
+
+Run with:  pytest -s test_query_cancel.py
+"""
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database.database import get_engines, get_read_db
+from helpers import metrics_helper, query_cancel_helper
+from main import app
+
+TIMEOUT_MS = 200
+DISCONNECT_AFTER = 0.3
+MAX_CANCEL_SECONDS = 2.0    # The statement itself runs ~10 s
+SLOW_STATEMENT = text("WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter LIMIT 20000000) "
+                      "SELECT count(*) FROM counter")
+
+
+@app.get("/test/slow_query")
+async def slow_query(db: AsyncSession = Depends(get_read_db)):
+    return {"count": await db.scalar(SLOW_STATEMENT)}
+
+
+@app.get("/test/slow_query_untimed")
+async def slow_query_untimed(db: AsyncSession = Depends(get_read_db)):
+    return {"count": await db.scalar(SLOW_STATEMENT)}
+
+
+def cancelled_count(reason: str) -> float:
+    return metrics_helper.QUERIES_CANCELLED._values.get((reason,), 0)
+
+
+async def disconnecting_request(path: str) -> dict:
+    """Call app through ASGI as a client that disconnects after DISCONNECT_AFTER seconds"""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+             "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 1), "server": ("testserver", 80)}
+    received = 0
+    sent = []
+
+    async def receive():
+        nonlocal received
+        received += 1
+        if received == 1:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(DISCONNECT_AFTER)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return {"seconds": time.perf_counter() - started,
+            "status": next((message["status"] for message in sent if message["type"] == "http.response.start"), None)}
+
+
+def checked_out_connections() -> int:
+    return sum(db_engine.pool.checkedout() for db_engine in get_engines().values())
+
+
+def test_query_cancel(database):
+    """Slow statements end at route timeout or client disconnect, connections return to pool"""
+    query_cancel_helper.install(get_engines().values(),
+                                route_timeouts_ms={**settings.ROUTE_STATEMENT_TIMEOUTS_MS,
+                                                   "GET /test/slow_query": TIMEOUT_MS},
+                                default_timeout_ms=0)
+    try:
+        with TestClient(app) as client:
+            timeouts = cancelled_count("timeout")
+            started = time.perf_counter()
+            response = client.get("/test/slow_query")
+            elapsed = time.perf_counter() - started
+
+            print(f"\nTimed out statement: {response.status_code} after {elapsed * 1000:.0f} ms")
+            assert response.status_code == 503, response.text
+            assert TIMEOUT_MS / 1000 <= elapsed < MAX_CANCEL_SECONDS, elapsed
+            assert cancelled_count("timeout") == timeouts + 1
+            assert checked_out_connections() == 0
+
+            disconnects = cancelled_count("disconnect")
+            result = client.portal.call(disconnecting_request, "/test/slow_query_untimed")
+
+            print(f"Disconnected client: request ended after {result['seconds'] * 1000:.0f} ms "
+                  f"(status {result['status']} in metrics)")
+            assert DISCONNECT_AFTER <= result["seconds"] < MAX_CANCEL_SECONDS, result
+            assert result["status"] == 499, result
+            assert cancelled_count("disconnect") == disconnects + 1
+            assert checked_out_connections() == 0
+
+            # Database is free again: aborted statement doesn't hold the connection
+            started = time.perf_counter()
+            assert client.get("/api/v1/items/").status_code in (200, 404)
+            assert time.perf_counter() - started < MAX_CANCEL_SECONDS
+    finally:
+        query_cancel_helper.install(get_engines().values(),
+                                    route_timeouts_ms=settings.ROUTE_STATEMENT_TIMEOUTS_MS,
+                                    default_timeout_ms=settings.STATEMENT_TIMEOUT_MS)
@@ -0,0 +1,210 @@
+import asyncio
+import inspect
+import re
+from typing import Dict, List, Optional, Tuple
+
+"""
+Index advisor: query plan check of every DAO and validation statement.
+
+Calls every async method of UserDAO, ItemDao, GeneralDAO and ValidationService
+on a seeded SQLite database, captures all statements they emit and runs
+EXPLAIN QUERY PLAN for each. Fails on full table scans (SCAN table without index)
+that are not listed in ALLOWED_SCANS and suggests the missing index.
+
+Run with:  pytest -s test_query_plans.py
+"""
+
+from sqlalchemy import event
+
+from DAO.general_dao import GeneralDAO
+from DAO.item_dao import ItemDao
+from DAO.user_dao import UserDAO
+from database import models, schema
+from database.database import engine, SessionLocal
+from helpers.seed_helper import seed_database
+from helpers.slow_query_helper import has_full_scan
+from services.cache_services import CacheService
+from services.validation_services import ValidationService
+
+SEED_USERS = 20
+SEED_ITEMS_PER_USER = 5
+CHECKED_CLASSES = (UserDAO, ItemDao, GeneralDAO, ValidationService)
+
+
+async def update_user_record(db):
+    user = await UserDAO.get_user_by_id(db=db, user_id=1)
+    return await GeneralDAO.update_record(model=models.User, record=user, update_data={"bio": "Plan check biography"}, db=db)
+
+
+async def validate_item_update(db):
+    item = await ItemDao.get_item_by_user_id(db=db, item_id=3, user_id=1)
+    return await ValidationService.validate_update(model_class=models.Item, record=item,
+                                                   update_data={"name": "plan_item_validated"}, db=db)
+
+
+async def check_item_duplicates_per_user(db):
+    item = await ItemDao.get_item_by_user_id(db=db, item_id=3, user_id=1)
+    return await ValidationService.check_field_duplicates_per_user(field="name", value="item1",
+                                                                   model=models.Item, record=item, db=db)
+
+
+PLAN_CHECKS = {
+    "UserDAO.get_user_email": lambda db: UserDAO.get_user_email(db=db, user_email="user1@example.com"),
+    "UserDAO.get_user_name": lambda db: UserDAO.get_user_name(db=db, user_name="user1"),
+    "UserDAO.get_user_by_id": lambda db: UserDAO.get_user_by_id(db=db, user_id=1),
+    "UserDAO.get_user_with_items": lambda db: UserDAO.get_user_with_items(db=db, user_id=1),
+    "UserDAO.get_all_users": lambda db: UserDAO.get_all_users(db=db),
+    "ItemDao.create_item": lambda db: ItemDao.create_item(db=db, user_id=1,
+                                                          request=schema.Item(name="plan_item", description="Plan check item")),
+    "ItemDao.update_item": lambda db: ItemDao.update_item(item_id=1, user_id=1, db=db,
+                                                          item_data=schema.ItemUpdate(name="plan_item_renamed")),
+    "ItemDao.delete_item": lambda db: ItemDao.delete_item(item_id=2, user_id=1, db=db),
+    "ItemDao.get_item_name": lambda db: ItemDao.get_item_name(db=db, item_name="item1"),
+    "ItemDao.get_items_by_user_id": lambda db: ItemDao.get_items_by_user_id(db=db, user_id=1),
+    "ItemDao.get_item_by_user_id": lambda db: ItemDao.get_item_by_user_id(db=db, item_id=3, user_id=1),
+    "ItemDao.get_item_by_user_id_and_item_name": lambda db: ItemDao.get_item_by_user_id_and_item_name(db=db, user_id=1,
+                                                                                                      item_name="item3"),
+    "ItemDao.get_all_items": lambda db: ItemDao.get_all_items(db=db),
+    "GeneralDAO.get_all_records": lambda db: GeneralDAO.get_all_records(db=db, model=models.Item),
+    "GeneralDAO.get_record_by_id": lambda db: GeneralDAO.get_record_by_id(record_id=1, model=models.User, db=db),
+    "GeneralDAO.update_record": update_user_record,
+    "ValidationService.check_field_duplicates": lambda db: ValidationService.check_field_duplicates(
+        field="email", value="user1@example.com", model=models.User, current_record_id=2, db=db),
+    "ValidationService.validate_update": validate_item_update,
+    "ValidationService.check_field_duplicates_per_user": check_item_duplicates_per_user,
+}
+"""
+Call of every async method of CHECKED_CLASSES: "Class.method" -> function(db) returning awaitable.
+Every async method MUST be listed here, so new DAO queries can't skip the check.
+"""
+
+ALLOWED_SCANS = {
+    ("UserDAO.get_all_users", "users"): "Returns whole table",
+    ("ItemDao.get_all_items", "item"): "Returns whole table",
+    ("GeneralDAO.get_all_records", "item"): "Returns whole table",
+    ("ItemDao.get_item_name", "item"): "Not used by routes, index on item.name is not worth its write cost",
+}
+"""
+Full scans that are expected: ("Class.method", table) -> reason.
+"""
+
+_SCANNED_TABLE = re.compile(r"^SCAN (\w+)")
+
+
+def get_checked_methods() -> List[str]:
+    """Get "Class.method" of every async method of CHECKED_CLASSES"""
+    methods = []
+    for cls in CHECKED_CLASSES:
+        for name, attr in vars(cls).items():
+            if isinstance(attr, (classmethod, staticmethod)) and inspect.iscoroutinefunction(attr.__func__):
+                methods.append(f"{cls.__name__}.{name}")
+
+    return methods
+
+
+def suggest_index(statement: str, table: str) -> Optional[str]:
+    """
+    Suggest index for columns of scanned table compared with "=" or "IN".
+
+    :param statement: Scanning statement
+    :param table: Scanned table
+    :return: CREATE INDEX statement or None if no filtered columns were found
+    """
+    statement = " ".join(statement.split())
+    compared = re.findall(rf"\b{table}\.(\w+) ?(?:=|IN\b)|= ?{table}\.(\w+)", statement, flags=re.IGNORECASE)
+
+    columns = []
+    for column in (left or right for left, right in compared):
+        if column not in columns:
+            columns.append(column)
+
+    if not columns:
+        return None
+
+    return f"CREATE INDEX ix_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})"
+
+
+async def prepare_database() -> None:
+    """Seed users with items (tables are created by the database fixture)"""
+    await seed_database(SessionLocal, users=SEED_USERS, items_per_user=SEED_ITEMS_PER_USER)
+
+
+async def explain_checks() -> Dict[str, List[Dict]]:
+    """
+    Run every check and explain statements it emitted.
+
+    :return: Dictionary "Class.method" -> [{"statement", "plan", "scans"}]
+    """
+    await prepare_database()
+
+    statements: List[Tuple[str, tuple]] = []
+
+    def capture_statement(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    results = {}
+    event.listen(engine.sync_engine, "before_cursor_execute", capture_statement)
+    try:
+        for check, call in PLAN_CHECKS.items():
+            CacheService.clear()    # Cached lists would skip their queries
+            statements.clear()
+
+            async with SessionLocal() as db:
+                await call(db)
+                captured = list(statements)
+
+                results[check] = []
+                conn = await db.connection()
+                for statement, parameters in captured:
+                    rows = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)).fetchall()
+                    plan = [row[-1] for row in rows]
+                    scans = [match.group(1) for line in plan
+                             if has_full_scan([line]) and (match := _SCANNED_TABLE.match(line.strip()))]
+                    results[check].append({"statement": statement, "plan": plan, "scans": scans})
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture_statement)
+        await engine.dispose()
+
+    return results
+
+
+def find_unexpected_scans(results: Dict[str, List[Dict]]) -> List[str]:
+    """
+    Find full scans not listed in ALLOWED_SCANS.
+
+    :param results: Result of explain_checks()
+    :return: Human readable reports with suggested indexes
+    """
+    reports = []
+    for check, explained in results.items():
+        for item in explained:
+            for table in item["scans"]:
+                if (check, table) in ALLOWED_SCANS:
+                    continue
+
+                suggestion = suggest_index(item["statement"], table) or "no filtered columns found"
+                statement = " ".join(item["statement"].split())
+                reports.append(f"{check}: full scan of {table} in '{statement[:160]}' -> {suggestion}")
+
+    return reports
+
+
+def print_report(results: Dict[str, List[Dict]]) -> None:
+    for check, explained in results.items():
+        for item in explained:
+            scans = [table for table in item["scans"] if (check, table) not in ALLOWED_SCANS]
+            mark = "SCAN" if scans else "OK  "
+            print(f"{mark} {check}: {' | '.join(item['plan'])}")
+
+
+def test_query_plans(database):
+    """Every DAO and validation statement is served by an index (or its scan is allowed)"""
+    missing = [method for method in get_checked_methods() if method not in PLAN_CHECKS]
+    assert not missing, f"Methods without plan check in PLAN_CHECKS: {missing}"
+
+    results = asyncio.run(explain_checks())
+    print_report(results)
+
+    reports = find_unexpected_scans(results)
+    assert not reports, "Full table scans found:\n" + "\n".join(reports)
@@ -0,0 +1,76 @@
+import re
+
+"""
+Per-request SQL profiler check.
+
+Runs real requests against a seeded SQLite database and checks that:
+- every response carries a Server-Timing header with DB time, query and row counts of its request
+- cached responses report no queries
+- /debug/queries aggregates the same counts per route template and needs the debug token
+
+Run with:  pytest -s test_query_profiler.py
+"""
+
+from fastapi.testclient import TestClient
+
+from config import settings
+from database.database import SessionLocal
+from helpers import query_profiler_helper
+from helpers.seed_helper import seed_database
+from main import app
+from services.cache_services import CacheService
+
+API = "/api/v1"
+DEBUG_TOKEN = "query-profiler-check"
+SERVER_TIMING = re.compile(r'^db;dur=(\d+\.\d{2});desc="(\d+) queries, (\d+) rows"$')
+
+
+def server_timing(response) -> dict:
+    """Parse Server-Timing header of response into {"dur", "queries", "rows"}"""
+    assert response.status_code == 200, response.text
+    match = SERVER_TIMING.match(response.headers.get("server-timing", ""))
+    assert match, response.headers
+
+    return {"dur": float(match.group(1)), "queries": int(match.group(2)), "rows": int(match.group(3))}
+
+
+def test_query_profiler(database):
+    """Server-Timing of every request and per-route statistics at /debug/queries"""
+    async def prepare() -> None:
+        await seed_database(SessionLocal, users=3, items_per_user=2)
+
+    debug_token = settings.DEBUG_TOKEN
+    settings.DEBUG_TOKEN = DEBUG_TOKEN
+    try:
+        with TestClient(app) as client:
+            client.portal.call(prepare)
+            query_profiler_helper.reset_route_stats()
+            CacheService.clear()
+
+            cold = server_timing(client.get(f"{API}/items/"))
+            cached = server_timing(client.get(f"{API}/items/"))
+            item = server_timing(client.get(f"{API}/items/item/1"))
+
+            forbidden = client.get("/debug/queries")
+            stats = client.get("/debug/queries?reset=true", headers={"X-Debug-Token": DEBUG_TOKEN})
+            after_reset = client.get("/debug/queries", headers={"X-Debug-Token": DEBUG_TOKEN})
+    finally:
+        settings.DEBUG_TOKEN = debug_token
+
+    # Cold list: items and their users are loaded from the database
+    assert cold["queries"] > 0 and cold["rows"] >= 6 and cold["dur"] > 0, cold
+    assert cached == {"dur": 0.0, "queries": 0, "rows": 0}, cached
+    assert item["queries"] > 0 and item["rows"] >= 1, item
+
+    assert forbidden.status_code == 403, forbidden.text
+    assert stats.status_code == 200, stats.text
+    routes = stats.json()["routes"]
+    items = routes[f"GET {API}/items/"]
+    assert items["requests"] == 2 and items["queries"] == cold["queries"], items
+    assert items["max_queries"] == cold["queries"] and items["rows"] == cold["rows"], items
+    assert items["avg_queries"] == cold["queries"] / 2, items
+    assert routes[f"GET {API}/items/item/{{item_id}}"]["queries"] == item["queries"], routes
+    assert f"GET {API}/items/item/1" not in routes, routes
+
+    # Only the reset request itself is counted after reset (it is recorded when its response starts)
+    assert list(after_reset.json()["routes"]) == ["GET /debug/queries"], after_reset.json()
@@ -0,0 +1,222 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+"""
+Rate limit check and benchmark.
+
+Checks:
+- token bucket allows bursts up to the limit and refills over the period
+- sliding window counts requests of the last period, also across window borders
+- per-worker memory forgets idle keys (lazy expiry), checks take the same time with many keys
+- shared memory backend enforces one limit for several worker processes
+- POST /items/create_item is limited per user, item and user lists, availability checks and
+  sign ups per client IP: 429 with Retry-After, RateLimit-* headers on allowed responses
+- requests over the limit are rejected before their lane, without taking a lane slot
+
+Run with:  pytest -s test_rate_limit.py
+"""
+
+from fastapi.testclient import TestClient
+
+from config import settings
+from database.database import SessionLocal
+from helpers.seed_helper import seed_database, SEED_PASSWORD
+from main import app
+from services.lane_services import LaneScheduler
+from services.rate_limit_services import MemoryBackend, RateLimiter, RateLimitPolicy, SharedMemoryBackend
+
+API = "/api/v1"
+SHARED_PATH = os.path.join(tempfile.gettempdir(), f"rate_limit_{os.getpid()}.shm")
+PROCESSES = 4
+REQUESTS_PER_PROCESS = 50
+SHARED_LIMIT = 120
+
+TEST_POLICIES = {
+    "create_item": {"algorithm": "token_bucket", "limit": 3, "period_seconds": 60, "key": "user"},
+    "list": {"algorithm": "sliding_window", "limit": 5, "period_seconds": 60, "key": "ip"},
+    "availability": {"algorithm": "sliding_window", "limit": 2, "period_seconds": 60, "key": "ip"},
+    "sign_up": {"algorithm": "sliding_window", "limit": 2, "period_seconds": 60, "key": "ip"},
+}
+
+
+def test_token_bucket():
+    """Burst of limit requests, then one request per limit/period seconds"""
+    policy = RateLimitPolicy(name="test", algorithm="token_bucket", limit=5, period=10, key="ip")
+    backend = MemoryBackend()
+    now = 1000.0
+
+    assert all(backend.check("a", policy, now).allowed for _ in range(5))
+    denied = backend.check("a", policy, now)
+    assert not denied.allowed and denied.remaining == 0
+    assert abs(denied.retry_after - 2.0) < 1e-6, denied     # One token per 2 seconds
+    assert backend.check("b", policy, now).allowed  # Keys have their own buckets
+
+    assert not backend.check("a", policy, now + 1.9).allowed
+    assert backend.check("a", policy, now + 2.0).allowed
+    assert backend.check("a", policy, now + 100).remaining == 4     # Refilled up to the limit only
+
+
+def test_sliding_window():
+    """Requests of previous window count by their overlap with the last period"""
+    policy = RateLimitPolicy(name="test", algorithm="sliding_window", limit=10, period=10, key="ip")
+    backend = MemoryBackend()
+
+    assert all(backend.check("a", policy, 1008.0).allowed for _ in range(10))
+    assert not backend.check("a", policy, 1009.0).allowed
+
+    # 2 s into next window: 80 % of previous 10 requests still count, 2 more are allowed
+    denied = None
+    allowed = 0
+    for _ in range(5):
+        decision = backend.check("a", policy, 1012.0)
+        if not decision.allowed:
+            denied = decision
+            break
+        allowed += 1
+    assert allowed == 2, allowed
+    assert denied is not None and 0 < denied.retry_after <= 10, denied
+
+    # No burst at the border: 10 requests at the end of one window and 10 at the start
+    # of the next would be allowed by fixed windows
+    assert not backend.check("a", policy, 1012.0 + denied.retry_after - 0.5).allowed
+    assert backend.check("a", policy, 1012.0 + denied.retry_after + 0.01).allowed
+
+    # Two windows later everything is forgotten
+    assert backend.check("a", policy, 1035.0).remaining == 9
+
+
+def test_lazy_expiry_and_constant_time():
+    """Idle keys are dropped by later checks; check time doesn't grow with tracked keys"""
+    policy = RateLimitPolicy(name="test", algorithm="token_bucket", limit=10, period=1, key="ip")
+
+    backend = MemoryBackend()
+    for number in range(10000):
+        backend.check(f"old{number}", policy, 1000.0)
+    assert backend.size() == 10000
+    for number in range(20000):  # Old keys expired 1 s later
+        backend.check(f"new{number % 1000}", policy, 1010.0 + number * 0.00001)
+    assert backend.size() <= 1000, backend.size()
+
+    policy = RateLimitPolicy(name="test", algorithm="token_bucket", limit=10, period=60, key="ip")
+    timings = {}
+    for keys in (1000, 100000):
+        backend = MemoryBackend()
+        for number in range(keys):
+            backend.check(f"k{number}", policy, 1000.0)
+        started = time.perf_counter()
+        for number in range(20000):
+            backend.check(f"k{number * 7919 % keys}", policy, 1000.5)
+        timings[keys] = (time.perf_counter() - started) / 20000
+
+    print(f"\nMemory backend check: {timings[1000] * 1e6:.2f} us with 1k keys, "
+          f"{timings[100000] * 1e6:.2f} us with 100k keys")
+    assert timings[100000] < 3 * timings[1000], timings
+
+
+def hit_shared_backend(queue) -> None:
+    """One worker process checking the same key"""
+    policy = RateLimitPolicy(name="test", algorithm="sliding_window", limit=SHARED_LIMIT, period=60, key="user")
+    backend = SharedMemoryBackend(SHARED_PATH, shards=4, slots_per_shard=64)
+    allowed = sum(backend.check("user:1", policy, time.time()).allowed for _ in range(REQUESTS_PER_PROCESS))
+    backend.close()
+    queue.put(allowed)
+
+
+def test_shared_memory_backend():
+    """Workers of a host share one limit"""
+    if os.path.exists(SHARED_PATH):
+        os.remove(SHARED_PATH)
+
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    processes = [context.Process(target=hit_shared_backend, args=(queue,)) for _ in range(PROCESSES)]
+    try:
+        for process in processes:
+            process.start()
+        allowed = sum(queue.get(timeout=30) for _ in processes)
+        for process in processes:
+            process.join()
+
+        backend = SharedMemoryBackend(SHARED_PATH, shards=4, slots_per_shard=64)
+        policy = RateLimitPolicy(name="test", algorithm="token_bucket", limit=2, period=60, key="ip")
+        for number in range(500):   # More keys than slots: live keys are evicted, table doesn't grow
+            backend.check(f"ip:{number}", policy, time.time())
+        size = backend.size()
+        backend.close()
+    finally:
+        if os.path.exists(SHARED_PATH):
+            os.remove(SHARED_PATH)
+
+    print(f"{PROCESSES} processes x {REQUESTS_PER_PROCESS} requests, shared limit {SHARED_LIMIT}: {allowed} allowed")
+    assert allowed == SHARED_LIMIT, allowed
+    assert size <= 4 * 64, size
+
+
+def test_rate_limited_routes(database):
+    """Item creation is limited per user, lists per client IP"""
+    async def prepare() -> None:
+        await seed_database(SessionLocal, users=2, items_per_user=1)
+
+    try:
+        with TestClient(app) as client:
+            client.portal.call(prepare)
+            RateLimiter.configure(policies=TEST_POLICIES)
+
+            tokens = []
+            for number in (1, 2):
+                sign_in = client.post(f"{API}/users/sign_in",
+                                      json={"email": f"user{number}@example.com", "password": SEED_PASSWORD})
+                tokens.append(sign_in.json()["data"]["user_access_token"])
+            client.cookies.clear()
+
+            def create_item(token: str, number: int):
+                return client.post(f"{API}/items/create_item", headers={"Authorization": f"Bearer {token}"},
+                                   json={"name": f"limited {number}", "description": "rate limited item"})
+
+            first_user = [create_item(tokens[0], number) for number in range(4)]
+            second_user = create_item(tokens[1], 10)
+            lists = [client.get(f"{API}/items/") for _ in range(3)] + [client.get(f"{API}/users/") for _ in range(3)]
+            availability = [client.get(f"{API}/users/available", params={"email": f"user{number}@example.com"})
+                            for number in range(3)]
+
+            auth_admitted = LaneScheduler.get_stats()["lanes"]["auth"]["admitted"]
+            sign_ups = [client.post(f"{API}/users/sign_up",
+                                    json={"name": f"newcomer{number}", "email": f"newcomer{number}@example.com",
+                                          "password": SEED_PASSWORD, "bio": "Signed up in rate limit check"})
+                        for number in range(3)]
+            auth_admitted = LaneScheduler.get_stats()["lanes"]["auth"]["admitted"] - auth_admitted
+            stats = RateLimiter.get_stats()
+            metrics = client.get("/metrics").text
+    finally:
+        RateLimiter.configure(policies=settings.RATE_LIMIT_POLICIES,
+                              shared_path=settings.RATE_LIMIT_SHARED_PATH,
+                              shared_slots=settings.RATE_LIMIT_SHARED_SLOTS)
+        RateLimiter.enabled = settings.RATE_LIMIT_ENABLED
+
+    # Per user: 3 items, the 4th is limited, another user is not
+    assert [response.status_code for response in first_user] == [200, 200, 200, 429], \
+        [(response.status_code, response.text) for response in first_user]
+    assert first_user[0].headers["ratelimit-limit"] == "3"
+    assert first_user[0].headers["ratelimit-remaining"] == "2"
+    assert first_user[3].headers["retry-after"] == "20", first_user[3].headers    # One token per 20 s
+    assert first_user[3].headers["ratelimit-remaining"] == "0"
+    assert second_user.status_code == 200, second_user.text
+
+    # Per IP: both lists share the "list" policy of the client
+    assert [response.status_code for response in lists] == [200] * 5 + [429], [r.status_code for r in lists]
+    assert int(lists[5].headers["retry-after"]) > 0
+
+    # Anonymous email checks are limited per IP
+    assert [response.status_code for response in availability] == [200, 200, 429], \
+        [(response.status_code, response.text) for response in availability]
+
+    # Sign ups are limited per IP before the auth lane: the limited one takes no lane slot
+    assert [response.status_code for response in sign_ups] == [201, 201, 429], \
+        [(response.status_code, response.text) for response in sign_ups]
+    assert auth_admitted == (2 if settings.LANES_ENABLED else 0), auth_admitted
+
+    assert stats["policies"]["create_item"]["limited"] == 1, stats
+    assert stats["policies"]["list"]["limited"] == 1, stats
+    assert 'rate_limit_decisions_total{policy="create_item",result="limited"} 1' in metrics
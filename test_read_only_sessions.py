@@ -0,0 +1,104 @@
+import asyncio
+
+"""
+Read-only session check.
+
+Checks:
+- writes through a read-only session (get_read_db) fail in the database,
+  both ORM flushes and raw statements
+- GET routes use only read-only sessions and write routes get a writable one:
+  the dependency tree of every API route is compared with the expected split,
+  so a new route or a changed dependency has to update it on purpose
+
+Run with:  pytest -s test_read_only_sessions.py
+"""
+
+from fastapi.routing import APIRoute
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DBAPIError
+
+from database import models
+from database.database import ReadSessionLocal, get_db, get_read_db
+from main import app
+
+API = "/api/v1"
+
+# Routes querying the database, by the session they get
+READ_ONLY_ROUTES = {
+    f"GET {API}/users/",
+    f"GET {API}/users/available",
+    f"GET {API}/users/user/{{user_id}}",
+    f"GET {API}/users/me/",
+    f"GET {API}/users/me/items",
+    f"GET {API}/users/me/item/{{item_id}}",
+    f"GET {API}/items/",
+    f"GET {API}/items/item/{{item_id}}",
+}
+WRITE_ROUTES = {
+    f"POST {API}/users/sign_up",
+    f"POST {API}/users/sign_in",
+    f"PATCH {API}/users/me/update",
+    f"POST {API}/items/create_item",
+    f"PATCH {API}/items/update_item/{{item_id}}",
+    f"DELETE {API}/items/delete_item/{{item_id}}",
+}
+
+
+def test_read_only_session_rejects_writes(database):
+    """ORM flush and raw INSERT / UPDATE through read-only session fail"""
+    async def try_writes() -> dict:
+        failed = {}
+        async with ReadSessionLocal() as db:
+            db.add(models.User(name="reader", email="reader@example.com", password="hash", bio="Bio"))
+            statements = {
+                "flush": db.flush,
+                "insert": lambda: db.execute(insert(models.Item).values(name="item", description="", user_id=1)),
+                "update": lambda: db.execute(text("UPDATE users SET bio = 'changed'")),
+            }
+            for name, statement in statements.items():
+                try:
+                    await statement()
+                except DBAPIError as error:
+                    failed[name] = str(error.orig)
+                    await db.rollback()
+
+        async with ReadSessionLocal() as db:
+            failed["rows"] = (await db.execute(text("SELECT count(*) FROM users"))).scalar()
+
+        return failed
+
+    failed = asyncio.run(try_writes())
+
+    assert set(failed) == {"flush", "insert", "update", "rows"}, failed
+    assert all("readonly" in failed[name] or "read-only" in failed[name]
+               for name in ("flush", "insert", "update")), failed
+    assert failed["rows"] == 0, failed
+
+
+def get_calls(dependant) -> set:
+    """Callables of all dependencies of a route, sub-dependencies included"""
+    calls = set()
+    for dependency in dependant.dependencies:
+        calls.add(dependency.call)
+        calls |= get_calls(dependency)
+
+    return calls
+
+
+def test_read_only_routes():
+    """GET routes get only read-only sessions, write routes a writable session"""
+    read_only, writes = set(), set()
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or not route.path.startswith(API):
+            continue
+        calls = get_calls(route.dependant)
+        for method in route.methods:
+            if get_db in calls:
+                writes.add(f"{method} {route.path}")
+            elif get_read_db in calls:
+                read_only.add(f"{method} {route.path}")
+
+    assert read_only == READ_ONLY_ROUTES, read_only ^ READ_ONLY_ROUTES
+    assert writes == WRITE_ROUTES, writes ^ WRITE_ROUTES
+    assert all(route.startswith("GET ") for route in read_only)
+    assert not any(route.startswith("GET ") for route in writes)
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import shutil
+import time
+
+"""
+Read replica routing check with SQLite files standing in for replicas.
+
+Seeds primary database and copies it to two replica files. Copies are never
+updated, so they behave like replicas with unlimited lag: everything written
+afterwards is visible only on primary. A third replica points to a missing
+directory and must be taken out of rotation by the health check.
+
+Checks:
+- anonymous reads go to healthy replicas, never to the broken one
+- after a write its author reads from primary (cookie and per-user window)
+- reads of other clients stay on replicas and don't put stale data in cache
+- after the window, the author reads from replicas again
+
+Run with:  pytest -s test_read_replicas.py
+"""
+
+from fastapi.testclient import TestClient
+
+from config import settings
+from database.database import engine, SessionLocal, create_read_engine, read_engine, replica_engines
+from helpers.seed_helper import seed_database, SEED_PASSWORD
+from main import app
+from services.cache_services import CacheService
+from services.replica_services import ReplicaRouter
+
+WINDOW = 1.0    # Read-your-writes window of this check, seconds
+API = "/api/v1"
+
+
+async def prepare_database(db_path: str) -> None:
+    """Seed users with items and copy database to replica files"""
+    await seed_database(SessionLocal, users=3, items_per_user=2)
+    await engine.dispose()
+
+    for number in range(2):
+        shutil.copyfile(db_path, f"{db_path}.replica_{number}")
+
+
+def item_names(response) -> set:
+    assert response.status_code == 200, response.text
+    data = response.json()["data"]
+    items = data["items"] if isinstance(data, dict) else data
+    return {item["name"] for item in items}
+
+
+def test_read_replicas(database):
+    """Reads are spread over healthy replicas, writers read their own writes"""
+    asyncio.run(prepare_database(database))
+
+    replicas = {f"replica_{number}": create_read_engine(f"sqlite+aiosqlite:///{database}.replica_{number}")
+                for number in range(2)}
+    replicas["replica_broken"] = create_read_engine(
+        f"sqlite+aiosqlite:///{database}.missing_dir/replica.db")
+    ReplicaRouter.configure(primary=read_engine, replicas=replicas, window=WINDOW)
+    ReplicaRouter.routed.clear()
+
+    try:
+        with TestClient(app) as client:
+            try:
+                check_routing(client)
+            finally:
+                for replica in replicas.values():
+                    client.portal.call(replica.dispose)
+    finally:
+        ReplicaRouter.configure(primary=read_engine, replicas=replica_engines, window=settings.READ_YOUR_WRITES_SECONDS)
+        for number in range(2):
+            os.remove(f"{database}.replica_{number}")
+
+
+def check_routing(client: TestClient) -> None:
+    """
+    One client plays several clients by swapping cookies:
+    author (writes), reader (anonymous) and author's other device (no read_primary_until cookie).
+    """
+    stats = client.portal.call(ReplicaRouter.check_health)
+    assert not stats["replicas"]["replica_broken"]["healthy"], stats
+    assert stats["replicas"]["replica_0"]["healthy"] and stats["replicas"]["replica_1"]["healthy"], stats
+
+    # Anonymous reads: only healthy replicas
+    for _ in range(4):
+        assert "item1" in item_names(client.get(f"{API}/items/"))
+        CacheService.clear()
+    assert ReplicaRouter.routed["replica_0"] > 0 and ReplicaRouter.routed["replica_1"] > 0, ReplicaRouter.routed
+    assert ReplicaRouter.routed["replica_broken"] == 0, ReplicaRouter.routed
+    assert ReplicaRouter.routed["primary"] == 0, ReplicaRouter.routed
+
+    # Write: author gets the cookie and reads own item from primary
+    response = client.post(f"{API}/users/sign_in", json={"email": "user1@example.com", "password": SEED_PASSWORD})
+    assert response.status_code == 200, response.text
+    response = client.post(f"{API}/items/create_item", json={"name": "fresh_item", "description": "Written to primary"})
+    assert response.status_code == 200, response.text
+    assert ReplicaRouter.COOKIE_NAME in response.cookies, response.headers
+
+    assert "fresh_item" in item_names(client.get(f"{API}/users/me/items"))
+    author_cookies = dict(client.cookies)
+
+    # Other client reads from (stale) replica, its load must not be cached for the author
+    client.cookies.clear()
+    assert "fresh_item" not in item_names(client.get(f"{API}/items/"))
+    client.cookies.update(author_cookies)
+    assert "fresh_item" in item_names(client.get(f"{API}/items/"))
+
+    # Same user without cookie (other device): per-user window in this worker
+    client.cookies.clear()
+    response = client.post(f"{API}/users/sign_in", json={"email": "user1@example.com", "password": SEED_PASSWORD})
+    assert response.status_code == 200, response.text
+    assert ReplicaRouter.COOKIE_NAME not in client.cookies
+    assert "fresh_item" in item_names(client.get(f"{API}/users/me/items"))
+
+    # Window is over: author reads from replicas again
+    time.sleep(WINDOW + 0.2)
+    client.cookies.update(author_cookies)
+    CacheService.clear()
+    assert "fresh_item" not in item_names(client.get(f"{API}/users/me/items"))
+
+    print(f"Read sessions: {dict(ReplicaRouter.routed)}")
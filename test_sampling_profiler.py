@@ -0,0 +1,73 @@
+import threading
+import time
+
+"""
+Always-on sampling profiler check.
+
+Runs ContinuousProfiler with short windows next to a busy thread and checks that:
+- /debug/profile/continuous returns collapsed stacks of completed windows showing the busy function
+- sampling overhead stays under MAX_OVERHEAD
+- the sampler thread stops at once, the endpoint is 404 while the profiler is off
+- the endpoint needs the debug token
+
+Run with:  pytest -s test_sampling_profiler.py
+"""
+
+from fastapi.testclient import TestClient
+
+from config import settings
+from helpers.sampling_profiler_helper import ContinuousProfiler, MAX_OVERHEAD
+from main import app
+
+DEBUG_TOKEN = "sampling-profiler-check"
+INTERVAL = 0.005
+WINDOW = 0.2
+
+
+def busy_loop(done: threading.Event) -> None:
+    """CPU-bound function the profiler must find"""
+    while not done.is_set():
+        sum(range(1000))
+
+
+def test_continuous_profiler():
+    """Windows of the always-on profiler show the busy thread"""
+    done = threading.Event()
+    busy = threading.Thread(target=busy_loop, args=(done,), name="busy")
+
+    debug_token = settings.DEBUG_TOKEN
+    settings.DEBUG_TOKEN = DEBUG_TOKEN
+    try:
+        with TestClient(app) as client:
+            disabled = client.get("/debug/profile/continuous", headers={"X-Debug-Token": DEBUG_TOKEN})
+
+            busy.start()
+            ContinuousProfiler.start(interval=INTERVAL, window=WINDOW, windows=3)
+            try:
+                time.sleep(WINDOW * 5)
+                profile = client.get("/debug/profile/continuous", headers={"X-Debug-Token": DEBUG_TOKEN})
+                forbidden = client.get("/debug/profile/continuous", headers={"X-Debug-Token": "wrong"})
+            finally:
+                stopping = time.perf_counter()
+                ContinuousProfiler.stop()
+                stop_seconds = time.perf_counter() - stopping
+                done.set()
+                busy.join()
+    finally:
+        settings.DEBUG_TOKEN = debug_token
+
+    assert disabled.status_code == 404, disabled.text
+    assert forbidden.status_code == 403, forbidden.text
+    assert profile.status_code == 200, profile.text
+
+    # Only the 3 last completed windows are kept
+    assert len(ContinuousProfiler.profiles) == 3
+    assert float(profile.headers["x-profile-seconds"]) == round(3 * WINDOW, 1), profile.headers
+    assert int(profile.headers["x-profile-samples"]) > 0, profile.headers
+    assert float(profile.headers["x-profile-overhead"]) < MAX_OVERHEAD * 2, profile.headers
+
+    stacks = [line.rsplit(" ", 1)[0] for line in profile.text.splitlines()]
+    assert any(stack.startswith("busy;") and "busy_loop (test_sampling_profiler.py:" in stack
+               for stack in stacks), profile.text
+    assert stop_seconds < 0.1, stop_seconds
+    assert not ContinuousProfiler.is_running()
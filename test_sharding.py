@@ -0,0 +1,247 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict
+
+"""
+Sharding check with SQLite files standing in for shard databases.
+
+Runs in a subprocess (settings are read once per process, other checks run unsharded):
+primary database (ID blocks) and SHARDS shard files, seeded through the API layers.
+
+Checks:
+- users with their items are spread over shards, every row is on the shard of its user
+- requests of one user (/users/me/items) run statements on its shard only
+- new items and users go to the shard of their user, IDs are unique across shards
+- GET /items/ and GET /users/ read every shard and return rows merged by ID
+- lookups without user ID (sign in by email, item by ID, duplicate email) find rows on any shard
+- after adding a shard, rebalance moves only users of the new shard (jump hash) and keeps all rows
+- rows of a user in the middle of a move (on both shards) are listed once
+
+Run with:  pytest -s test_sharding.py
+"""
+
+SHARDS = 3
+SEED_USERS = 24
+SEED_ITEMS_PER_USER = 3
+API = "/api/v1"
+
+
+async def count_rows(shard_engines: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Users, items and misplaced rows (not on shard of their user) of every shard"""
+    from sqlalchemy import text
+    from services.shard_services import ShardRouter
+
+    counts = {}
+    for name, shard_engine in shard_engines.items():
+        async with shard_engine.connect() as conn:
+            user_ids = (await conn.scalars(text("SELECT id FROM users"))).all()
+            item_user_ids = (await conn.scalars(text("SELECT user_id FROM item"))).all()
+            item_ids = (await conn.scalars(text("SELECT id FROM item"))).all()
+
+        counts[name] = {
+            "users": len(user_ids),
+            "items": len(item_ids),
+            "item_ids": item_ids,
+            "misplaced": sum(ShardRouter.shard_for(user_id) != name for user_id in [*user_ids, *item_user_ids]),
+        }
+
+    return counts
+
+
+def run_api_checks() -> Dict[str, Any]:
+    """Seed shards and exercise API (worker subprocess)"""
+    from fastapi.testclient import TestClient
+
+    from database.database import engine, shard_engines, Base, SessionLocal
+    from helpers.seed_helper import seed_database, SEED_PASSWORD
+    from main import app
+    from services.shard_services import ShardRouter
+
+    async def prepare() -> None:
+        for db_engine in (engine, *shard_engines.values()):
+            async with db_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        await seed_database(SessionLocal, users=SEED_USERS, items_per_user=SEED_ITEMS_PER_USER)
+
+    result = {}
+    with TestClient(app) as client:
+        client.portal.call(prepare)
+        result["seeded"] = client.portal.call(count_rows, shard_engines)
+
+        response = client.post(f"{API}/users/sign_in", json={"email": "user7@example.com", "password": SEED_PASSWORD})
+        assert response.status_code == 200, response.text
+        user_id = response.json()["data"]["id"]
+        result["user_shard"] = ShardRouter.shard_for(user_id)
+
+        response = client.post(f"{API}/items/create_item", json={"name": "sharded_item", "description": "On my shard"})
+        assert response.status_code == 200, response.text
+        new_item_id = response.json()["data"]["id"]
+
+        ShardRouter.routed.clear()
+        response = client.get(f"{API}/users/me/items")
+        assert response.status_code == 200, response.text
+        result["my_items"] = [item["name"] for item in response.json()["data"]["items"]]
+        result["my_items_routed"] = dict(ShardRouter.routed)
+
+        response = client.get(f"{API}/items/item/{new_item_id}")
+        assert response.status_code == 200, response.text
+        result["item_owner"] = response.json()["data"]["user_name"]
+
+        response = client.get(f"{API}/items/")
+        assert response.status_code == 200, response.text
+        result["all_item_ids"] = [item["id"] for item in response.json()["data"]]
+
+        response = client.get(f"{API}/users/")
+        assert response.status_code == 200, response.text
+        result["all_users"] = len(response.json()["data"])
+
+        response = client.post(f"{API}/users/sign_up", json={"name": "someone", "email": "user3@example.com",
+                                                             "password": "secret", "bio": "Duplicate email"})
+        result["duplicate_email_status"] = response.status_code
+
+        response = client.post(f"{API}/users/sign_up", json={"name": "newcomer", "email": "newcomer@example.com",
+                                                             "password": "secret", "bio": "Brand new user"})
+        assert response.status_code == 201, response.text
+        newcomer_id = response.json()["data"]["id"]
+        result["newcomer_on_shard"] = client.portal.call(user_exists, ShardRouter.shard_for(newcomer_id), newcomer_id)
+
+        result["after_writes"] = client.portal.call(count_rows, shard_engines)
+        result["rebalance"] = client.portal.call(check_rebalance)
+
+    return result
+
+
+async def user_exists(shard: str, user_id: int) -> bool:
+    from sqlalchemy import text
+    from services.shard_services import ShardRouter
+
+    async with ShardRouter.shards[shard].connect() as conn:
+        return await conn.scalar(text("SELECT count(*) FROM users WHERE id = :id"), {"id": user_id}) == 1
+
+
+async def check_rebalance() -> Dict[str, Any]:
+    """Add one more shard file, plan and run rebalance, read everything back through fan-out"""
+    from sqlalchemy import delete, insert, select
+
+    from config import settings
+    from database import models
+    from database.database import Base, create_profiled_engine, create_read_engine
+    from services.shard_services import ShardRouter
+
+    url = settings.DATABASE_SHARD_URLS[0].replace("shard_0", f"shard_{SHARDS}")
+    new_engine = create_profiled_engine(url, writer=True)
+    async with new_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    shards = {**ShardRouter.shards, f"shard_{SHARDS}": new_engine}
+    read_shards = {**ShardRouter.read_shards, f"shard_{SHARDS}": create_read_engine(url)}
+    ShardRouter.configure(shards=shards, read_shards=read_shards, routing="hash", ranges=[],
+                          directory=ShardRouter._directory, block_size=ShardRouter.block_size)
+
+    plan = await ShardRouter.rebalance(metadata=Base.metadata, dry_run=True)
+    done = await ShardRouter.rebalance(metadata=Base.metadata, dry_run=False)
+    again = await ShardRouter.rebalance(metadata=Base.metadata, dry_run=True)
+
+    async def read_items(db):
+        return (await db.scalars(select(models.Item.id).order_by(models.Item.id))).all()
+
+    merged = ShardRouter.merge_by_cursor(await ShardRouter.fan_out(read_items), key=lambda item_id: item_id)
+    counts = await count_rows(shards)
+
+    # Move interrupted after the copy: rows of one user are on two shards until the next rebalance
+    source, target = "shard_0", f"shard_{SHARDS}"
+    async with shards[source].connect() as conn:
+        user = (await conn.execute(select(models.User.__table__).limit(1))).mappings().one()
+        items = (await conn.execute(select(models.Item.__table__)
+                                    .where(models.Item.user_id == user["id"]))).mappings().all()
+    async with shards[target].begin() as conn:
+        await conn.execute(insert(models.User.__table__), [dict(user)])
+        await conn.execute(insert(models.Item.__table__), [dict(item) for item in items])
+    merged_during_move = ShardRouter.merge_by_cursor(await ShardRouter.fan_out(read_items),
+                                                     key=lambda item_id: item_id)
+    async with shards[target].begin() as conn:
+        await conn.execute(delete(models.Item.__table__).where(models.Item.user_id == user["id"]))
+        await conn.execute(delete(models.User.__table__).where(models.User.id == user["id"]))
+
+    await new_engine.dispose()
+    await read_shards[f"shard_{SHARDS}"].dispose()
+
+    return {"plan": plan, "done": done, "again": again, "merged_item_ids": merged, "counts": counts,
+            "merged_during_move": merged_during_move}
+
+
+def run_sharded() -> Dict[str, Any]:
+    """Run API checks in a subprocess with SHARDS fresh shard files"""
+    directory = tempfile.mkdtemp(prefix="sharding_")
+    env = {**os.environ,
+           "DB_PROFILE": "dev",
+           "DB_LITE": f"sqlite+aiosqlite:///{directory}/primary.db",
+           "DATABASE_SHARD_URLS": ",".join(f"sqlite+aiosqlite:///{directory}/shard_{number}.db"
+                                           for number in range(SHARDS)),
+           "SHARD_ID_BLOCK_SIZE": "16",     # Small blocks: several blocks per worker
+           "CACHE_SNAPSHOT_PATH": "",
+           "WARMUP_ENABLED": "0",
+           "LOG_LEVEL": "WARNING",
+           "SECRET_KEY": os.getenv("SECRET_KEY") or "sharding-secret-key",
+           "ALGORITHM": os.getenv("ALGORITHM") or "HS256"}
+    try:
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker"],
+                                   env=env, capture_output=True, text=True, timeout=120,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    assert completed.returncode == 0, completed.stderr[-3000:]
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_sharding():
+    """Rows stay on the shard of their user, lists merge all shards, rebalance moves users"""
+    result = run_sharded()
+
+    seeded = result["seeded"]
+    print(f"\nSeeded users per shard: { {name: counts['users'] for name, counts in seeded.items()} }")
+    assert sum(counts["users"] for counts in seeded.values()) == SEED_USERS, seeded
+    assert all(counts["users"] > 0 and counts["misplaced"] == 0 for counts in seeded.values()), seeded
+
+    # One user's request stays on its shard
+    assert "sharded_item" in result["my_items"], result["my_items"]
+    assert set(result["my_items_routed"]) == {result["user_shard"]}, result["my_items_routed"]
+    assert result["item_owner"] == "user7", result
+
+    # Lists: every item once, in ID order
+    after_writes = result["after_writes"]
+    all_ids = [item_id for counts in after_writes.values() for item_id in counts["item_ids"]]
+    assert len(all_ids) == len(set(all_ids)) == SEED_USERS * SEED_ITEMS_PER_USER + 1, all_ids
+    assert result["all_item_ids"] == sorted(all_ids), result["all_item_ids"]
+    assert result["all_users"] == SEED_USERS, result["all_users"]
+    assert all(counts["misplaced"] == 0 for counts in after_writes.values()), after_writes
+
+    # Cross-shard uniqueness and routing of new users
+    assert result["duplicate_email_status"] == 409, result["duplicate_email_status"]
+    assert result["newcomer_on_shard"], result
+
+    # Rebalance after adding a shard: only moves to the new shard, nothing lost
+    rebalance = result["rebalance"]
+    new_shard = f"shard_{SHARDS}"
+    print(f"Rebalance to {SHARDS + 1} shards: {rebalance['plan']['moves']}")
+    planned = rebalance["plan"]["moves"]
+    assert planned and all(set(targets) == {new_shard} for targets in planned.values()), planned
+    assert rebalance["done"]["moved_users"] == sum(sum(targets.values()) for targets in planned.values())
+    assert rebalance["again"]["moves"] == {}, rebalance["again"]
+    assert rebalance["counts"][new_shard]["users"] > 0, rebalance["counts"]
+    assert all(counts["misplaced"] == 0 for counts in rebalance["counts"].values()), rebalance["counts"]
+    assert rebalance["merged_item_ids"] == sorted(all_ids), rebalance["merged_item_ids"]
+    assert rebalance["merged_during_move"] == sorted(all_ids), rebalance["merged_during_move"]
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv:
+        print(json.dumps(run_api_checks()))
+        sys.exit(0)
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+"""
+SQLite production profile check and mixed read/write benchmark.
+
+Runs the same workload in two subprocesses (settings are read once per process):
+- dev: default rollback journal, synchronous=FULL, writes share a pool of connections
+- prod-sqlite: WAL, synchronous=NORMAL, page cache and memory map,
+  pool of reader connections and one writer connection
+
+Workload: CONCURRENCY tasks for DURATION seconds, WRITE_SHARE of operations
+create an item (own commit), the rest read items of a user through read-only sessions.
+Checks that prod-sqlite connections get their pragmas, the writer pool has
+one connection and no operation fails; throughput of both profiles is printed.
+
+Run with:  pytest -s test_sqlite_profile.py
+"""
+
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "32"))
+DURATION = float(os.getenv("BENCH_DURATION", "3"))
+WRITE_SHARE = float(os.getenv("BENCH_WRITE_SHARE", "0.2"))
+SEED_USERS = 10
+SEED_ITEMS_PER_USER = 10
+PROFILES = ("dev", "prod-sqlite")
+
+
+async def run_workload() -> Dict[str, Any]:
+    """Seed database of this process and run mixed workload (worker subprocess)"""
+    from sqlalchemy import text
+
+    from DAO.item_dao import ItemDao
+    from database import schema
+    from database.database import engine, read_engine, Base, SessionLocal, ReadSessionLocal
+    from helpers.seed_helper import seed_database
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await seed_database(SessionLocal, users=SEED_USERS, items_per_user=SEED_ITEMS_PER_USER)
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    latencies = []
+    errors = set()
+    deadline = time.perf_counter() + DURATION
+
+    async def worker(number: int) -> None:
+        while time.perf_counter() < deadline:
+            user_id = random.randint(1, SEED_USERS)
+            started = time.perf_counter()
+            try:
+                if random.random() < WRITE_SHARE:
+                    async with SessionLocal() as db:
+                        await ItemDao.create_item(db=db, user_id=user_id,
+                                                  request=schema.Item(name=f"bench_{number}_{counts['writes']}",
+                                                                      description="Benchmark item"))
+                        await db.commit()
+                    counts["writes"] += 1
+                else:
+                    async with ReadSessionLocal() as db:
+                        await ItemDao.get_items_by_user_id(db=db, user_id=user_id)
+                    counts["reads"] += 1
+            except Exception as e:
+                counts["errors"] += 1
+                errors.add(f"{type(e).__name__}: {str(e)[:80]}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - started
+
+    pragmas = {}
+    async with engine.connect() as conn:
+        for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size"):
+            pragmas[name] = (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+    async with read_engine.connect() as conn:
+        pragmas["reader_journal_mode"] = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        pragmas["reader_query_only"] = (await conn.execute(text("PRAGMA query_only"))).scalar()
+
+    writer_limit = engine.pool.size() + engine.pool._max_overflow
+    await engine.dispose()
+    await read_engine.dispose()
+
+    latencies.sort()
+    return {
+        **counts,
+        "ops_per_second": round((counts["reads"] + counts["writes"]) / elapsed, 1),
+        "writes_per_second": round(counts["writes"] / elapsed, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2) if latencies else None,
+        "error_samples": sorted(errors)[:3],
+        "writer_pool_limit": writer_limit,
+        "pragmas": pragmas,
+    }
+
+
+def run_profile(profile: str) -> Dict[str, Any]:
+    """
+    Run workload with given DB_PROFILE in a subprocess on a fresh database file.
+
+    :param profile: Engine profile name
+    :return: Workload result
+    """
+    db_path = os.path.join(tempfile.gettempdir(), f"sqlite_profile_{profile}_{os.getpid()}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    env = {**os.environ,
+           "DB_PROFILE": profile,
+           "DB_LITE": f"sqlite+aiosqlite:///{db_path}",
+           "CACHE_SNAPSHOT_PATH": "",
+           "LOG_LEVEL": "WARNING"}
+    try:
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker"],
+                                   env=env, capture_output=True, text=True, timeout=DURATION + 60,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_results(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n{CONCURRENCY} tasks, {DURATION:.0f} s, {WRITE_SHARE:.0%} writes")
+    print(f"{'profile':<12} {'ops/s':>8} {'writes/s':>9} {'p99 ms':>8} {'errors':>7}")
+    for profile, result in results.items():
+        print(f"{profile:<12} {result['ops_per_second']:>8} {result['writes_per_second']:>9} "
+              f"{result['p99_ms']:>8} {result['errors']:>7}")
+
+
+def test_sqlite_profile():
+    """prod-sqlite runs WAL with one writer connection, mixed workload has no errors"""
+    results = {profile: run_profile(profile) for profile in PROFILES}
+    print_results(results)
+
+    production = results["prod-sqlite"]
+    assert production["pragmas"]["journal_mode"] == "wal", production["pragmas"]
+    assert production["pragmas"]["reader_journal_mode"] == "wal", production["pragmas"]
+    assert production["pragmas"]["reader_query_only"] == 1, production["pragmas"]
+    assert production["pragmas"]["synchronous"] == 1, production["pragmas"]     # NORMAL
+    assert production["pragmas"]["mmap_size"] > 0, production["pragmas"]
+    assert production["writer_pool_limit"] == 1, production
+    assert production["errors"] == 0, production["error_samples"]
+    assert production["writes"] > 0 and production["reads"] > 0, production
+
+    assert results["dev"]["pragmas"]["journal_mode"] == "delete", results["dev"]["pragmas"]
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv:
+        print(json.dumps(asyncio.run(run_workload())))
+        sys.exit(0)
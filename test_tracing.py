@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+"""
+Tracing safety check.
+
+Checks:
+- with local sampling off, a sampled "traceparent" header can't turn tracing on
+- with local sampling on, a sampled "traceparent" header is honored
+- trace file is rotated at its size limit and only the configured backups are kept
+
+Run with:  pytest -s test_tracing.py
+"""
+
+from config import settings
+from helpers import tracing_helper
+
+SAMPLED = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+MAX_BYTES = 4096
+BACKUPS = 2
+
+
+def test_forced_sampling_needs_local_sampling():
+    """Clients can't force traces while tracing is off"""
+    default_rate = settings.TRACE_SAMPLE_RATE
+    try:
+        settings.TRACE_SAMPLE_RATE = 0.0
+        forced_when_off = tracing_helper.should_sample(SAMPLED)
+
+        settings.TRACE_SAMPLE_RATE = 1e-9
+        forced_when_on = tracing_helper.should_sample(SAMPLED)
+    finally:
+        settings.TRACE_SAMPLE_RATE = default_rate
+
+    assert forced_when_off is False
+    assert forced_when_on is True
+
+
+def test_trace_file_rotation():
+    """Trace file doesn't grow past its limit, old rotations are deleted"""
+    path = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+    exporter = tracing_helper.JsonlExporter()
+    exporter.start(path, max_bytes=MAX_BYTES, backups=BACKUPS)
+    try:
+        for number in range(200):
+            root = tracing_helper.Span(trace_id=f"{number:032x}", span_id=f"{number:016x}", parent_id=None,
+                                       name="GET /test", kind="server", end_ns=1)
+            exporter.export([root])
+    finally:
+        exporter.stop()
+
+    files = sorted(name for name in os.listdir(os.path.dirname(path)))
+    sizes = {name: os.path.getsize(os.path.join(os.path.dirname(path), name)) for name in files}
+    print(f"\nRotations: {exporter.rotations}, files: {sizes}")
+
+    assert exporter.rotations > BACKUPS, exporter.rotations
+    assert files == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"], files
+    assert all(size < 2 * MAX_BYTES for size in sizes.values()), sizes
@@ -0,0 +1,71 @@
+import asyncio
+
+"""
+Startup warm-up and readiness check.
+
+Runs WarmupService.run with its last step held by a gate and checks that:
+- /ready answers 503 while warm-up runs and 200 (with its duration) once it is finished
+- /health (liveness) answers 200 all the time
+- warm-up compiled the DAO statements of both pools and generated the OpenAPI schema
+
+Run with:  pytest -s test_warmup.py
+"""
+
+from fastapi.testclient import TestClient
+
+from database.database import engine, read_engine
+from main import app
+from services.availability_services import AvailabilityService
+from services.warmup_services import WarmupService
+
+AVAILABILITY_LOAD = AvailabilityService.load
+
+
+def test_ready_after_warmup(database):
+    """/ready is 503 until warm-up is finished, then 200"""
+    state = {}
+
+    async def start_warmup() -> None:
+        gate = state["gate"] = asyncio.Event()
+
+        async def gated_load() -> int:
+            await gate.wait()
+            return await AVAILABILITY_LOAD()
+
+        AvailabilityService.load = gated_load
+        for db_engine in (engine, read_engine):
+            db_engine.sync_engine._compiled_cache.clear()
+        app.openapi_schema = None
+        WarmupService.ready = False
+        state["task"] = asyncio.create_task(WarmupService.run(app=app))
+
+        for _ in range(500):   # Until the other steps are done and the gate holds the last one
+            if app.openapi_schema is not None:
+                break
+            await asyncio.sleep(0.01)
+
+    async def finish_warmup() -> None:
+        state["gate"].set()
+        await state["task"]
+
+    try:
+        with TestClient(app) as client:
+            client.portal.call(start_warmup)
+            warming_up = client.get("/ready")
+            live = client.get("/health")
+            compiled = {name: len(db_engine.sync_engine._compiled_cache)
+                        for name, db_engine in (("primary", engine), ("read", read_engine))}
+
+            client.portal.call(finish_warmup)
+            ready = client.get("/ready")
+    finally:
+        AvailabilityService.load = AVAILABILITY_LOAD
+        WarmupService.ready = True
+
+    assert warming_up.status_code == 503 and warming_up.json() == {"status": "warming_up"}, warming_up.text
+    assert live.status_code == 200, live.text
+    assert ready.status_code == 200, ready.text
+    assert ready.json()["status"] == "ready" and ready.json()["warmup_seconds"] > 0, ready.json()
+
+    assert all(count > 0 for count in compiled.values()), compiled
+    assert app.openapi_schema is not None
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import time
+
+"""
+Group commit (WriteQueue) check and write throughput benchmark.
+
+Runs the same concurrent item inserts twice on a SQLite database:
+one commit per operation (queue stopped), then batched by WriteQueue.
+Checks that:
+- every batched write is committed and its result (item with ID) is returned to its caller
+- a failing operation (409 duplicate name) gets its own error, other operations of its batch commit
+- batching commits more writes per second than one commit per write
+
+Run with:  pytest -s test_write_queue.py
+"""
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from DAO.item_dao import ItemDao
+from database import models, schema
+from database.database import engine, SessionLocal
+from helpers import exception_helper
+from helpers.seed_helper import seed_database
+from services.write_queue_services import WriteQueue
+
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "64"))
+WRITES_PER_TASK = int(os.getenv("BENCH_WRITES_PER_TASK", "5"))
+MIN_SPEEDUP = 1.2   # Lower bound for fast disks and one CPU; the gain grows with fsync cost
+
+
+async def prepare_database() -> None:
+    """Seed users (tables are created by the database fixture)"""
+    await seed_database(SessionLocal, users=10, items_per_user=0)
+
+
+async def insert_item(name: str, user_id: int = 1) -> models.Item:
+    """Insert item like item_repository.create_item: duplicate check and insert in one operation"""
+
+    async def write(write_db) -> models.Item:
+        duplicate = await ItemDao.get_item_by_user_id_and_item_name(db=write_db, user_id=user_id, item_name=name)
+        await exception_helper.CheckHTTP409Conflict(founding_item=duplicate, text="Duplicate item")
+        return await ItemDao.create_item(db=write_db, request=schema.Item(name=name, description="Queued"),
+                                         user_id=user_id)
+
+    async with SessionLocal() as db:
+        return await WriteQueue.run(write, db=db)
+
+
+async def run_writes(prefix: str) -> float:
+    """
+    Insert CONCURRENCY * WRITES_PER_TASK items from concurrent tasks.
+
+    :param prefix: Prefix of item names
+    :return: Committed writes per second
+    """
+
+    async def task(number: int) -> None:
+        for write in range(WRITES_PER_TASK):
+            item = await insert_item(f"{prefix}_{number}_{write}", user_id=number % 10 + 1)
+            assert item.id is not None and item.name == f"{prefix}_{number}_{write}"
+
+    started = time.perf_counter()
+    await asyncio.gather(*(task(number) for number in range(CONCURRENCY)))
+    return CONCURRENCY * WRITES_PER_TASK / (time.perf_counter() - started)
+
+
+async def count_items(prefix: str) -> int:
+    async with SessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(models.Item).where(models.Item.name.like(f"{prefix}%")))
+
+
+async def run_checks() -> dict:
+    await prepare_database()
+    try:
+        direct = await run_writes("direct")
+
+        await WriteQueue.start(max_batch=64, max_latency=0.002)
+        try:
+            batched = await run_writes("batched")
+            stats = WriteQueue.get_stats()
+
+            # Second "dup" fails alone, the others of the same batch are committed
+            results = await asyncio.gather(insert_item("dup"), insert_item("dup"), insert_item("other"),
+                                           return_exceptions=True)
+        finally:
+            await WriteQueue.stop()
+
+        return {
+            "direct": direct,
+            "batched": batched,
+            "stats": stats,
+            "results": results,
+            "direct_count": await count_items("direct"),
+            "batched_count": await count_items("batched"),
+            "dup_count": await count_items("dup"),
+            "other_count": await count_items("other"),
+        }
+    finally:
+        await engine.dispose()
+
+
+def test_write_queue(database):
+    """Batched writes are all committed, errors stay with their callers, throughput grows"""
+    checks = asyncio.run(run_checks())
+
+    print(f"\n{CONCURRENCY} tasks x {WRITES_PER_TASK} writes: "
+          f"{checks['direct']:.0f} writes/s with commit per write, {checks['batched']:.0f} writes/s batched "
+          f"(x{checks['batched'] / checks['direct']:.1f}, avg batch {checks['stats']['avg_batch_size']})")
+
+    total = CONCURRENCY * WRITES_PER_TASK
+    assert checks["direct_count"] == total, checks
+    assert checks["batched_count"] == total, checks
+
+    first, second, other = checks["results"]
+    assert isinstance(first, models.Item), first
+    assert isinstance(second, HTTPException) and second.status_code == 409, second
+    assert isinstance(other, models.Item), other
+    assert checks["dup_count"] == 1 and checks["other_count"] == 1, checks
+
+    assert checks["stats"]["avg_batch_size"] > 1, checks["stats"]
+    assert checks["batched"] >= checks["direct"] * MIN_SPEEDUP, checks